@@ -1,9 +1,12 @@
+import multiprocessing
+from fastapi.responses import PlainTextResponse
 from nicegui import ui, app
 from views.config_view import show_config_page
 from views.order_view import show_order_page
 from views.log_view import show_log_page
 from views.file_view import show_file_page
 from tasks.refund_task import auto_export_deficiency_orders_links
+from utils.metrics import render_metrics
 
 
 @app.on_startup
@@ -11,6 +14,12 @@ def startup_tasks():
     auto_export_deficiency_orders_links()
 
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus 文本格式的抓取指标"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 def main():
     @ui.page("/")
     def index():
@@ -37,4 +46,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 页面解析可配置为进程池（PARSE_EXECUTOR=process），打包后的程序需要 freeze_support
+    multiprocessing.freeze_support()
     main()
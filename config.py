@@ -9,6 +9,12 @@ EXPORT_DIR = os.path.join(DATA_DIR, "exported")
 
 
 CONFIG_PATH = os.path.join(DATA_DIR, "config.json")
+# 短链展开缓存（v.douyin.com -> 真实链接/作品ID）
+SHORT_URL_CACHE_PATH = os.path.join(DATA_DIR, "short_url_cache.json")
+# 导出文件收入台账（按文件路径/大小/修改时间记录每个文件的收入）
+INCOME_LEDGER_PATH = os.path.join(DATA_DIR, "income_ledger.json")
+# 增量导出水位线与断点
+EXPORT_CHECKPOINT_PATH = os.path.join(DATA_DIR, "export_checkpoint.json")
 
 # 日志配置
 LOG_PATH = os.path.join(DATA_DIR, "app.log")
@@ -73,6 +79,14 @@ class Config:
                 self._data[key] = {"value": value}
             _save_config_dict(self._data)
 
+    def override(self, key, value):
+        """仅在内存中修改 value，不写回 config.json（用于本地模拟、临时运行等场景）。"""
+        with self._lock:
+            if key in self._data and isinstance(self._data[key], dict):
+                self._data[key]["value"] = value
+            else:
+                self._data[key] = {"value": value}
+
     def __delitem__(self, key):
         with self._lock:
             del self._data[key]
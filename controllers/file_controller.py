@@ -6,6 +6,7 @@ import datetime as dt
 import csv  # 新增：CSV 读取
 
 from config import EXPORT_DIR
+from utils.income_ledger import income_ledger
 
 
 def list_export_files() -> List[Dict]:
@@ -50,22 +51,25 @@ def delete_files_between(start: dt.datetime, end: dt.datetime) -> int:
     删除导出目录中在 [start, end] 间修改的文件，返回删除数量。
     """
     files = list_export_files()
-    count = 0
+    removed: List[str] = []
     for f in files:
         if start <= f["mtime"] <= end:
             os.remove(f["path"])
-            count += 1
-    return count
+            removed.append(f["path"])
+    # 已删除文件的收入从台账中移除
+    income_ledger.forget(removed)
+    return len(removed)
 
 
 def delete_all_files() -> int:
     """删除导出目录中所有文件，返回删除数量。"""
     files = list_export_files()
-    count = 0
+    removed: List[str] = []
     for f in files:
         os.remove(f["path"])
-        count += 1
-    return count
+        removed.append(f["path"])
+    income_ledger.forget(removed)
+    return len(removed)
 
 
 def read_csv_table(path: str) -> Dict[str, List]:
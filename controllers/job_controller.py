@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import AbstractSet, Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, delete, or_, update
+from sqlmodel import select
+from config import CONFIG
+from db import ensure_tables, get_job_engine, get_job_session
+from models.scrape_job import ScrapeJob, JOB_PENDING, JOB_LEASED, JOB_DONE, JOB_FAILED
+from utils.like_cache import like_count_cache
+
+# 已建好 scrape_job 表的 engine（切换任务库或测试替换 engine 后需重新检查）
+_tables_engine = None
+_tables_lock = threading.Lock()
+
+
+def _ensure_job_table() -> None:
+    global _tables_engine
+    engine = get_job_engine()
+    with _tables_lock:
+        if _tables_engine is not engine:
+            ensure_tables(ScrapeJob, engine=engine)
+            _tables_engine = engine
+
+
+def _claimable(now: int):
+    """待处理的任务，或租约已过期（worker 崩溃/失联）的任务"""
+    return or_(
+        ScrapeJob.status == JOB_PENDING,
+        and_(ScrapeJob.status == JOB_LEASED, ScrapeJob.lease_until < now),
+    )
+
+
+def enqueue_jobs(orders: List[Dict[str, Any]], indices: Optional[Sequence[int]] = None) -> str:
+    """将 orders 中 indices 对应的订单（默认全部）入队，seq 为订单下标，返回批次ID"""
+    _ensure_job_table()
+    batch_id = uuid.uuid4().hex
+    now = int(time.time())
+    if indices is None:
+        indices = range(len(orders))
+    with get_job_session() as s:
+        s.add_all(
+            [
+                ScrapeJob(
+                    batch_id=batch_id,
+                    seq=i,
+                    link=orders[i].get("link") or "",
+                    aweme_id=orders[i].get("aweme_id"),
+                    created_at=now,
+                )
+                for i in indices
+            ]
+        )
+        s.commit()
+    return batch_id
+
+
+def claim_jobs(worker_id: str, limit: int, lease_seconds: int, max_claims: int) -> List[Dict[str, Any]]:
+    """
+    租用最多 limit 个任务，返回 [{"id", "link", "aweme_id", "lease"}]。
+    使用带条件的 UPDATE 抢占（乐观并发）：多个 worker 同时抢同一批任务时，
+    只有条件仍成立的那次更新生效，各 worker 再按本次唯一的租约标识取回自己抢到的任务。
+    """
+    _ensure_job_table()
+    expire_exhausted_jobs(max_claims)
+    now = int(time.time())
+    lease = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    with get_job_session() as s:
+        candidates = list(
+            s.exec(
+                select(ScrapeJob.id)
+                .where(_claimable(now))
+                .where(ScrapeJob.claims < max_claims)
+                .order_by(ScrapeJob.id)
+                .limit(limit)
+            )
+        )
+        if not candidates:
+            return []
+        s.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id.in_(candidates))
+            .where(_claimable(now))
+            .values(
+                status=JOB_LEASED,
+                lease_owner=lease,
+                lease_until=now + lease_seconds,
+                claims=ScrapeJob.claims + 1,
+            )
+        )
+        s.commit()
+        rows = s.exec(
+            select(ScrapeJob.id, ScrapeJob.link, ScrapeJob.aweme_id)
+            .where(ScrapeJob.lease_owner == lease)
+            .where(ScrapeJob.status == JOB_LEASED)
+        ).all()
+    return [{"id": r.id, "link": r.link, "aweme_id": r.aweme_id, "lease": lease} for r in rows]
+
+
+def complete_job(
+    job_id: int, lease: str, like_count: Optional[int], error: str = "", aweme_id: Optional[str] = None
+) -> bool:
+    """
+    回写结果，like_count 为空表示失败；aweme_id 为抓取时展开短链得到的作品ID（可选）。
+    租约已被他人接管时不写入，返回 False
+    """
+    now = int(time.time())
+    values: Dict[str, Any] = {
+        "status": JOB_DONE if like_count is not None else JOB_FAILED,
+        "like_count": like_count,
+        "error": (error or None) and error[:255],
+        "finished_at": now,
+    }
+    if aweme_id:
+        values["aweme_id"] = aweme_id
+    with get_job_session() as s:
+        result = s.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id == job_id)
+            .where(ScrapeJob.lease_owner == lease)
+            .where(ScrapeJob.status == JOB_LEASED)
+            .values(**values)
+        )
+        s.commit()
+    return result.rowcount == 1
+
+
+def expire_exhausted_jobs(max_claims: int) -> int:
+    """租约过期且已被租用 max_claims 次的任务标记为失败，避免反复被拿走又没有结果"""
+    now = int(time.time())
+    with get_job_session() as s:
+        result = s.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.status == JOB_LEASED)
+            .where(ScrapeJob.lease_until < now)
+            .where(ScrapeJob.claims >= max_claims)
+            .values(status=JOB_FAILED, error="租约多次过期", finished_at=now)
+        )
+        s.commit()
+    return result.rowcount
+
+
+def fetch_finished(
+    batch_id: str, seen: AbstractSet[int] = frozenset()
+) -> List[Tuple[int, int, Optional[int], Optional[str]]]:
+    """
+    批次中已完成且 id 不在 seen 中的任务：[(id, seq, like_count, aweme_id)]。
+    不按 finished_at 过滤：它在事务提交前取值，晚提交的结果可能早于上次轮询时间而被漏掉。
+    """
+    with get_job_session() as s:
+        rows = s.exec(
+            select(ScrapeJob.id, ScrapeJob.seq, ScrapeJob.like_count, ScrapeJob.aweme_id)
+            .where(ScrapeJob.batch_id == batch_id)
+            .where(ScrapeJob.status.in_([JOB_DONE, JOB_FAILED]))
+            .order_by(ScrapeJob.id)
+        ).all()
+    return [(r.id, r.seq, r.like_count, r.aweme_id) for r in rows if r.id not in seen]
+
+
+def purge_batch(batch_id: str) -> None:
+    with get_job_session() as s:
+        s.execute(delete(ScrapeJob).where(ScrapeJob.batch_id == batch_id))
+        s.commit()
+
+
+async def iter_distributed_likes(orders: List[Dict[str, Any]]) -> AsyncIterator[Tuple[Dict[str, Any], Any]]:
+    """
+    分布式模式下与 iter_aweme_likes 对应：点赞数缓存命中的直接产出，其余入队交给 worker.py 抓取，
+    轮询数据库按完成顺序产出 (order, 点赞数)，失败为正无穷。
+    超过 JOB_BATCH_TIMEOUT 仍未完成的订单（如没有 worker 在运行）按失败产出，避免导出一直阻塞。
+    批次结束、超时或调用方提前停止时清理批次任务。
+    """
+    orders = orders or []
+    pending: List[int] = []
+    for i, o in enumerate(orders):
+        cached_like = like_count_cache.get(o.get("aweme_id"))
+        if cached_like is None:
+            pending.append(i)
+        else:
+            yield o, cached_like
+    if not pending:
+        return
+
+    poll_interval = float(CONFIG.get("JOB_POLL_INTERVAL", 2))
+    max_claims = int(CONFIG.get("JOB_MAX_CLAIMS", 3))
+    timeout = float(CONFIG.get("JOB_BATCH_TIMEOUT", 1800) or 0)
+    batch_id = await asyncio.to_thread(enqueue_jobs, orders, pending)
+    logging.info(f"[分布式] 已入队 {len(pending)} 个抓取任务，批次 {batch_id}")
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    seen: set = set()
+    done_seqs: set = set()
+    try:
+        while len(seen) < len(pending):
+            await asyncio.to_thread(expire_exhausted_jobs, max_claims)
+            for job_id, seq, like_count, aweme_id in await asyncio.to_thread(fetch_finished, batch_id, frozenset(seen)):
+                seen.add(job_id)
+                done_seqs.add(seq)
+                order = orders[seq]
+                if aweme_id and not order.get("aweme_id"):
+                    # worker 展开短链得到的作品ID，导出结束后写回 order_link
+                    order["aweme_id"] = aweme_id
+                if like_count is None:
+                    yield order, float("inf")
+                else:
+                    like_count_cache.put(order.get("aweme_id"), like_count)
+                    yield order, like_count
+            if len(seen) >= len(pending):
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                remaining = [i for i in pending if i not in done_seqs]
+                logging.error(
+                    f"[分布式] 批次 {batch_id} 等待超过 {timeout:.0f} 秒，剩余 {len(remaining)} 个任务按失败处理"
+                )
+                for i in remaining:
+                    yield orders[i], float("inf")
+                break
+            await asyncio.sleep(poll_interval)
+    finally:
+        try:
+            await asyncio.to_thread(purge_batch, batch_id)
+        except Exception as e:  # noqa: BLE001
+            logging.error(f"[分布式] 清理批次 {batch_id} 失败: {e}")
@@ -4,72 +4,125 @@ import asyncio
 import logging
 import threading
 import time
-from typing import List, Dict, Any
+from contextlib import aclosing
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from config import EXPORT_DIR
-from sqlmodel import select
+from sqlalchemy import and_, or_
+from sqlmodel import select, func
 import re
 import os
 import csv  # 新增：用于写入/读取 CSV
 from config import CONFIG
 from db import get_session
 from models.order import Order
-from utils.douyin import batch_aweme_likes
+from models.order_link import OrderLink
+from controllers.job_controller import iter_distributed_likes
+from controllers.order_link_controller import (
+    ensure_link_table,
+    index_order_links,
+    link_table_exists,
+    read_order_links,
+    record_aweme_ids,
+)
+from utils.douyin import iter_aweme_likes
+from utils.douyin_link import LinkNormalizer
+from utils.export_checkpoint import Watermark, export_checkpoint
+from utils.income_ledger import income_ledger
+from utils.metrics import STAGE_SECONDS
+
+# 增量导出同一时间只允许一个（界面手动导出与自动导出线程可能同时触发）
+_watermark_lock = threading.Lock()
+
+# IN (...) 查询每批的订单ID数量，避免语句过长
+_IN_QUERY_CHUNK_SIZE = 500
+
+
+def _scan_export_files(export_dir: str) -> Dict[str, tuple[int, int]]:
+    """导出目录下 CSV 的指纹 {绝对路径: (大小, 修改时间 ns)}"""
+    files: Dict[str, tuple[int, int]] = {}
+    if not os.path.isdir(export_dir):
+        return files
+    for entry in os.scandir(export_dir):
+        if not entry.name.endswith(".csv") or not entry.is_file():
+            continue
+        stat = entry.stat()
+        files[os.path.abspath(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def _read_deficiency_rows(file_path: str) -> Optional[List[tuple[int, int]]]:
+    """读取单个导出 CSV，返回 [(订单ID, 缺失数量)]，无效行跳过；读取失败返回 None"""
+    rows: List[tuple[int, int]] = []
+    try:
+        with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # 从 CSV 读取订单ID与缺失数量
+                try:
+                    order_id = int((row.get("订单ID") or "0").strip() or 0)
+                    deficiency = int((row.get("缺失的数量") or "0").strip() or 0)
+                except ValueError:
+                    continue
+                if order_id <= 0 or deficiency <= 0:
+                    continue
+                rows.append((order_id, deficiency))
+    except Exception as e:  # noqa: BLE001
+        logging.warning(f"读取导出文件失败: {file_path}, 错误: {e}")
+        return None
+    return rows
+
+
+def _query_order_amounts(order_ids: List[int]) -> Dict[int, tuple[int, float]]:
+    """按订单ID分批查询 (下单数量, 订单总价)，只取这两列"""
+    amounts: Dict[int, tuple[int, float]] = {}
+    with get_session() as s:
+        for i in range(0, len(order_ids), _IN_QUERY_CHUNK_SIZE):
+            chunk = order_ids[i: i + _IN_QUERY_CHUNK_SIZE]
+            stmt = select(Order.id, Order.order_num, Order.order_amount).where(Order.id.in_(chunk))
+            with STAGE_SECONDS.time(stage="db_query"):
+                found = s.exec(stmt).all()
+            for order_id, order_num, order_amount in found:
+                try:
+                    num = int(order_num or 0)
+                except Exception:
+                    num = 0
+                try:
+                    amount = float(order_amount or 0)
+                except Exception:
+                    amount = 0.0
+                amounts[order_id] = (num, amount)
+    return amounts
+
 
 def query_order_refund_amount():
     """
     遍历导出的 CSV 文件，按每行：
       缺失数量 / 下单数量 * 订单总价
-    的公式累加为总收入。订单总价与下单数量以数据库为准，通过订单ID查询。
+    的公式累加为总收入。订单总价与下单数量以数据库为准。
+    每个文件的收入记在收入台账中（按路径/大小/修改时间），只解析新增或有变化的文件，
+    其订单ID合并后分批 IN 查询；已删除的文件自动从合计中移除。
     """
-    total_income = 0.0
-    export_dir = EXPORT_DIR
-    if not os.path.isdir(export_dir):
-        return 0.0
-
-    # 统一复用一个会话
-    with get_session() as s:
-        for filename in os.listdir(export_dir):
-            if not filename.endswith(".csv"):
-                continue
-            file_path = os.path.join(export_dir, filename)
-            try:
-                with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        # 从 CSV 读取订单ID与缺失数量
-                        try:
-                            order_id = int((row.get("订单ID") or "0").strip() or 0)
-                            deficiency = int((row.get("缺失的数量") or "0").strip() or 0)
-                        except ValueError:
-                            continue
-                        if order_id <= 0 or deficiency <= 0:
-                            continue
-
-                        # 查库获取订单总价与下单数量
-                        stmt = select(Order).where(Order.id == order_id)
-                        found: List[Order] = list(s.exec(stmt))
-                        if not found:
-                            continue
-                        o = found[0]
-
-                        try:
-                            order_num = int(o.order_num or 0)
-                        except Exception:
-                            order_num = 0
-                        if order_num <= 0:
-                            continue
-
-                        try:
-                            order_amount = float(o.order_amount or 0)
-                        except Exception:
-                            order_amount = 0.0
-
-                        total_income += (deficiency / order_num) * order_amount
-            except Exception as e:  # noqa: BLE001
-                logging.warning(f"读取导出文件失败: {file_path}, 错误: {e}")
-                continue
-
-    return total_income
+    files = _scan_export_files(EXPORT_DIR)
+    stale = income_ledger.sync(files)
+    if stale:
+        rows_by_file: Dict[str, List[tuple[int, int]]] = {}
+        for path in stale:
+            rows = _read_deficiency_rows(path)
+            # 读取失败的文件不记入台账，下次查询时重试
+            if rows is not None:
+                rows_by_file[path] = rows
+        order_ids = sorted({order_id for rows in rows_by_file.values() for order_id, _ in rows})
+        amounts = _query_order_amounts(order_ids) if order_ids else {}
+        for path, rows in rows_by_file.items():
+            income = 0.0
+            for order_id, deficiency in rows:
+                order_num, order_amount = amounts.get(order_id, (0, 0.0))
+                if order_num <= 0:
+                    continue
+                income += (deficiency / order_num) * order_amount
+            income_ledger.record(path, files[path], income)
+    income_ledger.flush()
+    return income_ledger.total()
 
 
 def _format_ts(ts: int | None) -> str:
@@ -79,141 +132,340 @@ def _format_ts(ts: int | None) -> str:
     return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(int(ts)))
 
 
-def query_finished_orders_for_monitor() -> List[Dict[str, Any]]:
+def _monitor_window(now: int) -> tuple[int, int]:
+    """在 now 时刻导出的 tb_time 区间 [start_ts, end_ts)"""
+    start_ts = now - int(CONFIG["EXPORT_TIME_OFFSET"])
+    return start_ts, start_ts + int(CONFIG["EXPORT_TIME_INTERVAL"])
+
+
+def _watermark_enabled() -> bool:
+    return str(CONFIG.get("EXPORT_USE_WATERMARK", "0")) == "1"
+
+
+def _monitor_conditions(monitored_ids: List[int], now: int, after: Optional[Watermark] = None) -> list:
+    """
+    导出订单的查询条件：after 为空时取 now 的时间窗口；
+    否则取 (tb_time, id) 大于水位线 after 且 tb_time 早于窗口结束的订单
+    """
+    start_ts, end_ts = _monitor_window(now)
+    conditions = [
+        Order.goods_id.in_(monitored_ids),
+        Order.order_status == 4,
+        Order.tb_time.is_not(None),
+        Order.tb_time < end_ts,
+    ]
+    if after is None:
+        conditions.append(Order.tb_time >= start_ts)
+    else:
+        after_ts, after_id = after
+        conditions.append(or_(Order.tb_time > after_ts, and_(Order.tb_time == after_ts, Order.id > after_id)))
+    return conditions
+
+
+def count_finished_orders_for_monitor(at: Optional[int] = None) -> int:
+    """
+    统计在 at 时刻（默认现在）导出时会查到的订单数，条件与导出相同（开启水位线时从水位线之后算起），
+    用于导出前预热代理
+    """
+    monitored_ids = CONFIG["MONITORED_GOOD_IDS"] or []
+    if not monitored_ids:
+        return 0
+    after = export_checkpoint.watermark if _watermark_enabled() else None
+    stmt = select(func.count()).select_from(Order).where(*_monitor_conditions(monitored_ids, int(at or time.time()), after))
+    with get_session() as s, STAGE_SECONDS.time(stage="db_query"):
+        return int(s.exec(stmt).one())
+
+
+# 监控导出只取用到的列，不加载 params / logs / card_number 等大字段，也不构造 ORM 实例；
+# 链接与作品ID来自 order_link 索引表
+_MONITOR_COLUMNS = (
+    Order.id,
+    Order.order_s_n,
+    Order.goods_id,
+    Order.goods_name,
+    Order.s_name,
+    Order.order_num,
+    Order.order_amount,
+    Order.start_num,
+    Order.current_num,
+    Order.order_status,
+    Order.create_at,
+    Order.tb_time,
+    Order.other_order_s_n,
+)
+_LINK_COLUMNS = (OrderLink.link, OrderLink.aweme_id)
+
+
+def query_finished_orders_for_monitor(after: Optional[Watermark] = None, index_links: bool = False) -> List[Dict[str, Any]]:
     """
     查询：
       - 配置中的指定商品ID（MONITORED_GOOD_IDS）
       - 已完成的订单（order_status == 4）
       - tb_time 在 [now - EXPORT_TIME_OFFSET - EXPORT_TIME_INTERVAL, now - EXPORT_TIME_OFFSET) 之间
-    并将时间戳转为可读字符串返回。
+        （传入水位线 after 时改为 (tb_time, id) 在 after 之后、窗口结束之前）
+    并将时间戳转为可读字符串返回（原始 tb_time 另存于 tb_ts）。
+    链接与作品ID从 order_link 读取，尚未建立索引的订单读取 params 提取。
+    index_links 为 True（导出路径）时才建表并写入索引、补写短链缓存中已展开的作品ID；
+    界面查询保持只读，order_link 表不存在时全部从 params 提取。
     """
-    now = int(time.time())
-    export_time_offset = int(CONFIG["EXPORT_TIME_OFFSET"])
-    export_time_interval = int(CONFIG["EXPORT_TIME_INTERVAL"])
     monitored_ids = CONFIG["MONITORED_GOOD_IDS"] or []
 
-    start_ts = now - export_time_offset
-    end_ts = start_ts + export_time_interval
-
     if not monitored_ids:
         return []
 
-    stmt = (
-        select(Order)
-        .where(Order.goods_id.in_(monitored_ids))
-        .where(Order.order_status == 4)
-        .where(Order.tb_time.is_not(None))
-        .where(Order.tb_time >= start_ts)
-        .where(Order.tb_time < end_ts)
-        .order_by(Order.tb_time.desc())
-    )
+    if index_links:
+        ensure_link_table()
+    use_index = index_links or link_table_exists()
+    stmt = select(*_MONITOR_COLUMNS, *(_LINK_COLUMNS if use_index else ())).select_from(Order)
+    if use_index:
+        stmt = stmt.outerjoin(OrderLink, OrderLink.order_id == Order.id)
+    stmt = stmt.where(*_monitor_conditions(monitored_ids, int(time.time()), after)).order_by(Order.tb_time.desc())
 
-    with get_session() as s:
-        orders: List[Order] = list(s.exec(stmt))
+    with get_session() as s, STAGE_SECONDS.time(stage="db_query"):
+        rows = s.exec(stmt).all()
 
     result: List[Dict[str, Any]] = []
-    pattern = re.compile(r'(https?://[^\s]+)"')
-    for o in orders:
-        link = (
-            re.search(pattern, o.params).group(1)
-            if re.search(pattern, o.params)
-            else ""
-        )
+    for o in rows:
         result.append(
             {
                 "id": o.id,
                 "order_s_n": o.order_s_n,
                 "goods_id": o.goods_id,
                 "goods_name": o.goods_name,
-                "link": link,
+                "link": o.link if use_index else None,
+                "aweme_id": o.aweme_id if use_index else None,
                 "s_name": o.s_name,
                 "order_num": o.order_num,
                 "order_amount": str(o.order_amount),
-                "order_num": o.order_num,
                 "start_num": o.start_num,
                 "current_num": o.current_num,
                 "order_status": o.order_status,
                 "create_at": _format_ts(o.create_at),
                 "tb_time": _format_ts(o.tb_time),
+                "tb_ts": o.tb_time,
                 "other_order_s_n": o.other_order_s_n or "",  # 新增：三方订单号
             }
         )
+
+    # 能从链接本地得到作品ID的订单，抓取时跳过短链展开
+    normalizer = LinkNormalizer()
+    missing = [order["id"] for order in result if order["link"] is None]
+    if not missing:
+        indexed = {}
+    elif index_links:
+        indexed = index_order_links(missing, normalizer)
+    else:
+        indexed = read_order_links(missing, normalizer)
+    resolved: Dict[int, str] = {}
+    for order in result:
+        if order["link"] is None:
+            order["link"], order["aweme_id"] = indexed.get(order["id"], ("", None))
+        elif not order["aweme_id"] and order["link"]:
+            _, order["aweme_id"] = normalizer.resolve(order["link"])
+            if order["aweme_id"]:
+                resolved[order["id"]] = order["aweme_id"]
+    if index_links:
+        record_aweme_ids(resolved)
+        logging.info(f"链接索引：共 {len(result)} 条，新建索引 {len(missing)} 条，补写作品ID {len(resolved)} 条；{normalizer.report()}")
     return result
 
 
-async def export_deficiency_orders_links():
+def _scraped_aweme_ids(orders: List[Dict[str, Any]]) -> Dict[int, str]:
+    """
+    抓取前没有作品ID的订单（短链），抓取时展开得到的作品ID：{订单ID: 作品ID}。
+    本地抓取从短链缓存取，分布式抓取由 worker 回写到订单的 aweme_id。
+    """
+    normalizer = LinkNormalizer()
+    found: Dict[int, str] = {}
+    for order in orders:
+        aweme_id = order.get("aweme_id") or normalizer.resolve(order.get("link") or "")[1]
+        if aweme_id:
+            found[order["id"]] = aweme_id
+    return found
+
+
+EXPORT_HEADERS = [
+    "商品名称",
+    "商品ID",
+    "链接",
+    "订单号",
+    "订单ID",
+    "三方订单号",
+    "缺失的数量",
+    "订单总价",
+    "下单数量",
+    "初始数量",
+    "当前数量",
+]
+
+
+def _sanitize_filename(name: str) -> str:
+    # 仅保留中英文、数字、下划线和连字符，其余替换为下划线
+    return re.sub(r'[^0-9A-Za-z\u4e00-\u9fff_-]+', '_', name).strip('_') or 'unknown'
+
+
+class _DeficiencyCsvWriter:
+    """按商品名称分文件写出缺失订单，首次出现某商品时才创建文件，每行写完立即落盘"""
+
+    def __init__(self, current_time_str: str):
+        self.current_time_str = current_time_str
+        self._files: Dict[str, Any] = {}
+        self._writers: Dict[str, csv.DictWriter] = {}
+
+    def write(self, goods_name: str, row: Dict[str, Any]) -> None:
+        writer = self._writers.get(goods_name)
+        if writer is None:
+            file_path = f"{EXPORT_DIR}/{self.current_time_str}_{_sanitize_filename(goods_name)}.csv"
+            f = open(file_path, "w", encoding="utf-8-sig", newline="")
+            writer = csv.DictWriter(f, fieldnames=EXPORT_HEADERS)
+            writer.writeheader()
+            self._files[goods_name] = f
+            self._writers[goods_name] = writer
+        writer.writerow(row)
+        self._files[goods_name].flush()
+
+    def close(self) -> None:
+        for goods_name, f in self._files.items():
+            try:
+                f.close()
+            except Exception as e:  # noqa: BLE001
+                logging.error(f"写入导出文件失败: {goods_name}, 错误: {e}")
+
+
+async def export_deficiency_orders_links(
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Optional[Dict[str, List[str]]]:
     """
     导出所有数量缺失的订单，按商品名称分组生成 CSV：
     {EXPORT_DIR}/{current_time_str}_{goods_name}.csv
     列包含：
     商品名称, 商品ID, 链接, 订单号, 订单ID, 三方订单号, 缺失的数量, 订单总价, 下单数量, 初始数量, 当前数量
+    每个链接抓取完成就计算缺失数量并写入对应 CSV，中途中断时已写出的行会保留。
+    on_progress(已完成数, 总数) 用于界面显示进度。
+    SCRAPE_MODE 为 distributed 时抓取任务入队交给 worker.py，本进程只汇总结果。
+
+    EXPORT_USE_WATERMARK 为 1 时按水位线增量导出：只处理上次完整导出之后的订单，
+    每处理完一个订单记入断点，中断后重跑跳过已处理的订单；抓取失败的订单不记入断点，
+    水位线只推进到第一个未处理完的订单之前，下次导出会重新抓取它；
+    连续 EXPORT_MAX_FAILED_RUNS 次导出都抓取失败的订单记为跳过，不再挡住水位线。
+    首次导出（还没有水位线）从时间窗口的下界开始，结束时至少把水位线提交到该下界。
+    同一时间只允许一个增量导出，另一个直接跳过并返回 None。
     """
-    def _sanitize_filename(name: str) -> str:
-        # 仅保留中英文、数字、下划线和连字符，其余替换为下划线
-        return re.sub(r'[^0-9A-Za-z\u4e00-\u9fff_-]+', '_', name).strip('_') or 'unknown'
+    if not _watermark_enabled():
+        return await _export_orders(query_finished_orders_for_monitor(index_links=True), on_progress)
 
-    orders = query_finished_orders_for_monitor()
-    current_real_nums = await batch_aweme_likes(orders)
+    if not _watermark_lock.acquire(blocking=False):
+        logging.warning("已有增量导出在进行，本次跳过")
+        return None
+    try:
+        after = export_checkpoint.watermark or (_monitor_window(int(time.time()))[0] - 1, 0)
+        orders = query_finished_orders_for_monitor(after=after, index_links=True)
+        pending = [o for o in orders if o["id"] not in export_checkpoint.done_ids]
+        if len(pending) < len(orders):
+            logging.info(f"增量导出从断点继续：跳过已处理 {len(orders) - len(pending)} 条，剩余 {len(pending)} 条")
+        result = await _export_orders(pending, on_progress, on_done=export_checkpoint.mark_done, on_failed=_on_export_failed)
+        watermark, remaining = _next_watermark(orders, export_checkpoint.done_ids)
+        export_checkpoint.commit(watermark or after, remaining)
+        return result
+    finally:
+        _watermark_lock.release()
 
-    # 按商品名称分组行
-    rows_by_goods: Dict[str, List[Dict[str, Any]]] = {}
-    deficiency_links_by_goods: Dict[str, List[str]] = {}
 
-    for i in range(len(orders)):
-        orders[i]["current_num"] = current_real_nums[i]
-        produced = orders[i]["current_num"] - orders[i]["start_num"]
-        deficiency_num = orders[i]["order_num"] - produced
-        if deficiency_num > 0:
-            goods_name = orders[i]["goods_name"] or "unknown"
-            rows_by_goods.setdefault(goods_name, []).append(
-                {
-                    "商品名称": goods_name,
-                    "商品ID": orders[i]["goods_id"],
-                    "链接": orders[i]["link"],
-                    "订单号": orders[i]["order_s_n"],
-                    "订单ID": orders[i]["id"],
-                    "三方订单号": orders[i].get("other_order_s_n", "") or "",
-                    "缺失的数量": deficiency_num,
-                    "订单总价": orders[i]["order_amount"],
-                    "下单数量": orders[i]["order_num"],
-                    "初始数量": orders[i]["start_num"],
-                    "当前数量": orders[i]["current_num"],
-                }
-            )
-            deficiency_links_by_goods.setdefault(goods_name, []).append(orders[i]["link"])
-            logging.info(f"数量缺失：{orders[i]['link']} 缺失 {deficiency_num} 个")
-
-    # 写出 CSV
-    os.makedirs(EXPORT_DIR, exist_ok=True)
-    current_time_str = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime())
-    headers = [
-        "商品名称",
-        "商品ID",
-        "链接",
-        "订单号",
-        "订单ID",
-        "三方订单号",
-        "缺失的数量",
-        "订单总价",
-        "下单数量",
-        "初始数量",
-        "当前数量",
-    ]
+def _on_export_failed(order_id: int) -> None:
+    """记录增量导出中抓取失败的订单，累计失败次数达到 EXPORT_MAX_FAILED_RUNS 时放弃该订单"""
+    failed_runs = export_checkpoint.mark_failed(order_id)
+    max_runs = int(CONFIG.get("EXPORT_MAX_FAILED_RUNS", 3))
+    if max_runs > 0 and failed_runs >= max_runs:
+        logging.warning(f"订单 {order_id} 已连续 {failed_runs} 次导出抓取失败，跳过该订单，水位线不再等待它")
+        export_checkpoint.mark_done(order_id)
 
-    for goods_name, rows in rows_by_goods.items():
-        safe_name = _sanitize_filename(goods_name)
-        file_path = f"{EXPORT_DIR}/{current_time_str}_{safe_name}.csv"
-        try:
-            with open(file_path, "w", encoding="utf-8-sig", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-                writer.writerows(rows)
-        except Exception as e:  # noqa: BLE001
-            logging.error(f"写入导出文件失败: {file_path}, 错误: {e}")
 
-    # 返回分组的链接（兼容原有调用）
-    return deficiency_links_by_goods
+def _next_watermark(orders: List[Dict[str, Any]], done_ids: Set[int]) -> Tuple[Optional[Watermark], List[int]]:
+    """
+    按 (tb_time, 订单ID) 排序，水位线推进到第一个未处理完（抓取失败）的订单之前；
+    返回 (新水位线, 排在其后、仍需保留在断点中的订单ID)
+    """
+    ordered = sorted(orders, key=lambda o: (o["tb_ts"], o["id"]))
+    watermark: Optional[Watermark] = None
+    for n, o in enumerate(ordered):
+        if o["id"] not in done_ids:
+            remaining = ordered[n:]
+            logging.warning(f"增量导出有 {sum(1 for r in remaining if r['id'] not in done_ids)} 个订单未完成，水位线停在订单 {o['id']} 之前")
+            return watermark, [r["id"] for r in remaining]
+        watermark = (o["tb_ts"], o["id"])
+    return watermark, []
+
 
+async def _export_orders(
+    orders: List[Dict[str, Any]],
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    on_done: Optional[Callable[[int], None]] = None,
+    on_failed: Optional[Callable[[int], None]] = None,
+) -> Dict[str, List[str]]:
+    """
+    抓取 orders 的点赞数并写出缺失订单；on_done(订单ID) 在每个订单抓取成功并写出（或确认无缺失）后调用，
+    on_failed(订单ID) 在订单抓取失败时调用
+    """
+    total = len(orders)
 
+    # 按商品名称分组的缺失链接
+    deficiency_links_by_goods: Dict[str, List[str]] = {}
 
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    current_time_str = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime())
+    writer = _DeficiencyCsvWriter(current_time_str)
+    # 抓取时展开短链得到的作品ID，结束后写回 order_link
+    unresolved = [o for o in orders if o.get("link") and not o.get("aweme_id")]
+    done = 0
+    if on_progress is not None:
+        on_progress(done, total)
+    try:
+        if str(CONFIG.get("SCRAPE_MODE", "local")) == "distributed":
+            likes = iter_distributed_likes(orders)
+        else:
+            likes = iter_aweme_likes(orders)
+        async with aclosing(likes) as results:
+            async for order, current_real_num in results:
+                done += 1
+                order["current_num"] = current_real_num
+                produced = order["current_num"] - order["start_num"]
+                deficiency_num = order["order_num"] - produced
+                if deficiency_num > 0:
+                    goods_name = order["goods_name"] or "unknown"
+                    row = {
+                        "商品名称": goods_name,
+                        "商品ID": order["goods_id"],
+                        "链接": order["link"],
+                        "订单号": order["order_s_n"],
+                        "订单ID": order["id"],
+                        "三方订单号": order.get("other_order_s_n", "") or "",
+                        "缺失的数量": deficiency_num,
+                        "订单总价": order["order_amount"],
+                        "下单数量": order["order_num"],
+                        "初始数量": order["start_num"],
+                        "当前数量": order["current_num"],
+                    }
+                    try:
+                        writer.write(goods_name, row)
+                    except Exception as e:  # noqa: BLE001
+                        logging.error(f"写入导出文件失败: {goods_name}, 错误: {e}")
+                    deficiency_links_by_goods.setdefault(goods_name, []).append(order["link"])
+                    logging.info(f"数量缺失：{order['link']} 缺失 {deficiency_num} 个")
+                # 抓取失败（正无穷）的订单不算处理完，留给下次导出重试
+                if current_real_num == float("inf"):
+                    if on_failed is not None:
+                        on_failed(order["id"])
+                elif on_done is not None:
+                    on_done(order["id"])
+                if on_progress is not None:
+                    on_progress(done, total)
+    finally:
+        writer.close()
+        if unresolved:
+            try:
+                await asyncio.to_thread(record_aweme_ids, _scraped_aweme_ids(unresolved))
+            except Exception as e:  # noqa: BLE001
+                logging.error(f"补写作品ID失败: {e}")
 
+    # 返回分组的链接（兼容原有调用）
+    return deficiency_links_by_goods
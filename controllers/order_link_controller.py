@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import inspect, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from db import ensure_tables, get_engine, get_session
+from models.order import Order
+from models.order_link import OrderLink
+from utils.douyin_link import LinkNormalizer
+from utils.metrics import STAGE_SECONDS
+
+# IN (...) 查询每批的订单ID数量
+_IN_QUERY_CHUNK_SIZE = 500
+_PARAMS_LINK_PATTERN = re.compile(r'(https?://[^\s]+)"')
+
+# 已确认存在 order_link 表的 engine（测试或本地模拟替换 engine 后需重新检查）
+_tables_engine = None
+_tables_lock = threading.Lock()
+
+
+def ensure_link_table() -> None:
+    """建表（已存在则跳过），只在导出路径调用"""
+    global _tables_engine
+    engine = get_engine()
+    with _tables_lock:
+        if _tables_engine is not engine:
+            ensure_tables(OrderLink, engine=engine)
+            _tables_engine = engine
+
+
+def link_table_exists() -> bool:
+    """只读检查 order_link 表是否已建立，供界面查询决定是否关联索引表，不执行建表"""
+    global _tables_engine
+    engine = get_engine()
+    with _tables_lock:
+        if _tables_engine is engine:
+            return True
+        if inspect(engine).has_table(OrderLink.__tablename__):
+            _tables_engine = engine
+            return True
+    return False
+
+
+def extract_params_link(params: Optional[str]) -> str:
+    """从下单参数 JSON 文本中取出第一个链接，没有返回空字符串"""
+    m = _PARAMS_LINK_PATTERN.search(params or "")
+    return m.group(1) if m else ""
+
+
+def read_order_links(order_ids: List[int], normalizer: Optional[LinkNormalizer] = None) -> Dict[int, Tuple[str, Optional[str]]]:
+    """读取订单 params，提取链接并在本地解析作品ID，返回 {订单ID: (链接, 作品ID)}，不写数据库"""
+    normalizer = normalizer or LinkNormalizer()
+    links: Dict[int, Tuple[str, Optional[str]]] = {}
+    with get_session() as s:
+        for i in range(0, len(order_ids), _IN_QUERY_CHUNK_SIZE):
+            chunk = order_ids[i: i + _IN_QUERY_CHUNK_SIZE]
+            with STAGE_SECONDS.time(stage="db_query"):
+                found = s.exec(select(Order.id, Order.params).where(Order.id.in_(chunk))).all()
+            for order_id, params in found:
+                link = extract_params_link(params)
+                _, aweme_id = normalizer.resolve(link)
+                links[order_id] = (link, aweme_id)
+    return links
+
+
+def index_order_links(order_ids: List[int], normalizer: Optional[LinkNormalizer] = None) -> Dict[int, Tuple[str, Optional[str]]]:
+    """
+    为尚未建立索引的订单读取 params，提取链接并在本地解析作品ID，写入 order_link，
+    返回 {订单ID: (链接, 作品ID)}。只有这些订单需要读取 params 大字段。
+    """
+    ensure_link_table()
+    indexed = read_order_links(order_ids, normalizer)
+    if not indexed:
+        return indexed
+    now = int(time.time())
+    rows = [
+        OrderLink(
+            order_id=order_id,
+            link=link,
+            aweme_id=aweme_id,
+            resolved_at=now if aweme_id else None,
+            created_at=now,
+        )
+        for order_id, (link, aweme_id) in indexed.items()
+    ]
+    with get_session() as s:
+        s.add_all(rows)
+        try:
+            s.commit()
+        except IntegrityError:
+            # 另一个导出同时写入了部分订单，逐条合并
+            s.rollback()
+            for row in rows:
+                s.merge(row)
+            s.commit()
+    logging.info(f"订单链接索引新增 {len(rows)} 条")
+    return indexed
+
+
+def record_aweme_ids(resolved: Dict[int, str]) -> None:
+    """短链展开后补写作品ID（{订单ID: 作品ID}），之后的查询直接使用"""
+    if not resolved:
+        return
+    ensure_link_table()
+    now = int(time.time())
+    with get_session() as s:
+        for order_id, aweme_id in resolved.items():
+            s.execute(
+                update(OrderLink)
+                .where(OrderLink.order_id == order_id)
+                .values(aweme_id=aweme_id, resolved_at=now)
+            )
+        s.commit()
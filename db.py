@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Iterator, Optional
+from typing import Iterator, Optional, Type
 
 import logging
 
@@ -10,6 +10,8 @@ from sqlalchemy.engine import Engine
 from config import CONFIG
 
 _engine: Optional[Engine] = None
+_job_engine: Optional[Engine] = None
+_job_engine_url = ""
 
 
 def _build_mysql_url() -> str:
@@ -25,27 +27,59 @@ def _build_mysql_url() -> str:
     )
 
 
+def _create_engine(url: str) -> Engine:
+    logging.info(f"Creating engine for {url}")
+    if url.startswith("sqlite"):
+        # worker 与界面在不同线程中使用同一个 engine
+        return create_engine(url, echo=False, connect_args={"check_same_thread": False})
+    return create_engine(
+        url,
+        echo=False,  # 如需打印 SQL，可改为 True
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+
+
 def get_engine() -> Engine:
     """获取全局 Engine（惰性初始化，后续复用）。"""
     global _engine
     if _engine is None:
-        url = _build_mysql_url()
-        logging.info(f"Creating engine for {url}")
-        _engine = create_engine(
-            url,
-            echo=False,  # 如需打印 SQL，可改为 True
-            pool_pre_ping=True,
-            pool_recycle=1800,
-        )
+        _engine = _create_engine(_build_mysql_url())
     return _engine
 
 
+def set_engine(engine: Optional[Engine]) -> None:
+    """替换全局 Engine（如本地模拟使用 SQLite），传 None 则下次按配置重新创建。"""
+    global _engine
+    _engine = engine
+
+
+def get_job_engine() -> Engine:
+    """
+    抓取任务队列（scrape_job 表）使用的 Engine：配置了 CONFIG['JOB_DB_URL'] 时单独连接该库，
+    为空时与订单等业务表共用 get_engine()。
+    """
+    global _job_engine, _job_engine_url
+    url = str(CONFIG.get("JOB_DB_URL", "") or "").strip()
+    if not url:
+        return get_engine()
+    if _job_engine is None or _job_engine_url != url:
+        _job_engine = _create_engine(url)
+        _job_engine_url = url
+    return _job_engine
+
+
 def get_session() -> Session:
     """获取一个新的 Session，常用于 with 语法."""
     engine = get_engine()
     return Session(engine)
 
 
+def get_job_session() -> Session:
+    """获取任务队列库的 Session，见 get_job_engine()。"""
+    return Session(get_job_engine())
+
+
 def session_scope() -> Iterator[Session]:
     """
     提供一个简单的 session 上下文管理器生成器用法：
@@ -72,3 +106,14 @@ def init_db() -> None:
     """
     engine = get_engine()
     SQLModel.metadata.create_all(engine)
+
+
+def ensure_tables(*models: Type[SQLModel], engine: Optional[Engine] = None) -> None:
+    """
+    只创建指定模型对应的表（已存在则跳过），用于程序新增的表，
+    不影响业务库中已有的 order 等表：
+        ensure_tables(ScrapeJob, engine=get_job_engine())
+    engine 为空时使用 get_engine()。
+    """
+    engine = engine or get_engine()
+    SQLModel.metadata.create_all(engine, tables=[m.__table__ for m in models])
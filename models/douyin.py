@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any
+
+
+class DouyinVideoInfo(BaseModel):
+    """抖音作品页解析结果，字段名与原有结果字典保持一致"""
+
+    success: bool = True
+    error: str = ""
+    # 字段来源：router_data 表示来自 window._ROUTER_DATA，regex 表示整页正则兜底，none 表示页面无可用数据
+    source: str = "none"
+    author: str = "未知作者"
+    authorId: str = ""
+    publishTime: str = ""
+    likeCount: int = 0
+    commentCount: int = 0
+    shareCount: int = 0
+    playCount: int = 0
+    collectCount: int = 0
+    forwardCount: int = 0
+    description: str = "无描述"
+    videoUrl: Optional[str] = None
+    coverUrl: Optional[str] = None
+    videoId: str = ""
+    duration: int = 0
+    width: int = 0
+    height: int = 0
+    musicTitle: str = ""
+    musicAuthor: str = ""
+    musicUrl: str = ""
+    hashtags: List[str] = Field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为旧接口使用的字典：失败时只包含 success 与 error"""
+        if not self.success:
+            return {"success": False, "error": self.error}
+        return self.model_dump(exclude={"error"})
@@ -0,0 +1,22 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, String, BigInteger, Text
+
+
+class OrderLink(SQLModel, table=True):
+    """订单链接索引：从 order.params 提取的链接与作品ID，每个订单只解析一次"""
+
+    __tablename__ = "order_link"
+
+    order_id: int = Field(
+        sa_column=Column(BigInteger, primary_key=True, autoincrement=False),
+        description="订单ID（order.id）",
+    )
+    link: str = Field(sa_column=Column(Text, nullable=False), description="下单参数中的链接")
+    aweme_id: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(32), nullable=True),
+        description="作品ID，短链尚未展开时为空",
+    )
+    resolved_at: Optional[int] = Field(default=None, description="得到作品ID的时间(秒)")
+    created_at: int = Field(default=0, description="写入时间(秒)")
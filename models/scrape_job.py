@@ -0,0 +1,59 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, String, BigInteger, Text, Index
+
+# 任务状态
+JOB_PENDING = "pending"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class ScrapeJob(SQLModel, table=True):
+    """点赞数抓取任务：界面/自动导出入队，分布式 worker 租用后抓取并回写结果"""
+
+    __tablename__ = "scrape_job"
+    __table_args__ = (
+        Index("idx_scrape_job_status_lease", "status", "lease_until"),
+        Index("idx_scrape_job_batch", "batch_id", "status"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True, description="主键")
+    batch_id: str = Field(
+        sa_column=Column(String(36), nullable=False), description="批次ID（一次导出）"
+    )
+    seq: int = Field(default=0, description="批次内序号，对应订单列表下标")
+    link: str = Field(sa_column=Column(Text, nullable=False), description="订单链接")
+    aweme_id: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(32), nullable=True),
+        description="作品ID（本地已解析时填写）",
+    )
+    status: str = Field(
+        default=JOB_PENDING,
+        sa_column=Column(String(16), nullable=False, default=JOB_PENDING),
+        description="pending / leased / done / failed",
+    )
+    claims: int = Field(default=0, description="被租用的次数")
+    lease_owner: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(64), nullable=True),
+        description="当前租用的 worker",
+    )
+    lease_until: int = Field(
+        default=0,
+        sa_column=Column(BigInteger, nullable=False, default=0),
+        description="租约到期时间(秒)，到期未完成可被其他 worker 重新租用",
+    )
+    like_count: Optional[int] = Field(
+        default=None,
+        sa_column=Column(BigInteger, nullable=True),
+        description="抓取到的点赞数，失败为空",
+    )
+    error: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(255), nullable=True),
+        description="失败原因",
+    )
+    created_at: int = Field(default=0, description="入队时间(秒)")
+    finished_at: Optional[int] = Field(default=None, description="完成时间(秒)")
@@ -0,0 +1,8 @@
+"""
+本地模拟服务，用于在无网络环境下压测抓取与导出流程：
+- sim.douyin: v.douyin.com 短链跳转与作品页
+- sim.forward_proxy: 按 Host 转发的 HTTP 正向代理
+- sim.owlproxy: OwlProxy createProxy 接口
+- sim.ningmeng: 柠檬平台与云码接口
+- sim.driver: 启动以上服务并运行 batch_aweme_likes / 导出（python -m sim.driver --help）
+"""
@@ -0,0 +1,34 @@
+# 模拟服务的公共部分：延迟/错误率配置与 aiohttp 服务启动
+import asyncio
+import random
+from typing import Tuple
+from aiohttp import web
+
+
+class Behavior:
+    """
+    模拟服务的表现：
+    - latency / jitter: 每个请求的处理延迟（秒，正态分布，截断为非负）
+    - error_rate: 返回 5xx 的概率
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+    async def delay(self) -> None:
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+async def start_app(app: web.Application, host: str = "127.0.0.1", port: int = 0) -> Tuple[web.AppRunner, str]:
+    """在本机启动 app，port 为 0 时自动分配端口，返回 (runner, 基础地址)"""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_host, bound_port = runner.addresses[0][:2]
+    return runner, f"http://{bound_host}:{bound_port}"
@@ -0,0 +1,137 @@
+# 抖音模拟服务：v.douyin.com 短链跳转与 www.iesdouyin.com 作品页，按 Host 区分
+import collections
+import json
+import random
+import time
+import zlib
+from typing import Deque, Dict, Optional
+from aiohttp import web
+from sim.common import Behavior
+
+SHORT_HOST = "v.douyin.com"
+SHARE_HOST = "www.iesdouyin.com"
+
+_CAPTCHA_HTML = "<html><head><title>验证码中间页</title></head><body><div id='captcha'>请完成安全验证</div></body></html>"
+
+
+def short_code(aweme_id: str) -> str:
+    """作品ID对应的短链路径（可逆，便于驱动生成订单与校验结果）"""
+    return format(int(aweme_id), "x")
+
+
+def aweme_from_code(code: str) -> Optional[str]:
+    try:
+        return str(int(code, 16))
+    except ValueError:
+        return None
+
+
+def expected_like_count(aweme_id: str) -> int:
+    """模拟作品的点赞数，对同一作品固定不变"""
+    return zlib.crc32(aweme_id.encode()) % 50000
+
+
+class DouyinSim:
+    """
+    - 短链 GET http://v.douyin.com/<code>/ 302 跳转到 http://www.iesdouyin.com/share/video/<id>/
+    - 作品页返回含 window._ROUTER_DATA 的 HTML（可选 br/gzip 压缩，脚本后附带 padding_kb 的填充内容）
+    - 风控：block_rate 概率返回验证码页；同一代理（转发代理传入的 X-Sim-Proxy）
+      每秒请求超过 block_after_rps 时也返回验证码页，模拟突发流量触发风控
+    """
+
+    def __init__(self, behavior: Optional[Behavior] = None, block_rate: float = 0.0, block_after_rps: int = 0, padding_kb: int = 100):
+        self.behavior = behavior or Behavior()
+        self.block_rate = block_rate
+        self.block_after_rps = block_after_rps
+        self.padding = ("<div class='pad'>" + "x" * 1000 + "</div>") * padding_kb
+        self.stats: Dict[str, int] = collections.Counter()
+        self._recent: Dict[str, Deque[float]] = collections.defaultdict(collections.deque)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+        return app
+
+    def _over_rate(self, proxy: str) -> bool:
+        if self.block_after_rps <= 0:
+            return False
+        now = time.monotonic()
+        window = self._recent[proxy]
+        window.append(now)
+        while window and now - window[0] > 1.0:
+            window.popleft()
+        return len(window) > self.block_after_rps
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        await self.behavior.delay()
+        host = request.host.split(":")[0]
+        self.stats["requests"] += 1
+        if self.behavior.should_fail():
+            self.stats["errors"] += 1
+            return web.Response(status=random.choice((500, 502, 403)), text="error")
+        if host == SHORT_HOST:
+            return self._redirect(request)
+        return self._page(request)
+
+    def _redirect(self, request: web.Request) -> web.StreamResponse:
+        aweme_id = aweme_from_code(request.path.strip("/"))
+        if not aweme_id:
+            return web.Response(status=404, text="not found")
+        self.stats["redirects"] += 1
+        location = f"http://{SHARE_HOST}/share/video/{aweme_id}/?region=CN&from=web_code_link"
+        return web.Response(status=302, headers={"Location": location})
+
+    def _page(self, request: web.Request) -> web.StreamResponse:
+        parts = [p for p in request.path.split("/") if p]
+        if len(parts) < 3 or parts[0] != "share" or not parts[2].isdigit():
+            return web.Response(status=404, text="not found")
+        kind, aweme_id = parts[1], parts[2]
+        proxy = request.headers.get("X-Sim-Proxy", "")
+        if (self.block_rate > 0 and random.random() < self.block_rate) or self._over_rate(proxy):
+            self.stats["blocked"] += 1
+            return self._html(request, _CAPTCHA_HTML)
+        self.stats["pages"] += 1
+        return self._html(request, self._render(kind, aweme_id))
+
+    def _render(self, kind: str, aweme_id: str) -> str:
+        item = {
+            "aweme_id": aweme_id,
+            "desc": f"模拟作品 {aweme_id} #模拟",
+            "create_time": 1700000000,
+            "author": {"nickname": "模拟作者", "unique_id": "sim_author"},
+            "statistics": {
+                "digg_count": expected_like_count(aweme_id),
+                "comment_count": 12,
+                "share_count": 3,
+                "play_count": 0,
+                "collect_count": 5,
+                "forward_count": 0,
+            },
+            "video": {"play_addr": {"uri": f"v0{aweme_id}", "url_list": []}, "duration": 15000, "width": 720, "height": 1280},
+            "text_extra": [{"hashtag_name": "模拟"}],
+        }
+        router = {"loaderData": {f"{kind}_(id)/page": {"videoInfoRes": {"item_list": [item]}}}}
+        return (
+            "<!DOCTYPE html><html><head><title>抖音</title></head><body><div id='root'></div>"
+            f"<script>window._ROUTER_DATA = {json.dumps(router, ensure_ascii=False)}</script>"
+            f"{self.padding}</body></html>"
+        )
+
+    @staticmethod
+    def _html(request: web.Request, html: str) -> web.Response:
+        body = html.encode("utf-8")
+        accept = request.headers.get("Accept-Encoding", "")
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        if "br" in accept:
+            try:
+                import brotli
+
+                body = brotli.compress(body, quality=4)
+                headers["Content-Encoding"] = "br"
+            except ImportError:
+                pass
+        if "Content-Encoding" not in headers and "gzip" in accept:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+            headers["Content-Encoding"] = "gzip"
+        return web.Response(body=body, headers=headers)
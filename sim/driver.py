@@ -0,0 +1,231 @@
+# 本地模拟压测：启动抖音 / OwlProxy / 正向代理 / 柠檬模拟服务，对其运行 batch_aweme_likes 与导出
+# 用法：python -m sim.driver --orders 2000 --mode both --bad-proxy-rate 0.05 --block-rate 0.01
+# 所有配置修改只在内存中生效（CONFIG.override），不会写回 data/config.json；数据库使用临时 SQLite。
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import create_engine  # noqa: E402
+from config import CONFIG  # noqa: E402
+import db  # noqa: E402
+from models.order import Order  # noqa: E402
+from sim.common import Behavior, start_app  # noqa: E402
+from sim.douyin import DouyinSim, SHARE_HOST, SHORT_HOST, expected_like_count, short_code  # noqa: E402
+from sim.forward_proxy import ForwardProxySim  # noqa: E402
+from sim.ningmeng import NingMengSim  # noqa: E402
+from sim.owlproxy import OwlProxySim  # noqa: E402
+
+SIM_GOODS_ID = 990001
+SIM_GOODS_NAME = "模拟商品"
+_AWEME_BASE = 7_300_000_000_000_000_000
+
+
+def build_links(count: int, short_ratio: float, seed: int, offset: int = 0) -> List[Tuple[str, str]]:
+    """生成 (订单链接, 作品ID)：short_ratio 比例为 v.douyin.com 短链，其余为带作品ID的完整链接"""
+    rnd = random.Random(seed)
+    links = []
+    for n in range(count):
+        aweme_id = str(_AWEME_BASE + offset + n)
+        if rnd.random() < short_ratio:
+            links.append((f"http://{SHORT_HOST}/{short_code(aweme_id)}/", aweme_id))
+        else:
+            links.append((f"https://www.douyin.com/video/{aweme_id}", aweme_id))
+    return links
+
+
+async def start_services(args) -> Dict[str, Any]:
+    """启动所有模拟服务并把相关配置指向它们"""
+    douyin = DouyinSim(
+        Behavior(latency=args.latency, jitter=args.latency / 3, error_rate=args.error_rate),
+        block_rate=args.block_rate,
+        block_after_rps=args.block_after_rps,
+        padding_kb=args.padding_kb,
+    )
+    douyin_runner, douyin_base = await start_app(douyin.app())
+    proxy = ForwardProxySim(
+        {SHORT_HOST: douyin_base, SHARE_HOST: douyin_base},
+        bad_proxy_rate=args.bad_proxy_rate,
+        hang_seconds=args.hang_seconds,
+    )
+    proxy_runner, proxy_base = await start_app(proxy.app())
+    proxy_host, proxy_port = proxy_base.rsplit("//", 1)[1].split(":")
+    owl = OwlProxySim(proxy_host, int(proxy_port), Behavior(latency=args.owl_latency, jitter=args.owl_latency / 5))
+    owl_runner, owl_base = await start_app(owl.app())
+    ningmeng = NingMengSim()
+    ningmeng_runner, ningmeng_base = await start_app(ningmeng.app())
+
+    CONFIG.override("OWLPROXY_API_BASE", owl_base)
+    CONFIG.override("NINGMENG_BASE_URL", ningmeng_base)
+    CONFIG.override("YUNMA_API_URL", f"{ningmeng_base}/api/YmServer/customApi")
+    CONFIG.override("DOUYIN_SHARE_BASE", f"http://{SHARE_HOST}")
+    # 分片子进程会从磁盘重新读取配置，看不到上面的内存覆盖
+    CONFIG.override("SCRAPE_SHARDS", 1)
+    CONFIG.override("SCRAPE_MODE", "local")
+    if args.rate_limits is not None:
+        CONFIG.override("HOST_RATE_LIMITS", json.loads(args.rate_limits))
+    return {
+        "douyin": douyin,
+        "proxy": proxy,
+        "owl": owl,
+        "ningmeng": ningmeng,
+        "runners": [douyin_runner, proxy_runner, owl_runner, ningmeng_runner],
+    }
+
+
+async def run_batch(links: List[Tuple[str, str]]) -> Dict[str, Any]:
+    from utils.douyin import batch_aweme_likes
+    from utils.douyin_link import LinkNormalizer
+
+    orders = [{"link": link} for link, _ in links]
+    LinkNormalizer().resolve_orders(orders)
+    start = time.perf_counter()
+    results = await batch_aweme_likes(orders)
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results if r == float("inf"))
+    wrong = sum(1 for (_, aweme_id), r in zip(links, results) if r != float("inf") and r != expected_like_count(aweme_id))
+    return {
+        "links": len(links),
+        "seconds": round(elapsed, 2),
+        "links_per_sec": round(len(links) / elapsed, 1) if elapsed else None,
+        "failed": failed,
+        "wrong": wrong,
+    }
+
+
+def seed_orders(links: List[Tuple[str, str]], deficient_ratio: float, seed: int) -> int:
+    """写入已完成订单，tb_time 落在当前导出窗口内；返回应导出的缺失订单数"""
+    rnd = random.Random(seed)
+    now = int(time.time())
+    start_ts = now - int(CONFIG["EXPORT_TIME_OFFSET"])
+    interval = int(CONFIG["EXPORT_TIME_INTERVAL"])
+    expected_deficient = 0
+    with db.get_session() as s:
+        for n, (link, aweme_id) in enumerate(links):
+            likes = expected_like_count(aweme_id)
+            order_num = 100
+            missing = rnd.randint(1, 20) if rnd.random() < deficient_ratio else 0
+            expected_deficient += 1 if missing else 0
+            s.add(
+                Order(
+                    create_at=now - interval,
+                    user_name="sim",
+                    user_id=1,
+                    goods_id=SIM_GOODS_ID,
+                    goods_name=SIM_GOODS_NAME,
+                    order_s_n=f"SIM{n:08d}",
+                    order_status=4,
+                    order_num=order_num,
+                    start_num=likes - order_num + missing,
+                    current_num=0,
+                    params=json.dumps({"link": link}),
+                    tb_time=start_ts + 1 + rnd.randrange(max(1, interval - 2)),
+                )
+            )
+        s.commit()
+    return expected_deficient
+
+
+async def run_export(links: List[Tuple[str, str]], deficient_ratio: float, seed: int, out_dir: str, refund: bool) -> Dict[str, Any]:
+    import controllers.order_controller as order_controller
+
+    CONFIG.override("MONITORED_GOOD_IDS", [SIM_GOODS_ID])
+    expected = seed_orders(links, deficient_ratio, seed)
+    # 导出文件写到临时目录
+    order_controller.EXPORT_DIR = out_dir
+    start = time.perf_counter()
+    by_goods = await order_controller.export_deficiency_orders_links()
+    elapsed = time.perf_counter() - start
+    rows = 0
+    for path in glob.glob(os.path.join(out_dir, "*.csv")):
+        with open(path, encoding="utf-8-sig") as f:
+            rows += sum(1 for _ in csv.DictReader(f))
+    result = {
+        "orders": len(links),
+        "seconds": round(elapsed, 2),
+        "expected_deficient": expected,
+        "exported_rows": rows,
+    }
+    if refund:
+        from utils.ningmeng import NingMengAPI
+
+        api = NingMengAPI(str(CONFIG["NINGMENG_USERNAME"]), str(CONFIG["NINGMENG_ENCRYPTION_KEY"]), str(CONFIG["NINGMENG_ENCRYPTION_IV"]))
+        submitted = 0
+        for goods_links in by_goods.values():
+            if goods_links:
+                await asyncio.to_thread(api.refund_orders, goods_links)
+                submitted += len(goods_links)
+        result["refund_submitted"] = submitted
+    return result
+
+
+async def main_async(args) -> None:
+    from utils.short_url_cache import short_url_cache
+
+    # 模拟链接不写入正式的短链缓存文件
+    short_url_cache.persist = False
+    tmp_dir = tempfile.mkdtemp(prefix="douyin_sim_")
+    db.set_engine(create_engine(f"sqlite:///{os.path.join(tmp_dir, 'sim.db')}", connect_args={"check_same_thread": False}))
+    db.ensure_tables(Order)
+
+    services = await start_services(args)
+    report: Dict[str, Any] = {}
+    try:
+        links = build_links(args.orders, args.short_ratio, args.seed)
+        if args.mode in ("batch", "both"):
+            report["batch"] = await run_batch(links)
+        if args.mode in ("export", "both"):
+            # 导出使用另一批作品，避免直接命中上一步的点赞数缓存
+            export_links = build_links(args.orders, args.short_ratio, args.seed + 1, offset=args.orders)
+            report["export"] = await run_export(export_links, args.deficient_ratio, args.seed, os.path.join(tmp_dir, "exported"), args.refund)
+    finally:
+        for runner in services["runners"]:
+            await runner.cleanup()
+        db.set_engine(None)
+
+    report["douyin"] = dict(services["douyin"].stats)
+    report["proxy"] = services["proxy"].stats
+    report["owlproxy"] = services["owl"].stats
+    report["ningmeng"] = services["ningmeng"].stats
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.metrics:
+        from utils.metrics import render_metrics
+
+        print(render_metrics())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="抓取与导出流程的本地模拟压测")
+    parser.add_argument("--orders", type=int, default=500, help="订单/链接数量")
+    parser.add_argument("--mode", choices=("batch", "export", "both"), default="both")
+    parser.add_argument("--short-ratio", type=float, default=0.5, help="短链比例")
+    parser.add_argument("--deficient-ratio", type=float, default=0.2, help="导出时数量缺失订单比例")
+    parser.add_argument("--latency", type=float, default=0.08, help="抖音页面平均延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="抖音返回 5xx/403 的概率")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="随机返回验证码页的概率")
+    parser.add_argument("--block-after-rps", type=int, default=0, help="单个代理每秒请求超过该值时返回验证码页，0 不限制")
+    parser.add_argument("--bad-proxy-rate", type=float, default=0.02, help="坏代理（挂起后 502）比例")
+    parser.add_argument("--hang-seconds", type=float, default=30.0, help="坏代理挂起时长")
+    parser.add_argument("--owl-latency", type=float, default=0.5, help="createProxy 接口平均延迟（秒）")
+    parser.add_argument("--padding-kb", type=int, default=100, help="作品页 _ROUTER_DATA 之后的填充大小（KB）")
+    parser.add_argument("--rate-limits", default=None, help='覆盖 HOST_RATE_LIMITS，JSON，如 \'{}\' 表示不限速')
+    parser.add_argument("--refund", action="store_true", help="导出后向柠檬模拟服务提交退款")
+    parser.add_argument("--metrics", action="store_true", help="结束后输出 Prometheus 指标")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# HTTP 正向代理模拟：按 Host 把绝对地址请求转发到本地模拟服务，模拟代理本身的延迟与故障
+import asyncio
+import base64
+import random
+import zlib
+from typing import Dict, Optional
+import aiohttp
+from aiohttp import web
+from sim.common import Behavior
+
+# 逐跳头部不转发
+_HOP_HEADERS = {"proxy-authorization", "proxy-connection", "connection", "keep-alive", "transfer-encoding", "te", "upgrade"}
+
+
+class ForwardProxySim:
+    """
+    - routes: {"v.douyin.com": "http://127.0.0.1:xxxx", ...}，未配置的 Host 返回 502
+    - 只支持 http 绝对地址请求（GET http://host/path），CONNECT 返回 405
+    - bad_proxy_rate: 这部分代理账号（按用户名固定）每次都挂起 hang_seconds 秒后返回 502，模拟坏代理
+    - 转发时附带 X-Sim-Proxy: <代理用户名>，供下游按代理做风控
+    """
+
+    def __init__(self, routes: Dict[str, str], behavior: Optional[Behavior] = None, bad_proxy_rate: float = 0.0, hang_seconds: float = 30.0):
+        self.routes = routes
+        self.behavior = behavior or Behavior(latency=0.01, jitter=0.005)
+        self.bad_proxy_rate = bad_proxy_rate
+        self.hang_seconds = hang_seconds
+        self.stats: Dict[str, int] = {"requests": 0, "bad_proxy": 0, "errors": 0}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self._session = aiohttp.ClientSession(auto_decompress=False, connector=aiohttp.TCPConnector(limit=0))
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    @staticmethod
+    def _proxy_user(request: web.Request) -> str:
+        auth = request.headers.get("Proxy-Authorization", "")
+        if not auth.lower().startswith("basic "):
+            return ""
+        try:
+            return base64.b64decode(auth[6:]).decode().split(":", 1)[0]
+        except Exception:  # noqa: BLE001
+            return ""
+
+    def is_bad(self, user: str) -> bool:
+        return self.bad_proxy_rate > 0 and zlib.crc32(user.encode()) % 1000 < self.bad_proxy_rate * 1000
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        if request.method == "CONNECT":
+            return web.Response(status=405, text="CONNECT not supported by simulator")
+        self.stats["requests"] += 1
+        user = self._proxy_user(request)
+        if self.is_bad(user):
+            self.stats["bad_proxy"] += 1
+            await asyncio.sleep(self.hang_seconds)
+            return web.Response(status=502, text="bad proxy")
+        await self.behavior.delay()
+        if self.behavior.should_fail():
+            self.stats["errors"] += 1
+            return web.Response(status=random.choice((502, 504)), text="proxy error")
+        upstream = self.routes.get(request.url.host or request.host.split(":")[0])
+        if not upstream:
+            return web.Response(status=502, text=f"no route for {request.host}")
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS}
+        headers["X-Sim-Proxy"] = user
+        async with self._session.request(
+            request.method,
+            f"{upstream}{request.rel_url.path_qs}",
+            headers=headers,
+            data=await request.read(),
+            allow_redirects=False,
+        ) as resp:
+            body = await resp.read()
+            out_headers = {k: v for k, v in resp.headers.items() if k.lower() not in _HOP_HEADERS and k.lower() != "content-length"}
+            return web.Response(status=resp.status, body=body, headers=out_headers)
@@ -0,0 +1,96 @@
+# 柠檬平台与云码打码接口模拟：验证码、登录、退款列表与提交退款
+import base64
+import random
+import secrets
+import time
+from typing import Dict, List, Optional
+from aiohttp import web
+from sim.common import Behavior
+
+CAPTCHA_TEXT = "8888"
+
+
+class NingMengSim:
+    """
+    - POST /web/captcha/info      返回 base64 验证码图片与 token
+    - POST /web/user/login        验证码正确时设置 session_id cookie，错误返回 status_code 400
+    - POST /web/refund/list/partner  分页返回已提交的退款记录
+    - POST /web/refund/save/partner  记录提交的订单链接
+    - POST /api/YmServer/customApi   云码识别，固定返回正确验证码
+    captcha_error_rate 为登录时验证码判错的概率。
+    """
+
+    def __init__(self, behavior: Optional[Behavior] = None, captcha_error_rate: float = 0.0):
+        self.behavior = behavior or Behavior(latency=0.05, jitter=0.01)
+        self.captcha_error_rate = captcha_error_rate
+        self.sessions: set = set()
+        self.refunds: List[Dict] = []
+        self.stats: Dict[str, int] = {"logins": 0, "refund_calls": 0}
+        self._tokens: set = set()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/web/captcha/info", self.captcha)
+        app.router.add_post("/web/user/login", self.login)
+        app.router.add_post("/web/refund/list/partner", self.refund_list)
+        app.router.add_post("/web/refund/save/partner", self.refund_save)
+        app.router.add_post("/api/YmServer/customApi", self.yunma)
+        return app
+
+    async def captcha(self, request: web.Request) -> web.Response:
+        await self.behavior.delay()
+        token = secrets.token_hex(8)
+        self._tokens.add(token)
+        image = base64.b64encode(f"captcha:{CAPTCHA_TEXT}".encode()).decode()
+        return web.json_response({"status_code": 200, "data": {"captcha": image, "token": token}})
+
+    async def login(self, request: web.Request) -> web.Response:
+        await self.behavior.delay()
+        body = await request.json()
+        token = body.get("captcha_token")
+        ok = token in self._tokens and body.get("captcha") == CAPTCHA_TEXT and not self.behavior.should_fail()
+        self._tokens.discard(token)
+        if ok and self.captcha_error_rate > 0:
+            ok = random.random() >= self.captcha_error_rate
+        if not ok:
+            return web.json_response({"status_code": 400, "msg": "验证码错误"})
+        self.stats["logins"] += 1
+        session_id = secrets.token_hex(16)
+        self.sessions.add(session_id)
+        resp = web.json_response({"status_code": 200, "msg": "ok"})
+        resp.set_cookie("session_id", session_id)
+        return resp
+
+    def _authorized(self, request: web.Request) -> bool:
+        return request.cookies.get("session_id") in self.sessions
+
+    async def refund_list(self, request: web.Request) -> web.Response:
+        await self.behavior.delay()
+        if not self._authorized(request):
+            return web.json_response({"status_code": 401, "msg": "未登录"})
+        body = await request.json()
+        page, size = int(body.get("page", 1)), int(body.get("page_size", 10))
+        rows = self.refunds
+        if body.get("order_link"):
+            rows = [r for r in rows if r["order_link"] == body["order_link"]]
+        return web.json_response({"status_code": 200, "data": {"total": len(rows), "list": rows[(page - 1) * size: page * size]}})
+
+    async def refund_save(self, request: web.Request) -> web.Response:
+        await self.behavior.delay()
+        if not self._authorized(request):
+            return web.json_response({"status_code": 401, "msg": "未登录", "message": "未登录"})
+        body = await request.json()
+        links = body.get("order_link") or []
+        now = int(time.time())
+        self.refunds.extend({"order_link": link, "created_at": now} for link in links)
+        self.stats["refund_calls"] += 1
+        return web.json_response({"status_code": 200, "msg": "ok", "message": f"已提交 {len(links)} 条"})
+
+    async def yunma(self, request: web.Request) -> web.Response:
+        await self.behavior.delay()
+        body = await request.json()
+        try:
+            text = base64.b64decode(body.get("image", "")).decode().split(":", 1)[1]
+        except Exception:  # noqa: BLE001
+            text = ""
+        return web.json_response({"code": 10000, "data": {"code": 0, "data": text}})
@@ -0,0 +1,54 @@
+# OwlProxy 开放接口模拟：createProxy 返回指向本地正向代理的动态代理账号
+import itertools
+import time
+from typing import Dict, Optional
+from aiohttp import web
+from sim.common import Behavior
+
+
+class OwlProxySim:
+    """
+    POST /owlproxy/api/openApi/vcDynamicGood/createProxy
+    - 每次最多创建 50 个（与真实接口一致，超过返回错误码）
+    - 返回的 proxyHost/proxyPort 为本地正向代理，userName 各不相同
+    不校验签名，只检查请求头是否齐全。
+    """
+
+    CREATE_PATH = "/owlproxy/api/openApi/vcDynamicGood/createProxy"
+
+    def __init__(self, proxy_host: str, proxy_port: int, behavior: Optional[Behavior] = None):
+        self.proxy_host = proxy_host
+        self.proxy_port = proxy_port
+        self.behavior = behavior or Behavior(latency=0.5, jitter=0.1)
+        self.stats: Dict[str, int] = {"calls": 0, "created": 0, "errors": 0}
+        self._ids = itertools.count(1)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.CREATE_PATH, self.create_proxy)
+        return app
+
+    async def create_proxy(self, request: web.Request) -> web.Response:
+        self.stats["calls"] += 1
+        await self.behavior.delay()
+        if self.behavior.should_fail():
+            self.stats["errors"] += 1
+            return web.Response(status=500, text="internal error")
+        if "authorization" not in request.headers or "x-date" not in request.headers:
+            return web.json_response({"code": 401, "msg": "missing signature", "ts": int(time.time()), "data": None})
+        body = await request.json()
+        num = int(body.get("goodNum", 0))
+        if num <= 0 or num > 50:
+            return web.json_response({"code": 400, "msg": "goodNum must be 1-50", "ts": int(time.time()), "data": []})
+        data = [
+            {
+                "proxyHost": self.proxy_host,
+                "proxyPort": self.proxy_port,
+                "userName": f"sim{next(self._ids):06d}",
+                "password": "simpass",
+                "proxyType": body.get("proxyType") or "http",
+            }
+            for _ in range(num)
+        ]
+        self.stats["created"] += num
+        return web.json_response({"code": 0, "msg": "success", "ts": int(time.time()), "data": data})
@@ -1,12 +1,40 @@
 from typing import Any, Dict, List
 import asyncio
+import time
 from config import CONFIG
-from controllers.order_controller import export_deficiency_orders_links
+from controllers.order_controller import export_deficiency_orders_links, count_finished_orders_for_monitor
 import threading
 import logging
+from utils.owlproxy import proxy_pool
 from utils.common import play_sound
 # from utils.ningmeng import ningmeng
 
+async def _prewarm_proxies(lead: int) -> None:
+    """统计 lead 秒后导出窗口内的订单数，提前补建足够的代理，导出开始时直接租用"""
+    try:
+        count = await asyncio.to_thread(count_finished_orders_for_monitor, int(time.time()) + lead)
+        if count > 0:
+            await proxy_pool.prewarm(count, lead)
+    except Exception as e:  # noqa: BLE001
+        logging.error(f"[自动导出] 代理预热失败: {e}")
+
+
+async def _sleep_until_next_export(interval: int) -> None:
+    """
+    等待下一次导出；开启 PROXY_PREWARM_LEAD（秒）时，在导出前 lead 秒预热代理。
+    分布式模式下代理由 worker 自行租用，不预热。
+    """
+    lead = int(CONFIG.get("PROXY_PREWARM_LEAD", 60) or 0)
+    distributed = str(CONFIG.get("SCRAPE_MODE", "local")) == "distributed"
+    if lead <= 0 or lead >= interval or distributed:
+        await asyncio.sleep(interval)
+        return
+    await asyncio.sleep(interval - lead)
+    started = time.monotonic()
+    await _prewarm_proxies(lead)
+    await asyncio.sleep(max(0.0, lead - (time.monotonic() - started)))
+
+
 def auto_export_deficiency_orders_links():
     """
     如果配置开启自动导出功能，则自动导出数量缺失的订单链接
@@ -16,10 +44,13 @@ def auto_export_deficiency_orders_links():
         while True:
             if CONFIG["IS_AUTO_EXPORT"] == "1":
                 deficiency_links_by_goods = await export_deficiency_orders_links()
-                # 导出后播放声音已导出
-                logging.info("[自动导出] 已导出数量缺失的订单链接")
-                # 播放声音提示
-                play_sound()
+                if deficiency_links_by_goods is None:
+                    logging.info("[自动导出] 已有导出在进行，本次跳过")
+                else:
+                    # 导出后播放声音已导出
+                    logging.info("[自动导出] 已导出数量缺失的订单链接")
+                    # 播放声音提示
+                    play_sound()
                 # for goods_name in CONFIG['NINGMENG_GOODS_NAMES']:
                 #     links = deficiency_links_by_goods.get(goods_name, [])
                 #     if links:
@@ -32,9 +63,9 @@ def auto_export_deficiency_orders_links():
                 #                 logging.error(f"[柠檬] 为商品 {goods_name} 提交数量缺失订单退款申请失败，订单链接：{links}，错误信息：{e}") 
                 #                 continue
                 interval = int(CONFIG["EXPORT_TIME_INTERVAL"])  # type: ignore
+                await _sleep_until_next_export(interval)
             else:
-                interval = 60
-            await asyncio.sleep(interval)  # type: ignore
+                await asyncio.sleep(60)
 
     threading.Thread(target=lambda: asyncio.run(_runner()), daemon=True).start()
     
\ No newline at end of file
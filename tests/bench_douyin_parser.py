@@ -0,0 +1,72 @@
+"""
+解析器离线基准：
+    python tests/bench_douyin_parser.py [-n 200] [页面文件...]
+对 fixtures/douyin 下的页面反复解析，输出每个页面的 pages/sec 与单字段提取耗时（微秒）。
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.douyin_parser import FIELD_EXTRACTORS, PageDoc, decode_html, parse_video_html
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "douyin")
+
+
+def _load_pages(names):
+    if not names:
+        names = sorted(n for n in os.listdir(FIXTURE_DIR) if n.endswith(".html"))
+    pages = []
+    for name in names:
+        path = name if os.path.isfile(name) else os.path.join(FIXTURE_DIR, name)
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def bench_page(raw: bytes, rounds: int):
+    """返回 (pages/sec, {阶段: 平均微秒})"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        parse_video_html(raw)
+    pages_per_sec = rounds / (time.perf_counter() - start)
+
+    costs = {"decode": 0.0, "router_data": 0.0}
+    costs.update({name: 0.0 for name, _ in FIELD_EXTRACTORS})
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        html = decode_html(raw)
+        t1 = time.perf_counter()
+        doc = PageDoc(html)
+        t2 = time.perf_counter()
+        costs["decode"] += t1 - t0
+        costs["router_data"] += t2 - t1
+        for name, extractor in FIELD_EXTRACTORS:
+            t = time.perf_counter()
+            extractor(doc)
+            costs[name] += time.perf_counter() - t
+    return pages_per_sec, {k: v / rounds * 1e6 for k, v in costs.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抖音作品页解析基准")
+    parser.add_argument("-n", "--rounds", type=int, default=200, help="每个页面的解析次数")
+    parser.add_argument("pages", nargs="*", help="页面文件，默认使用 fixtures/douyin 下全部页面")
+    args = parser.parse_args()
+
+    total_pages = 0
+    total_time = 0.0
+    for name, raw in _load_pages(args.pages):
+        pps, costs = bench_page(raw, args.rounds)
+        total_pages += args.rounds
+        total_time += args.rounds / pps
+        print(f"{name:<24} {len(raw) / 1024:8.1f} KiB {pps:10.1f} pages/sec")
+        for stage, us in costs.items():
+            print(f"    {stage:<14} {us:10.1f} us")
+    if total_time:
+        print(f"{'TOTAL':<24} {'':>12} {total_pages / total_time:10.1f} pages/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import douyin
+from utils.concurrency import AIMDLimiter
+
+
+class TestAIMDLimiter(unittest.TestCase):
+    def test_additive_increase_and_multiplicative_decrease(self):
+        async def run():
+            limiter = AIMDLimiter(max_limit=20, initial=4)
+            for _ in range(8):
+                await limiter.acquire()
+                await limiter.release(0.1)
+            grown = limiter.current
+            await limiter.acquire()
+            await limiter.release(0.1, "timeout")
+            return grown, limiter.current
+
+        grown, reduced = asyncio.run(run())
+        self.assertGreater(grown, 4)
+        self.assertEqual(reduced, grown // 2)
+
+
+class TestRememberedLimit(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(douyin, "_adaptive_last_limit", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, count, io_workers):
+        async def ok(session, link, proxies, tried, aweme_id=None, hedge=None, **kwargs):
+            return 1
+
+        async def run():
+            orders = [{"link": str(i)} for i in range(count)]
+            max_workers = min(io_workers, count)
+            return [x async for x in douyin._iter_pending_likes(orders, list(range(count)), [object()], max_workers, 1, True)]
+
+        config = {"IO_WORKERS_NUM": io_workers, "ADAPTIVE_INITIAL_WORKERS": 4, "HEDGE_ENABLED": "0"}
+        with mock.patch.object(douyin, "_fetch_like_hedged", ok), \
+                mock.patch.object(douyin.CONFIG, "get", lambda key, default=None: config.get(key, default)):
+            asyncio.run(run())
+
+    def test_small_run_does_not_lower_next_start(self):
+        self._run(40, io_workers=10)
+        remembered = douyin._adaptive_last_limit
+        self.assertIsNotNone(remembered)
+        self._run(2, io_workers=10)
+        self.assertEqual(douyin._adaptive_last_limit, remembered)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.douyin_link import LinkNormalizer, canonical_share_url, extract_aweme_id
+
+
+class TestLinkNormalizer(unittest.TestCase):
+    def test_extract_aweme_id(self):
+        self.assertEqual(extract_aweme_id("https://www.douyin.com/video/7436011223344556677"), "7436011223344556677")
+        self.assertEqual(extract_aweme_id("https://www.douyin.com/user/self?modal_id=7436011223344556677"), "7436011223344556677")
+        self.assertIsNone(extract_aweme_id("https://v.douyin.com/iRNBho6u/"))
+
+    def test_resolve_counts(self):
+        normalizer = LinkNormalizer()
+        orders = [
+            {"link": "https://www.douyin.com/video/7436011223344556677"},
+            {"link": "https://www.douyin.com/note/7437998877665544332"},
+            {"link": "https://v.douyin.com/zzzz-not-cached-zzzz/"},
+            {"link": ""},
+        ]
+        normalizer.resolve_orders(orders)
+        self.assertEqual([o["aweme_id"] for o in orders], ["7436011223344556677", "7437998877665544332", None, None])
+        self.assertEqual(normalizer.offline, 2)
+        self.assertEqual(normalizer.network, 2)
+
+    def test_canonical_share_url(self):
+        self.assertEqual(canonical_share_url("1", "https://www.douyin.com/note/1"), "https://www.iesdouyin.com/share/note/1/")
+        self.assertEqual(canonical_share_url("1"), "https://www.iesdouyin.com/share/video/1/")
+
+
+if __name__ == '__main__':
+    unittest.main()
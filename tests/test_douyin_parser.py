@@ -0,0 +1,36 @@
+import unittest
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.douyin_parser import parse_video_html
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "douyin")
+
+
+class TestDouyinParser(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(FIXTURE_DIR, "expected.json"), "r", encoding="utf-8") as f:
+            self.expected = json.load(f)
+
+    def test_corpus(self):
+        for name, fields in self.expected.items():
+            with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+                result = parse_video_html(f.read(), "fallback-id").to_dict()
+            for key, value in fields.items():
+                with self.subTest(page=name, field=key):
+                    self.assertEqual(result.get(key), value)
+
+    def test_str_and_bytes_equal(self):
+        with open(os.path.join(FIXTURE_DIR, "video_router.html"), "rb") as f:
+            raw = f.read()
+        self.assertEqual(parse_video_html(raw).to_dict(), parse_video_html(raw.decode("utf-8")).to_dict())
+
+    def test_fallback_video_id(self):
+        result = parse_video_html(b"<html></html>", "7436011223344556677")
+        self.assertEqual(result.videoId, "7436011223344556677")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from decimal import Decimal
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import create_engine
+
+import db
+from config import CONFIG
+from controllers import order_controller
+from models.order import Order
+from utils.export_checkpoint import ExportCheckpoint
+
+GOODS_ID = 990002
+
+
+class TestExportCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.path = os.path.join(self.tmp_dir, "checkpoint.json")
+
+    def test_done_ids_survive_reload(self):
+        cp = ExportCheckpoint(self.path)
+        cp.mark_done(1)
+        cp.mark_done(2)
+        self.assertEqual(ExportCheckpoint(self.path).done_ids, {1, 2})
+
+    def test_commit_keeps_only_remaining_done_ids(self):
+        cp = ExportCheckpoint(self.path)
+        for order_id in (1, 2, 3):
+            cp.mark_done(order_id)
+        cp.commit((100, 1), remaining=[3, 9])
+        reloaded = ExportCheckpoint(self.path)
+        self.assertEqual(reloaded.watermark, (100, 1))
+        self.assertEqual(reloaded.done_ids, {3})
+        cp.commit((200, 3))
+        self.assertEqual(ExportCheckpoint(self.path).done_ids, set())
+
+    def test_failures_survive_reload_and_are_pruned_on_commit(self):
+        cp = ExportCheckpoint(self.path)
+        self.assertEqual(cp.mark_failed(4), 1)
+        self.assertEqual(cp.mark_failed(4), 2)
+        cp.mark_failed(5)
+        self.assertEqual(ExportCheckpoint(self.path).failures, {4: 2, 5: 1})
+        cp.commit((100, 4), remaining=[5])
+        self.assertEqual(ExportCheckpoint(self.path).failures, {5: 1})
+        cp.mark_done(5)
+        cp.commit((100, 4), remaining=[5])
+        self.assertEqual(ExportCheckpoint(self.path).failures, {})
+        self.assertFalse(os.path.exists(cp.failed_path))
+
+    def test_watermark_never_moves_back(self):
+        cp = ExportCheckpoint(self.path)
+        cp.commit((200, 1))
+        cp.commit((100, 5))
+        self.assertEqual(ExportCheckpoint(self.path).watermark, (200, 1))
+
+
+def _order(order_id, tb_time):
+    return Order(
+        id=order_id,
+        create_at=tb_time,
+        user_name="t",
+        user_id=1,
+        goods_id=GOODS_ID,
+        goods_name="t",
+        order_s_n=f"T{order_id}",
+        order_status=4,
+        order_num=100,
+        current_num=0,
+        start_num=0,
+        order_amount=Decimal("10"),
+        params=json.dumps({"link": f"https://www.douyin.com/video/73000000000000000{order_id:02d}"}),
+        tb_time=tb_time,
+    )
+
+
+class TestWatermarkExport(unittest.TestCase):
+    """增量导出：失败或中断后重跑，只处理未完成的订单，水位线不越过未完成的订单"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        db.set_engine(create_engine(f"sqlite:///{os.path.join(self.tmp_dir, 'orders.db')}"))
+        self.addCleanup(db.set_engine, None)
+        db.ensure_tables(Order)
+
+        original = CONFIG.get("MONITORED_GOOD_IDS")
+        CONFIG.override("MONITORED_GOOD_IDS", [GOODS_ID])
+        self.addCleanup(CONFIG.override, "MONITORED_GOOD_IDS", original)
+        start_ts, _ = order_controller._monitor_window(int(time.time()))
+        self.tb = {1: start_ts + 10, 2: start_ts + 20, 3: start_ts + 30}
+        with db.get_session() as s:
+            s.add_all([_order(order_id, tb) for order_id, tb in self.tb.items()])
+            s.commit()
+
+        self.checkpoint_path = os.path.join(self.tmp_dir, "checkpoint.json")
+        self.checkpoint = ExportCheckpoint(self.checkpoint_path)
+        for target, value in (
+            ("EXPORT_DIR", os.path.join(self.tmp_dir, "export")),
+            ("export_checkpoint", self.checkpoint),
+            ("_watermark_enabled", lambda: True),
+        ):
+            patcher = mock.patch.object(order_controller, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _export(self, failing=(), crash_after=None):
+        """返回本次抓取的订单ID；failing 中的订单抓取失败，crash_after 个订单后模拟进程中断"""
+        scraped = []
+        self.result = None
+
+        async def fake_likes(orders):
+            for o in sorted(orders, key=lambda o: o["id"]):
+                if crash_after is not None and len(scraped) >= crash_after:
+                    raise RuntimeError("crash")
+                scraped.append(o["id"])
+                yield o, float("inf") if o["id"] in failing else 100
+
+        with mock.patch.object(order_controller, "iter_aweme_likes", fake_likes):
+            try:
+                self.result = asyncio.run(order_controller.export_deficiency_orders_links())
+            except RuntimeError:
+                pass
+        return scraped
+
+    def _reload(self):
+        # 模拟重启：从磁盘重新读取断点
+        self.checkpoint = ExportCheckpoint(self.checkpoint_path)
+        patcher = mock.patch.object(order_controller, "export_checkpoint", self.checkpoint)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failed_order_holds_the_watermark_and_is_retried(self):
+        self.assertEqual(self._export(failing={2}), [1, 2, 3])
+        self.assertEqual(self.checkpoint.watermark, (self.tb[1], 1))
+        self.assertEqual(self.checkpoint.done_ids, {3})
+
+        self._reload()
+        self.assertEqual(self._export(), [2])
+        self.assertEqual(self.checkpoint.watermark, (self.tb[3], 3))
+        self.assertEqual(self.checkpoint.done_ids, set())
+
+    def test_resume_after_crash_with_a_failed_order(self):
+        self.assertEqual(self._export(failing={1}, crash_after=2), [1, 2])
+        self.assertIsNone(self.checkpoint.watermark)
+        self.assertEqual(self.checkpoint.done_ids, {2})
+
+        self._reload()
+        self.assertEqual(self.checkpoint.done_ids, {2})
+        self.assertEqual(self._export(), [1, 3])
+        self.assertEqual(self.checkpoint.watermark, (self.tb[3], 3))
+        self.assertEqual(self.checkpoint.done_ids, set())
+
+    def test_first_run_commits_the_window_floor(self):
+        start_ts, _ = order_controller._monitor_window(int(time.time()))
+        self.assertEqual(self._export(failing={1}), [1, 2, 3])
+        # 第一个订单就失败时水位线停在时间窗口下界，而不是一直为空
+        floor_ts, floor_id = self.checkpoint.watermark
+        self.assertEqual(floor_id, 0)
+        self.assertTrue(start_ts - 1 <= floor_ts < self.tb[1])
+        self.assertEqual(self.checkpoint.done_ids, {2, 3})
+
+        # 窗口之后滑过订单 1 也仍从已提交的下界查询
+        with mock.patch.object(order_controller.time, "time", return_value=time.time() + 3600):
+            self.assertEqual(self._export(), [1])
+        self.assertEqual(self.checkpoint.watermark, (self.tb[3], 3))
+
+    def test_order_failing_every_run_is_skipped(self):
+        original = CONFIG.get("EXPORT_MAX_FAILED_RUNS")
+        CONFIG.override("EXPORT_MAX_FAILED_RUNS", 2)
+        self.addCleanup(CONFIG.override, "EXPORT_MAX_FAILED_RUNS", original)
+
+        self.assertEqual(self._export(failing={2}), [1, 2, 3])
+        self.assertEqual(self.checkpoint.watermark, (self.tb[1], 1))
+        self.assertEqual(self.checkpoint.failures, {2: 1})
+
+        self._reload()
+        with self.assertLogs(level="WARNING") as logs:
+            self.assertEqual(self._export(failing={2}), [2])
+        self.assertTrue(any("跳过该订单" in line for line in logs.output))
+        self.assertEqual(self.checkpoint.watermark, (self.tb[3], 3))
+        self.assertEqual(self.checkpoint.done_ids, set())
+        self.assertEqual(self.checkpoint.failures, {})
+
+    def test_busy_lock_returns_none(self):
+        self.assertTrue(order_controller._watermark_lock.acquire(blocking=False))
+        try:
+            self.assertEqual(self._export(), [])
+        finally:
+            order_controller._watermark_lock.release()
+        self.assertIsNone(self.result)
+        self.assertEqual(self._export(), [1, 2, 3])
+        self.assertEqual(self.result, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import douyin, hedging
+from utils.hedging import HedgeBudget, LatencyTracker
+
+
+class TestHedgeBudget(unittest.TestCase):
+    def setUp(self):
+        self.tracker = LatencyTracker(window=100, min_samples=10)
+        patcher = mock.patch.object(hedging, "attempt_latency", self.tracker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_hedge_without_samples(self):
+        budget = HedgeBudget(max_ratio=0.5)
+        self.assertIsNone(budget.delay())
+
+    def test_delay_is_p90_with_floor(self):
+        for i in range(1, 11):
+            self.tracker.observe(i * 0.5)
+        self.assertEqual(HedgeBudget(max_ratio=0.5, min_delay=1.0).delay(), 5.0)
+        self.assertEqual(HedgeBudget(max_ratio=0.5, min_delay=9.0).delay(), 9.0)
+
+    def test_ratio_caps_hedges(self):
+        budget = HedgeBudget(max_ratio=0.1)
+        for _ in range(20):
+            budget.delay()
+        granted = sum(budget.try_acquire() for _ in range(5))
+        self.assertEqual(granted, 2)
+
+
+class TestHedgedFetch(unittest.TestCase):
+    def test_hedge_wins_and_primary_cancelled(self):
+        calls = []
+        cancelled = []
+
+        async def fake_attempt(session, link, proxies, tried, aweme_id=None, rate_limited=False):
+            n = len(calls)
+            calls.append(n)
+            try:
+                await asyncio.sleep(1.0 if n == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(n)
+                raise
+            return n
+
+        budget = HedgeBudget(max_ratio=1.0)
+        budget.attempts = 1
+        with mock.patch.object(budget, "delay", return_value=0.05), \
+                mock.patch.object(douyin, "_fetch_like_attempt", fake_attempt), \
+                mock.patch.object(douyin, "_wait_rate_limits", mock.AsyncMock()):
+            result = asyncio.run(douyin._fetch_like_hedged(None, "l", [object(), object()], set(), "1", budget))
+        self.assertEqual(result, 1)
+        self.assertEqual(cancelled, [0])
+        self.assertEqual(budget.hedges, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
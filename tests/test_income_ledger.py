@@ -0,0 +1,63 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.income_ledger import IncomeLedger
+
+
+class TestIncomeLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.path = os.path.join(self.tmp_dir, "ledger.json")
+
+    def test_sync_returns_new_and_changed_files(self):
+        ledger = IncomeLedger(self.path)
+        self.assertEqual(sorted(ledger.sync({"a": (1, 1), "b": (2, 2)})), ["a", "b"])
+        ledger.record("a", (1, 1), 1.5)
+        ledger.record("b", (2, 2), 2.5)
+        self.assertEqual(ledger.sync({"a": (1, 1), "b": (3, 3)}), ["b"])
+        self.assertAlmostEqual(ledger.total(), 4.0)
+
+    def test_removed_files_leave_the_total(self):
+        ledger = IncomeLedger(self.path)
+        ledger.record("a", (1, 1), 1.5)
+        ledger.record("b", (2, 2), 2.5)
+        self.assertEqual(ledger.sync({"b": (2, 2)}), [])
+        self.assertAlmostEqual(ledger.total(), 2.5)
+        ledger.forget([os.path.abspath("b")])
+        ledger.record(os.path.abspath("c"), (1, 1), 1.0)
+        ledger.forget(["c"])
+        self.assertAlmostEqual(ledger.total(), 2.5)
+
+    def test_flush_and_reload(self):
+        ledger = IncomeLedger(self.path)
+        ledger.record("a", (1, 1), 1.5)
+        ledger.flush()
+        reloaded = IncomeLedger(self.path)
+        self.assertAlmostEqual(reloaded.total(), 1.5)
+        self.assertEqual(reloaded.sync({"a": (1, 1)}), [])
+
+    def test_malformed_ledger_is_recomputed(self):
+        for content in ("[1, 2]", '{"a": {"size": 1, "mtime_ns": 1, "income": "x"}}', "{bad json"):
+            with self.subTest(content=content):
+                with open(self.path, "w", encoding="utf-8") as f:
+                    f.write(content)
+                ledger = IncomeLedger(self.path)
+                self.assertEqual(ledger.total(), 0.0)
+                self.assertEqual(ledger.sync({"a": (1, 1)}), ["a"])
+
+    def test_invalid_entries_are_skipped(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"a": {"size": 1, "mtime_ns": 1, "income": 2.0}, "b": {"size": 1}, "c": 3}, f)
+        ledger = IncomeLedger(self.path)
+        self.assertAlmostEqual(ledger.total(), 2.0)
+        self.assertEqual(sorted(ledger.sync({"a": (1, 1), "b": (1, 1)})), ["b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
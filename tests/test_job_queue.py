@@ -0,0 +1,129 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CONFIG
+from controllers import job_controller
+from utils.like_cache import LikeCountCache
+
+
+def _override(test, key, value):
+    original = CONFIG.get(key)
+    CONFIG.override(key, value)
+    test.addCleanup(CONFIG.override, key, original)
+
+
+class JobQueueTestCase(unittest.TestCase):
+    """任务队列使用 JOB_DB_URL 指向的临时 SQLite 库"""
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        _override(self, "JOB_DB_URL", f"sqlite:///{os.path.join(tmp_dir, 'jobs.db')}")
+        _override(self, "JOB_POLL_INTERVAL", 0.05)
+        patcher = mock.patch.object(job_controller, "like_count_cache", LikeCountCache(ttl=60, max_size=100))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _orders(n):
+        return [{"id": i, "link": f"https://v.douyin.com/{i}/", "aweme_id": None} for i in range(n)]
+
+
+class TestClaimAndComplete(JobQueueTestCase):
+    def test_each_job_is_claimed_once(self):
+        job_controller.enqueue_jobs(self._orders(5))
+        first = job_controller.claim_jobs("w1", 3, lease_seconds=60, max_claims=3)
+        second = job_controller.claim_jobs("w2", 10, lease_seconds=60, max_claims=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({j["id"] for j in first} & {j["id"] for j in second})
+        self.assertEqual(job_controller.claim_jobs("w3", 10, lease_seconds=60, max_claims=3), [])
+
+    def test_expired_lease_is_reclaimed_and_old_owner_cannot_complete(self):
+        job_controller.enqueue_jobs(self._orders(1))
+        job = job_controller.claim_jobs("w1", 1, lease_seconds=-1, max_claims=3)[0]
+        retaken = job_controller.claim_jobs("w2", 1, lease_seconds=60, max_claims=3)[0]
+        self.assertEqual(retaken["id"], job["id"])
+        self.assertFalse(job_controller.complete_job(job["id"], job["lease"], 10))
+        self.assertTrue(job_controller.complete_job(retaken["id"], retaken["lease"], 20))
+
+    def test_jobs_exhausting_their_claims_are_failed(self):
+        batch_id = job_controller.enqueue_jobs(self._orders(1))
+        job_controller.claim_jobs("w1", 1, lease_seconds=-1, max_claims=1)
+        self.assertEqual(job_controller.expire_exhausted_jobs(1), 1)
+        self.assertEqual([r[2] for r in job_controller.fetch_finished(batch_id)], [None])
+
+    def test_worker_reports_expanded_aweme_id(self):
+        batch_id = job_controller.enqueue_jobs(self._orders(1))
+        job = job_controller.claim_jobs("w1", 1, lease_seconds=60, max_claims=3)[0]
+        job_controller.complete_job(job["id"], job["lease"], 5, aweme_id="7300000000000000001")
+        self.assertEqual(job_controller.fetch_finished(batch_id)[0][2:], (5, "7300000000000000001"))
+
+
+class TestFetchFinished(JobQueueTestCase):
+    def test_returns_unseen_jobs_regardless_of_finish_time(self):
+        batch_id = job_controller.enqueue_jobs(self._orders(3))
+        jobs = job_controller.claim_jobs("w1", 3, lease_seconds=60, max_claims=3)
+        for j in jobs:
+            job_controller.complete_job(j["id"], j["lease"], 1)
+        first = job_controller.fetch_finished(batch_id)
+        self.assertEqual(len(first), 3)
+        # 完成时间早于上次轮询的结果也要能取到，只靠 seen 去重
+        seen = {first[0][0]}
+        self.assertEqual([r[0] for r in job_controller.fetch_finished(batch_id, seen)], [r[0] for r in first[1:]])
+
+
+class TestIterDistributedLikes(JobQueueTestCase):
+    def _collect(self, orders):
+        async def run():
+            return [(o["id"], like) async for o, like in job_controller.iter_distributed_likes(orders)]
+
+        return asyncio.run(run())
+
+    def _batch_rows(self):
+        from db import get_job_session
+        from sqlmodel import select
+        from models.scrape_job import ScrapeJob
+
+        with get_job_session() as s:
+            return s.exec(select(ScrapeJob.id)).all()
+
+    def test_yields_worker_results_and_purges_batch(self):
+        stop = threading.Event()
+
+        def worker():
+            while not stop.is_set():
+                for j in job_controller.claim_jobs("w1", 10, lease_seconds=60, max_claims=3):
+                    like = None if j["link"].endswith("/1/") else 100
+                    job_controller.complete_job(j["id"], j["lease"], like)
+                time.sleep(0.01)
+
+        t = threading.Thread(target=worker, daemon=True)
+        t.start()
+        try:
+            results = dict(self._collect(self._orders(3)))
+        finally:
+            stop.set()
+            t.join()
+        self.assertEqual(results, {0: 100, 1: float("inf"), 2: 100})
+        self.assertEqual(self._batch_rows(), [])
+
+    def test_unfinished_jobs_fail_after_batch_timeout(self):
+        _override(self, "JOB_BATCH_TIMEOUT", 0.2)
+        start = time.monotonic()
+        results = dict(self._collect(self._orders(2)))
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(results, {0: float("inf"), 1: float("inf")})
+        self.assertEqual(self._batch_rows(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.like_cache import LikeCountCache
+
+
+class TestLikeCountCache(unittest.TestCase):
+    def test_ttl_expiry(self):
+        cache = LikeCountCache(ttl=10, max_size=10)
+        with mock.patch("utils.like_cache.time.time", return_value=1000.0):
+            cache.put("1", 5)
+        with mock.patch("utils.like_cache.time.time", return_value=1009.0):
+            self.assertEqual(cache.get("1"), 5)
+        with mock.patch("utils.like_cache.time.time", return_value=1010.0):
+            self.assertIsNone(cache.get("1"))
+        self.assertEqual(cache.stats(), {"size": 0, "hits": 1, "misses": 1})
+
+    def test_lru_eviction(self):
+        cache = LikeCountCache(ttl=600, max_size=2)
+        cache.put("1", 1)
+        cache.put("2", 2)
+        cache.get("1")
+        cache.put("3", 3)
+        self.assertIsNone(cache.get("2"))
+        self.assertEqual(cache.get("1"), 1)
+        self.assertEqual(cache.get("3"), 3)
+
+    def test_configure_shrinks(self):
+        cache = LikeCountCache(ttl=600, max_size=5)
+        for i in range(5):
+            cache.put(str(i), i)
+        cache.configure(max_size=2)
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertEqual(cache.get("4"), 4)
+
+    def test_missing_aweme_id(self):
+        cache = LikeCountCache(ttl=600, max_size=5)
+        cache.put(None, 1)
+        cache.put("", 1)
+        self.assertIsNone(cache.get(None))
+        self.assertEqual(cache.stats()["size"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
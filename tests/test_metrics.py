@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.owlproxy import OwlProxyModel
+from utils import metrics
+from utils.owlproxy import ProxyPool, proxy_id
+
+
+class TestRender(unittest.TestCase):
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def test_counter_and_gauge_format(self):
+        counter = self.registry.register(metrics.Counter("t_requests_total", "Requests.", ["outcome"]))
+        gauge = self.registry.register(metrics.Gauge("t_inflight", "In flight."))
+        counter.inc(outcome="success")
+        counter.inc(2, outcome='say "hi"\n')
+        gauge.set(3)
+        self.assertEqual(
+            self.registry.render().splitlines(),
+            [
+                "# HELP t_requests_total Requests.",
+                "# TYPE t_requests_total counter",
+                't_requests_total{outcome="success"} 1.0',
+                't_requests_total{outcome="say \\"hi\\"\\n"} 2.0',
+                "# HELP t_inflight In flight.",
+                "# TYPE t_inflight gauge",
+                "t_inflight 3",
+            ],
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        hist = self.registry.register(metrics.Histogram("t_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0)))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            hist.observe(value, stage="fetch")
+        lines = self.registry.render().splitlines()
+        self.assertEqual(
+            lines[2:],
+            [
+                't_seconds_bucket{stage="fetch",le="0.1"} 1',
+                't_seconds_bucket{stage="fetch",le="1.0"} 3',
+                't_seconds_bucket{stage="fetch",le="+Inf"} 4',
+                't_seconds_sum{stage="fetch"} 6.25',
+                't_seconds_count{stage="fetch"} 4',
+            ],
+        )
+
+    def test_render_metrics_lists_registered_metrics(self):
+        text = metrics.render_metrics()
+        self.assertTrue(text.endswith("\n"))
+        for name in ("douyin_sync_stage_seconds", "douyin_sync_proxy_requests_total", "douyin_sync_links_total"):
+            self.assertIn(f"# TYPE {name} ", text)
+
+    def test_remove_drops_matching_series(self):
+        counter = metrics.Counter("t_proxy_total", "Per proxy.", ["proxy", "outcome"])
+        counter.inc(proxy="a", outcome="success")
+        counter.inc(proxy="a", outcome="timeout")
+        counter.inc(proxy="b", outcome="success")
+        self.assertEqual(counter.remove(proxy="a"), 2)
+        self.assertEqual(counter.render()[2:], ['t_proxy_total{proxy="b",outcome="success"} 1.0'])
+
+
+class TestProxySeriesEviction(unittest.TestCase):
+    def test_expired_proxies_lose_their_series(self):
+        old = OwlProxyModel(proxyHost="127.0.0.1", proxyPort=1, userName="old", password="p", proxyType="http")
+        fresh = OwlProxyModel(proxyHost="127.0.0.1", proxyPort=1, userName="fresh", password="p", proxyType="http")
+        pool = ProxyPool(service=None)
+        pool.add([old], created_at=time.time() - pool._lifetime_seconds())
+        pool.add([fresh])
+        for m in (old, fresh):
+            metrics.PROXY_REQUESTS.inc(proxy=proxy_id(m), outcome="success")
+        self.addCleanup(metrics.PROXY_REQUESTS.remove, proxy=proxy_id(fresh))
+
+        pool.release([])
+        text = metrics.render_metrics()
+        self.assertNotIn(proxy_id(old), text)
+        self.assertIn(f'proxy="{proxy_id(fresh)}"', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
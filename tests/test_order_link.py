@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from decimal import Decimal
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect
+from sqlmodel import create_engine, select
+
+import db
+from config import CONFIG
+from controllers import order_controller, order_link_controller
+from models.order import Order
+from models.order_link import OrderLink
+from utils import douyin_link
+from utils.short_url_cache import ShortUrlCache
+
+GOODS_ID = 990001
+FULL_LINK = "https://www.douyin.com/video/7300000000000000001"
+SHORT_LINK = "https://v.douyin.com/AbCdEf/"
+
+
+def _order(order_id, link, tb_time):
+    return Order(
+        id=order_id,
+        create_at=tb_time,
+        user_name="t",
+        user_id=1,
+        goods_id=GOODS_ID,
+        goods_name="t",
+        order_s_n=f"T{order_id}",
+        order_status=4,
+        order_num=100,
+        current_num=0,
+        start_num=0,
+        order_amount=Decimal("10"),
+        params=json.dumps({"link": link}),
+        tb_time=tb_time,
+    )
+
+
+class OrderLinkTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp_dir, 'orders.db')}")
+        db.set_engine(self.engine)
+        self.addCleanup(db.set_engine, None)
+        db.ensure_tables(Order)
+
+        original = CONFIG.get("MONITORED_GOOD_IDS")
+        CONFIG.override("MONITORED_GOOD_IDS", [GOODS_ID])
+        self.addCleanup(CONFIG.override, "MONITORED_GOOD_IDS", original)
+        start_ts, _ = order_controller._monitor_window(int(time.time()))
+        with db.get_session() as s:
+            s.add_all([_order(1, FULL_LINK, start_ts + 10), _order(2, SHORT_LINK, start_ts + 20)])
+            s.commit()
+
+        cache = ShortUrlCache(os.path.join(self.tmp_dir, "short_url_cache.json"), ttl=3600, max_size=100)
+        cache.persist = False
+        patcher = mock.patch.object(douyin_link, "short_url_cache", cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.short_url_cache = cache
+
+    def _has_link_table(self):
+        return inspect(self.engine).has_table(OrderLink.__tablename__)
+
+    def _index_rows(self):
+        with db.get_session() as s:
+            return {r.order_id: (r.link, r.aweme_id) for r in s.exec(select(OrderLink)).all()}
+
+
+class TestMonitorQuery(OrderLinkTestCase):
+    def test_view_query_is_read_only(self):
+        orders = order_controller.query_finished_orders_for_monitor()
+        self.assertEqual({o["id"]: (o["link"], o["aweme_id"]) for o in orders}, {
+            1: (FULL_LINK, "7300000000000000001"),
+            2: (SHORT_LINK, None),
+        })
+        self.assertFalse(self._has_link_table())
+
+    def test_view_query_uses_existing_index_without_writing(self):
+        order_link_controller.ensure_link_table()
+        with db.get_session() as s:
+            s.add(OrderLink(order_id=1, link=FULL_LINK, aweme_id="7300000000000000001"))
+            s.commit()
+        with mock.patch.object(order_controller, "read_order_links", wraps=order_controller.read_order_links) as read:
+            orders = order_controller.query_finished_orders_for_monitor()
+        read.assert_called_once_with([2], mock.ANY)
+        self.assertEqual(len(orders), 2)
+        self.assertEqual(set(self._index_rows()), {1})
+
+    def test_export_query_builds_index_once(self):
+        first = order_controller.query_finished_orders_for_monitor(index_links=True)
+        self.assertEqual(self._index_rows(), {1: (FULL_LINK, "7300000000000000001"), 2: (SHORT_LINK, None)})
+        with mock.patch.object(order_controller, "index_order_links") as index:
+            second = order_controller.query_finished_orders_for_monitor(index_links=True)
+        index.assert_not_called()
+        key = lambda o: (o["id"], o["link"], o["aweme_id"])
+        self.assertEqual(sorted(map(key, first)), sorted(map(key, second)))
+
+    def test_export_query_records_cached_short_link(self):
+        order_controller.query_finished_orders_for_monitor(index_links=True)
+        self.short_url_cache.put(SHORT_LINK, "https://www.iesdouyin.com/share/video/7300000000000000002/", "7300000000000000002")
+        orders = order_controller.query_finished_orders_for_monitor(index_links=True)
+        self.assertEqual({o["id"]: o["aweme_id"] for o in orders}[2], "7300000000000000002")
+        self.assertEqual(self._index_rows()[2], (SHORT_LINK, "7300000000000000002"))
+
+
+class TestScrapedAwemeIdWriteBack(OrderLinkTestCase):
+    def test_short_link_expanded_during_scrape_is_recorded(self):
+        cache = self.short_url_cache
+
+        async def fake_likes(orders):
+            for o in orders:
+                if o["link"] == SHORT_LINK:
+                    # 抓取过程中展开短链并写入短链缓存
+                    cache.put(SHORT_LINK, "https://www.iesdouyin.com/share/video/7300000000000000002/", "7300000000000000002")
+                yield o, 100
+
+        export_dir = os.path.join(self.tmp_dir, "export")
+        with mock.patch.object(order_controller, "EXPORT_DIR", export_dir), \
+                mock.patch.object(order_controller, "iter_aweme_likes", fake_likes), \
+                mock.patch.object(order_controller, "_watermark_enabled", return_value=False):
+            asyncio.run(order_controller.export_deficiency_orders_links())
+        self.assertEqual(self._index_rows()[2], (SHORT_LINK, "7300000000000000002"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CONFIG
+from models.owlproxy import OwlProxyModel, OwlProxyResult
+from utils.owlproxy import OWLService, ProxyPool
+
+
+def _model(i):
+    return OwlProxyModel(proxyHost="127.0.0.1", proxyPort=8000, userName=f"u{i}", password="p", proxyType="http")
+
+
+class FakeService:
+    """按 batch 大小分批产出新代理，记录每次请求的数量"""
+
+    def __init__(self, batch=2, delay=0.0):
+        self.batch = batch
+        self.delay = delay
+        self.requested = []
+        self._next = 1000
+
+    async def create_dynamic_proxies_async(self, good_num):
+        self.requested.append(good_num)
+        remaining = good_num
+        while remaining > 0:
+            await asyncio.sleep(self.delay)
+            n = min(self.batch, remaining)
+            models = [_model(self._next + i) for i in range(n)]
+            self._next += n
+            remaining -= n
+            yield models
+
+
+class TestCreateDynamicProxiesAsync(unittest.TestCase):
+    def setUp(self):
+        original = CONFIG.get("OWLPROXY_CREATE_CONCURRENCY")
+        CONFIG.override("OWLPROXY_CREATE_CONCURRENCY", 2)
+        self.addCleanup(CONFIG.override, "OWLPROXY_CREATE_CONCURRENCY", original)
+
+    def _run(self, good_num, fail_sizes=()):
+        """返回 (各批产出的数量, 各批请求的 goodNum, 最大同时请求数)"""
+        requested = []
+        state = {"active": 0, "peak": 0}
+
+        async def fake_request(self_, session, url, data, method="POST", timeout=30):
+            num = data["goodNum"]
+            requested.append(num)
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            try:
+                await asyncio.sleep(0.01)
+                if num in fail_sizes:
+                    raise RuntimeError("boom")
+                start = len(requested) * 100
+                return OwlProxyResult(data=[_model(start + i).model_dump() for i in range(num)])
+            finally:
+                state["active"] -= 1
+
+        async def collect():
+            return [len(b) async for b in OWLService("ak", "sk").create_dynamic_proxies_async(good_num=good_num)]
+
+        with mock.patch.object(OWLService, "owl_request_async", fake_request):
+            batches = asyncio.run(collect())
+        return batches, requested, state["peak"]
+
+    def test_splits_into_batches_of_50_with_bounded_concurrency(self):
+        batches, requested, peak = self._run(130)
+        self.assertEqual(sorted(requested), [30, 50, 50])
+        self.assertEqual(sorted(batches), [30, 50, 50])
+        self.assertLessEqual(peak, 2)
+
+    def test_failed_batch_is_skipped(self):
+        batches, requested, _ = self._run(80, fail_sizes=(30,))
+        self.assertEqual(sorted(requested), [30, 50])
+        self.assertEqual(batches, [50])
+
+
+class TestProxyPool(unittest.TestCase):
+    def test_free_proxies_are_reused_before_creating(self):
+        service = FakeService()
+        pool = ProxyPool(service)
+        pool.add([_model(i) for i in range(3)])
+
+        async def run():
+            lease = await pool.lease_async(2)
+            await lease.wait_complete()
+            return lease
+
+        lease = asyncio.run(run())
+        self.assertEqual([m.userName for m in lease.proxies], ["u0", "u1"])
+        self.assertEqual(service.requested, [])
+        self.assertEqual(pool.stats(), {"total": 3, "leased": 2, "free": 1})
+
+    def test_shortage_is_topped_up_in_batches(self):
+        service = FakeService(batch=2, delay=0.01)
+        pool = ProxyPool(service)
+        pool.add([_model(0)])
+
+        async def run():
+            lease = await pool.lease_async(6)
+            # 复用的代理立即可用，补建在后台进行
+            self.assertEqual(len(lease.proxies), 1)
+            self.assertTrue(lease.filling)
+            await lease.wait_complete()
+            return lease
+
+        lease = asyncio.run(run())
+        self.assertEqual(service.requested, [5])
+        self.assertEqual(len(lease.proxies), 6)
+        self.assertEqual(pool.stats(), {"total": 6, "leased": 6, "free": 0})
+
+    def test_wait_ready_returns_when_first_batch_arrives(self):
+        pool = ProxyPool(FakeService(batch=1, delay=0.01))
+
+        async def run():
+            lease = await pool.lease_async(3)
+            await lease.wait_ready()
+            ready = len(lease.proxies)
+            await lease.close()
+            return ready, lease
+
+        ready, lease = asyncio.run(run())
+        self.assertGreaterEqual(ready, 1)
+        self.assertFalse(lease.filling)
+
+    def test_released_proxies_can_be_leased_again(self):
+        service = FakeService()
+        pool = ProxyPool(service)
+        pool.add([_model(i) for i in range(2)])
+
+        async def run():
+            first = await pool.lease_async(2)
+            pool.release(first.proxies)
+            second = await pool.lease_async(2)
+            await second.wait_complete()
+            return second
+
+        second = asyncio.run(run())
+        self.assertEqual(len(second.proxies), 2)
+        self.assertEqual(service.requested, [])
+
+    def test_expiring_proxies_are_not_leased(self):
+        service = FakeService()
+        pool = ProxyPool(service, min_remaining=60)
+        lifetime = pool._lifetime_seconds()
+        # 创建时间足够早，剩余有效期不足 min_remaining
+        pool.add([_model(0)], created_at=time.time() - lifetime + 30)
+        pool.add([_model(1)])
+
+        async def run():
+            lease = await pool.lease_async(2)
+            await lease.wait_complete()
+            return lease
+
+        lease = asyncio.run(run())
+        names = [m.userName for m in lease.proxies]
+        self.assertNotIn("u0", names)
+        self.assertIn("u1", names)
+        self.assertEqual(service.requested, [1])
+        self.assertEqual(pool.stats()["total"], 2)
+
+    def test_prewarm_adds_free_proxies(self):
+        service = FakeService()
+        pool = ProxyPool(service)
+        pool.add([_model(0)])
+        created = asyncio.run(pool.prewarm(3))
+        self.assertEqual(created, 2)
+        self.assertEqual(pool.stats(), {"total": 3, "leased": 0, "free": 3})
+        self.assertEqual(asyncio.run(pool.prewarm(3)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
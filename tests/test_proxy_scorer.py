@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.proxy_scorer import ProxyScorer
+
+
+def _key(proxy):
+    return proxy["key"]
+
+
+class TestProxyScorer(unittest.TestCase):
+    def setUp(self):
+        self.scorer = ProxyScorer(_key)
+        self.fast = {"key": "fast"}
+        self.slow = {"key": "slow"}
+
+    def _record(self, proxy, latency, times=1, error=None):
+        for _ in range(times):
+            self.scorer.choose([proxy])
+            self.scorer.done(proxy, latency, error)
+
+    def test_prefers_lower_latency(self):
+        self._record(self.fast, 0.2, times=3)
+        self._record(self.slow, 3.0, times=3)
+        for _ in range(5):
+            chosen = self.scorer.choose([self.slow, self.fast])
+            self.assertIs(chosen, self.fast)
+            self.scorer.cancel(chosen)
+
+    def test_p95_penalises_tail(self):
+        steady = {"key": "steady"}
+        spiky = {"key": "spiky"}
+        self._record(steady, 1.0, times=20)
+        # 大部分很快，但有长尾
+        self._record(spiky, 8.0, times=2)
+        self._record(spiky, 0.4, times=18)
+        self.assertLess(self.scorer.snapshot("spiky")["ewma"], self.scorer.snapshot("steady")["ewma"])
+        chosen = self.scorer.choose([spiky, steady])
+        self.assertIs(chosen, steady)
+
+    def test_inflight_spreads_load(self):
+        self._record(self.fast, 1.0, times=3)
+        self._record(self.slow, 1.5, times=3)
+        self.assertIs(self.scorer.choose([self.fast, self.slow]), self.fast)
+        self.assertIs(self.scorer.choose([self.fast, self.slow]), self.slow)
+
+    def test_quarantine_after_consecutive_failures(self):
+        with mock.patch.object(ProxyScorer, "_quarantine_after", staticmethod(lambda: 2)), \
+                mock.patch.object(ProxyScorer, "_quarantine_seconds", staticmethod(lambda: 60)):
+            self._record(self.fast, 0.1, times=2, error="timeout")
+            self.assertTrue(self.scorer.snapshot("fast")["quarantined"])
+            for _ in range(5):
+                chosen = self.scorer.choose([self.fast, self.slow])
+                self.assertIs(chosen, self.slow)
+                self.scorer.cancel(chosen)
+            # 全部被隔离或排除时仍返回一个代理，只排除已试过的
+            self.assertIs(self.scorer.choose([self.fast, self.slow], exclude={"slow"}), self.fast)
+
+    def test_success_resets_failures(self):
+        with mock.patch.object(ProxyScorer, "_quarantine_after", staticmethod(lambda: 2)):
+            self._record(self.fast, 0.1, error="timeout")
+            self._record(self.fast, 0.1)
+            self._record(self.fast, 0.1, error="timeout")
+            self.assertFalse(self.scorer.snapshot("fast")["quarantined"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.owlproxy import OwlProxyModel
+from utils import douyin
+from utils.owlproxy import proxy_key
+from utils.proxy_scorer import proxy_scorer
+from utils.rate_limit import HostRateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_paced(self):
+        clock = [100.0]
+        with mock.patch("utils.rate_limit.time.monotonic", side_effect=lambda: clock[0]):
+            bucket = TokenBucket(rate=5, burst=2)
+            self.assertEqual(bucket.reserve(), 0.0)
+            self.assertEqual(bucket.reserve(), 0.0)
+            # 令牌用完后依次排队，间隔 1/rate
+            self.assertAlmostEqual(bucket.reserve(), 0.2)
+            self.assertAlmostEqual(bucket.reserve(), 0.4)
+            clock[0] += 1.0
+            self.assertAlmostEqual(bucket.reserve(), 0.0)
+
+    def test_refill_capped_at_burst(self):
+        clock = [0.0]
+        with mock.patch("utils.rate_limit.time.monotonic", side_effect=lambda: clock[0]):
+            bucket = TokenBucket(rate=1, burst=2)
+            clock[0] += 100
+            for _ in range(2):
+                self.assertEqual(bucket.reserve(), 0.0)
+            self.assertAlmostEqual(bucket.reserve(), 1.0)
+
+
+class TestHostRateLimiter(unittest.TestCase):
+    def _limiter(self, limits):
+        limiter = HostRateLimiter()
+        patcher = mock.patch.object(HostRateLimiter, "_limit_for", staticmethod(lambda host: _lookup(limits, host)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return limiter
+
+    def test_host_and_default(self):
+        limiter = self._limiter({"v.douyin.com": {"rate": 5, "burst": 10}, "*": {"rate": 1, "burst": 1}})
+        self.assertEqual(limiter.bucket_for("v.douyin.com").rate, 5)
+        self.assertEqual(limiter.bucket_for("www.iesdouyin.com").rate, 1)
+
+    def test_unlimited_without_config(self):
+        limiter = self._limiter({})
+        self.assertIsNone(limiter.bucket_for("v.douyin.com"))
+        self.assertEqual(asyncio.run(limiter.wait("https://v.douyin.com/abc/")), 0.0)
+
+
+def _lookup(limits, host):
+    conf = limits.get(host) or limits.get("*")
+    if not conf:
+        return None
+    return float(conf["rate"]), int(conf["burst"])
+
+
+class TestRateLimitOutsideLatency(unittest.TestCase):
+    def test_wait_not_counted_as_proxy_latency(self):
+        model = OwlProxyModel(proxyHost="127.0.0.1", proxyPort=1, userName="rate-limit-test", password="x", proxyType="http")
+
+        async def slow_wait(url):
+            await asyncio.sleep(0.3)
+            return 0.3
+
+        async def fast_fetch(session, link, proxy_model, aweme_id=None):
+            return 7
+
+        with mock.patch.object(douyin.host_rate_limiter, "wait", slow_wait), \
+                mock.patch.object(douyin, "_fetch_like_once", fast_fetch):
+            like = asyncio.run(douyin._fetch_like_attempt(None, "https://www.douyin.com/video/1", [model], set(), "1"))
+        self.assertEqual(like, 7)
+        self.assertLess(proxy_scorer.snapshot(proxy_key(model))["ewma"], 0.1)
+
+    def test_rate_limited_urls(self):
+        self.assertEqual(douyin._rate_limited_urls("https://www.douyin.com/video/1", "1"), [douyin.canonical_share_url("1")])
+        urls = douyin._rate_limited_urls("https://v.douyin.com/not-cached-rate-test/")
+        self.assertEqual(urls, ["https://v.douyin.com/not-cached-rate-test/", douyin.share_base_url()])
+
+
+if __name__ == '__main__':
+    unittest.main()
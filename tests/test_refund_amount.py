@@ -0,0 +1,92 @@
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import create_engine
+
+import db
+from controllers import order_controller
+from models.order import Order
+from utils.income_ledger import IncomeLedger
+
+
+def _order(order_id, order_num, order_amount):
+    return Order(
+        id=order_id,
+        create_at=0,
+        user_name="t",
+        user_id=1,
+        goods_id=1,
+        goods_name="t",
+        order_s_n=f"T{order_id}",
+        order_status=4,
+        order_num=order_num,
+        current_num=0,
+        start_num=0,
+        order_amount=Decimal(str(order_amount)),
+    )
+
+
+class TestQueryOrderRefundAmount(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        db.set_engine(create_engine(f"sqlite:///{os.path.join(self.tmp_dir, 'orders.db')}"))
+        self.addCleanup(db.set_engine, None)
+        db.ensure_tables(Order)
+        with db.get_session() as s:
+            s.add_all([_order(1, 100, 10), _order(2, 50, 20), _order(3, 10, 5), _order(4, 0, 99)])
+            s.commit()
+
+        self.export_dir = os.path.join(self.tmp_dir, "export")
+        os.makedirs(self.export_dir)
+        self.ledger = IncomeLedger(os.path.join(self.tmp_dir, "ledger.json"))
+        for target, value in (("EXPORT_DIR", self.export_dir), ("income_ledger", self.ledger), ("_IN_QUERY_CHUNK_SIZE", 2)):
+            patcher = mock.patch.object(order_controller, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _write_csv(self, name, rows):
+        path = os.path.join(self.export_dir, name)
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["订单ID", "缺失的数量"])
+            writer.writerows(rows)
+        return path
+
+    def test_income_is_summed_across_chunks(self):
+        # 订单 4 下单数量为 0、订单 99 不存在、无效行都不计入
+        self._write_csv("a.csv", [(1, 10), (2, 5), ("x", 1), (99, 3)])
+        self._write_csv("b.csv", [(3, 2), (4, 7), (1, 0)])
+        with mock.patch.object(order_controller, "_query_order_amounts", wraps=order_controller._query_order_amounts) as query:
+            total = order_controller.query_order_refund_amount()
+        # 10/100*10 + 5/50*20 + 2/10*5
+        self.assertAlmostEqual(total, 1 + 2 + 1)
+        # 两个文件的订单ID合并后只查询一次
+        query.assert_called_once()
+        self.assertEqual(query.call_args.args[0], [1, 2, 3, 4, 99])
+
+    def test_unchanged_files_are_not_reparsed(self):
+        self._write_csv("a.csv", [(1, 10)])
+        self.assertAlmostEqual(order_controller.query_order_refund_amount(), 1)
+        with mock.patch.object(order_controller, "_read_deficiency_rows") as read:
+            self.assertAlmostEqual(order_controller.query_order_refund_amount(), 1)
+        read.assert_not_called()
+
+    def test_new_and_deleted_files_update_the_total(self):
+        path = self._write_csv("a.csv", [(1, 10)])
+        self.assertAlmostEqual(order_controller.query_order_refund_amount(), 1)
+        self._write_csv("b.csv", [(2, 5)])
+        self.assertAlmostEqual(order_controller.query_order_refund_amount(), 3)
+        os.remove(path)
+        self.assertAlmostEqual(order_controller.query_order_refund_amount(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
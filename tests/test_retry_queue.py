@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import douyin
+from utils.proxy_scorer import FetchError
+
+
+async def _collect(orders, max_workers, max_attempts):
+    pending = list(range(len(orders)))
+    proxies = [object(), object()]
+    return [item async for item in douyin._iter_pending_likes(orders, pending, proxies, max_workers, max_attempts)]
+
+
+class TestRetryQueue(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(douyin, "_retry_delay", return_value=0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, failures, max_workers=2, max_attempts=3):
+        """failures: {链接: 前几次失败}，返回 ({下标: 结果}, 各链接尝试次数)"""
+        calls = {}
+
+        async def fake_fetch(session, link, proxies, tried, aweme_id=None, hedge=None, **kwargs):
+            calls[link] = calls.get(link, 0) + 1
+            if calls[link] <= failures.get(link, 0):
+                raise FetchError("timeout", "slow")
+            return len(link)
+
+        orders = [{"link": link} for link in ("a", "bb", "ccc")]
+        with mock.patch.object(douyin, "_fetch_like_hedged", fake_fetch):
+            results = asyncio.run(_collect(orders, max_workers, max_attempts))
+        return dict(results), calls
+
+    def test_failed_attempts_are_requeued(self):
+        results, calls = self._run({"a": 2})
+        self.assertEqual(results, {0: 1, 1: 2, 2: 3})
+        self.assertEqual(calls, {"a": 3, "bb": 1, "ccc": 1})
+
+    def test_gives_up_after_max_attempts(self):
+        results, calls = self._run({"bb": 5}, max_attempts=2)
+        self.assertEqual(results[1], float("inf"))
+        self.assertEqual(calls["bb"], 2)
+        self.assertEqual(results[0], 1)
+
+    def test_backoff_does_not_block_other_links(self):
+        # 单个工作协程：a 退避期间 bb、ccc 先完成
+        async def run():
+            order = []
+            calls = {}
+
+            async def fake_fetch(session, link, proxies, tried, aweme_id=None, hedge=None, **kwargs):
+                calls[link] = calls.get(link, 0) + 1
+                if link == "a" and calls[link] == 1:
+                    raise FetchError("timeout", "slow")
+                return len(link)
+
+            orders = [{"link": link} for link in ("a", "bb", "ccc")]
+            with mock.patch.object(douyin, "_fetch_like_hedged", fake_fetch):
+                async for i, _ in douyin._iter_pending_likes(orders, [0, 1, 2], [object()], 1, 3):
+                    order.append(i)
+            return order
+
+        self.assertEqual(asyncio.run(run()), [1, 2, 0])
+
+    def test_short_url_cache_is_flushed_off_the_event_loop(self):
+        threads = []
+        with mock.patch.object(douyin.short_url_cache, "flush", lambda: threads.append(threading.current_thread())):
+            self._run({})
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import sys
+import threading
+import types
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CONFIG
+from utils import douyin
+
+
+def _override(test, key, value):
+    original = CONFIG.get(key)
+    CONFIG.override(key, value)
+    test.addCleanup(CONFIG.override, key, original)
+
+
+class FakePool:
+    """在线程中执行 apply_async 的任务，代替 spawn 进程池"""
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.terminated = False
+        self.closed = False
+        self._threads = []
+
+    def apply_async(self, func, args, callback, error_callback):
+        def run():
+            try:
+                result = func(*args)
+            except Exception as e:  # noqa: BLE001
+                error_callback(e)
+            else:
+                callback(result)
+
+        t = threading.Thread(target=run, daemon=True)
+        self._threads.append(t)
+        t.start()
+
+    def terminate(self):
+        self.terminated = True
+
+    def close(self):
+        self.closed = True
+
+    def join(self):
+        for t in self._threads:
+            t.join(timeout=5)
+
+
+class TestShardRateLimits(unittest.TestCase):
+    def test_rate_and_burst_are_split_between_shards(self):
+        _override(self, "HOST_RATE_LIMITS", {
+            "v.douyin.com": {"rate": 8, "burst": 10},
+            "*": {"rate": 0},
+            "bad": 1,
+        })
+        self.assertEqual(douyin._shard_rate_limits(4), {
+            "v.douyin.com": {"rate": 2.0, "burst": 2},
+            "*": {"rate": 0.0, "burst": 1},
+        })
+
+
+class TestScrapeShard(unittest.TestCase):
+    def setUp(self):
+        _override(self, "HOST_RATE_LIMITS", {"v.douyin.com": {"rate": 8, "burst": 8}})
+        self.addCleanup(setattr, douyin.short_url_cache, "persist", douyin.short_url_cache.persist)
+
+    def test_applies_shard_limits_and_continues_from_initial_limit(self):
+        seen = {}
+
+        async def fake_pending(orders, pending, proxies, max_workers, max_attempts, adaptive=False, limiter=None):
+            seen["rate_limits"] = CONFIG.get("HOST_RATE_LIMITS")
+            seen["initial"] = limiter.limit
+            limiter.limit = 5.0
+            for i in pending:
+                yield i, 10 + i
+
+        shard_limits = {"v.douyin.com": {"rate": 2.0, "burst": 2}}
+        with mock.patch.object(douyin, "_iter_pending_likes", fake_pending):
+            results, expanded, final_limit = douyin._scrape_shard(
+                [{"link": "a"}, {"link": "b"}], [object()], 8, 3, True, initial_limit=3.0, rate_limits=shard_limits
+            )
+        self.assertEqual(results, [(0, 10), (1, 11)])
+        self.assertEqual(expanded, [])
+        self.assertEqual(seen, {"rate_limits": shard_limits, "initial": 3.0})
+        self.assertEqual(final_limit, 5.0)
+
+
+class TestIterShardedLikes(unittest.TestCase):
+    def setUp(self):
+        _override(self, "SCRAPE_SHARD_CHUNK", 2)
+        _override(self, "IO_WORKERS_NUM", 4)
+        _override(self, "HOST_RATE_LIMITS", {"www.iesdouyin.com": {"rate": 8, "burst": 8}})
+        self.pools = []
+
+        def make_pool(processes):
+            pool = FakePool(processes)
+            self.pools.append(pool)
+            return pool
+
+        fake_mp = types.SimpleNamespace(get_context=lambda method: types.SimpleNamespace(Pool=make_pool))
+        for target, value in (("multiprocessing", fake_mp), ("_adaptive_last_limit", 8)):
+            patcher = mock.patch.object(douyin, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.calls = []
+        self.calls_lock = threading.Lock()
+
+        def fake_shard(orders, proxies, max_workers, max_attempts, adaptive, initial_limit=None, rate_limits=None):
+            with self.calls_lock:
+                self.calls.append({"links": [o["link"] for o in orders], "initial": initial_limit, "rate_limits": rate_limits})
+            return [(n, int(o["link"])) for n, o in enumerate(orders)], [], initial_limit + 1
+
+        patcher = mock.patch.object(douyin, "_scrape_shard", fake_shard)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.orders = [{"link": str(i)} for i in range(8)]
+
+    def _collect(self, stop_after=None):
+        async def run():
+            items = []
+            gen = douyin._iter_sharded_likes(self.orders, list(range(8)), ["p0", "p1"], 8, 3, True, 2)
+            async for item in gen:
+                items.append(item)
+                if stop_after is not None and len(items) >= stop_after:
+                    break
+            await gen.aclose()
+            return items
+
+        return asyncio.run(run())
+
+    def test_chunks_carry_limits_and_shared_rate(self):
+        items = self._collect()
+        self.assertEqual(sorted(items), [(i, i) for i in range(8)])
+        self.assertTrue(self.pools[0].closed)
+        self.assertFalse(self.pools[0].terminated)
+        # 每个分片两块：第二块从第一块收敛到的并发数继续
+        by_shard = {}
+        for call in self.calls:
+            by_shard.setdefault(int(call["links"][0]) % 2, []).append(call["initial"])
+        self.assertEqual(by_shard, {0: [4.0, 5.0], 1: [4.0, 5.0]})
+        for call in self.calls:
+            self.assertEqual(call["rate_limits"], {"www.iesdouyin.com": {"rate": 4.0, "burst": 4}})
+        self.assertEqual(douyin._adaptive_last_limit, 12.0)
+
+    def test_early_stop_terminates_pool(self):
+        items = self._collect(stop_after=1)
+        self.assertEqual(len(items), 1)
+        self.assertTrue(self.pools[0].terminated)
+
+
+if __name__ == "__main__":
+    unittest.main()
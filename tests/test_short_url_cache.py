@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.short_url_cache import ShortUrlCache
+
+
+class TestShortUrlCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "short_url_cache.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, content):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def test_malformed_file_starts_empty(self):
+        for content in ("[1, 2]", '{"v.douyin.com/a": {"ts": "abc"}}', "not json"):
+            self._write(content)
+            cache = ShortUrlCache(self.path, ttl=3600, max_size=10)
+            self.assertEqual(len(cache), 0, content)
+
+    def test_flush_and_reload(self):
+        cache = ShortUrlCache(self.path, ttl=3600, max_size=10)
+        cache.put("https://v.douyin.com/abc/", "https://www.iesdouyin.com/share/video/1/", "1")
+        cache.flush()
+        with open(self.path, encoding="utf-8") as f:
+            self.assertIn("v.douyin.com/abc", json.load(f))
+        reloaded = ShortUrlCache(self.path, ttl=3600, max_size=10)
+        self.assertEqual(reloaded.get("http://v.douyin.com/abc")["aweme_id"], "1")
+
+    def test_lru_eviction(self):
+        cache = ShortUrlCache(self.path, ttl=3600, max_size=2)
+        cache.put("https://v.douyin.com/a/", "u1", "1")
+        cache.put("https://v.douyin.com/b/", "u2", "2")
+        cache.get("https://v.douyin.com/a/")
+        cache.put("https://v.douyin.com/c/", "u3", "3")
+        self.assertIsNone(cache.get("https://v.douyin.com/b/"))
+        self.assertIsNotNone(cache.get("https://v.douyin.com/a/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import gzip
+import os
+import sys
+import unittest
+import zlib
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import brotli
+
+from utils import douyin
+from utils.douyin_parser import parse_video_html
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "douyin")
+
+ENCODERS = {
+    "": lambda raw: raw,
+    "gzip": gzip.compress,
+    "deflate": zlib.compress,
+    "br": brotli.compress,
+}
+
+
+class FakeContent:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+class FakeResponse:
+    """只实现 _read_html_until_router_data 用到的 headers / content.iter_chunked / close"""
+
+    def __init__(self, body, encoding, chunk_size):
+        self.headers = {"Content-Encoding": encoding} if encoding else {}
+        self.content = FakeContent([body[i: i + chunk_size] for i in range(0, len(body), chunk_size)])
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+        return f.read()
+
+
+def _read(body, encoding, chunk_size, decompressed=False):
+    resp = FakeResponse(body, encoding, chunk_size)
+    return asyncio.run(douyin._read_html_until_router_data(resp, decompressed)), resp
+
+
+class TestReadHtmlUntilRouterData(unittest.TestCase):
+    def test_stops_after_router_script_for_every_encoding(self):
+        page = _fixture("video_router.html")
+        mark = page.find(douyin._ROUTER_DATA_MARK)
+        expected = page[: page.find(douyin._SCRIPT_END, mark) + len(douyin._SCRIPT_END)]
+        full = parse_video_html(page, "fallback-id").to_dict()
+        for encoding, encode in ENCODERS.items():
+            body = encode(page)
+            for chunk_size in (7, 1000, 16 * 1024):
+                with self.subTest(encoding=encoding or "identity", chunk_size=chunk_size):
+                    html, resp = _read(body, encoding, chunk_size)
+                    self.assertEqual(html, expected)
+                    self.assertEqual(parse_video_html(html, "fallback-id").to_dict(), full)
+                    self.assertTrue(resp.closed)
+                    if not encoding:
+                        # 未压缩时可以确认 </script> 之后的内容没有继续读取
+                        self.assertLess(resp.content.read, len(resp.content.chunks))
+
+    def test_marker_split_across_chunks(self):
+        page = b"<html><script>window._ROUTER_DATA = {\"a\": 1}</script><p>tail</p>"
+        split = page.find(b"_ROUTER") + 3
+        resp = FakeResponse(b"", "", 1)
+        resp.content = FakeContent([page[:split], page[split: split + 20], page[split + 20:]])
+        html = asyncio.run(douyin._read_html_until_router_data(resp, True))
+        self.assertEqual(html, page[: page.find(b"</script>") + len(b"</script>")])
+
+    def test_script_end_split_across_chunks(self):
+        page = b"<script>window._ROUTER_DATA = {}</script>tail"
+        split = page.find(b"</script>") + 4
+        resp = FakeResponse(b"", "", 1)
+        resp.content = FakeContent([page[:split], page[split:]])
+        html = asyncio.run(douyin._read_html_until_router_data(resp, True))
+        self.assertEqual(html, page[: -len(b"tail")])
+
+    def test_page_without_router_data_is_read_fully(self):
+        page = _fixture("captcha.html")
+        for encoding, encode in ENCODERS.items():
+            with self.subTest(encoding=encoding or "identity"):
+                html, resp = _read(encode(page), encoding, 1000)
+                self.assertEqual(html, page)
+                self.assertFalse(resp.closed)
+                self.assertEqual(resp.content.read, len(resp.content.chunks))
+
+    def test_already_decompressed_body_is_not_decoded_again(self):
+        page = _fixture("note_router.html")
+        html, _ = _read(page, "gzip", 16 * 1024, decompressed=True)
+        self.assertTrue(html.startswith(page[:100]))
+        self.assertTrue(html.endswith(douyin._SCRIPT_END))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CONFIG
+import worker
+
+
+def _override(test, key, value):
+    original = CONFIG.get(key)
+    CONFIG.override(key, value)
+    test.addCleanup(CONFIG.override, key, original)
+
+
+class FakeLease:
+    def __init__(self, proxies):
+        self.proxies = proxies
+        self.closed = False
+
+    async def wait_ready(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, proxies):
+        self.lease = FakeLease(proxies)
+        self.released = None
+
+    async def lease_async(self, count):
+        return self.lease
+
+    def release(self, models):
+        self.released = list(models)
+
+
+class TestProcessJobs(unittest.TestCase):
+    def setUp(self):
+        _override(self, "IO_WORKERS_NUM", 10)
+        self.calls = []
+        self.completed = []
+        self.short_urls = {"https://v.douyin.com/b/": {"aweme_id": "7300000000000000002"}}
+
+        def fake_complete(job_id, lease, like_cnt, error="", aweme_id=None):
+            self.completed.append((job_id, like_cnt, error, aweme_id))
+            return True
+
+        for target, value in (
+            ("complete_job", fake_complete),
+            ("short_url_cache", mock.Mock(get=self.short_urls.get)),
+        ):
+            patcher = mock.patch.object(worker, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.jobs = [
+            {"id": 11, "lease": "l", "link": "https://v.douyin.com/a/", "aweme_id": "7300000000000000001"},
+            {"id": 12, "lease": "l", "link": "https://v.douyin.com/b/", "aweme_id": None},
+        ]
+
+    def _run(self, pool, likes):
+        async def fake_pending(orders, pending, proxies, max_workers, max_attempts, adaptive=False, limiter=None):
+            self.calls.append({"orders": orders, "pending": pending, "proxies": proxies, "max_workers": max_workers})
+            for i in pending:
+                yield i, likes[i]
+
+        with mock.patch.object(worker, "proxy_pool", pool), mock.patch.object(worker, "_iter_pending_likes", fake_pending):
+            asyncio.run(worker._process_jobs(self.jobs))
+
+    def test_jobs_go_through_the_shared_retry_queue(self):
+        pool = FakePool(["p"])
+        self._run(pool, [float("inf"), 42])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0]["pending"], [0, 1])
+        self.assertEqual(self.calls[0]["proxies"], ["p"])
+        # 并发数不超过本批任务数
+        self.assertEqual(self.calls[0]["max_workers"], 2)
+        self.assertEqual(self.completed, [
+            (11, None, "重试后仍失败", "7300000000000000001"),
+            (12, 42, "", "7300000000000000002"),
+        ])
+        self.assertTrue(pool.lease.closed)
+        self.assertEqual(pool.released, ["p"])
+
+    def test_no_proxies_leaves_jobs_for_lease_expiry(self):
+        pool = FakePool([])
+        self._run(pool, [1, 2])
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.completed, [])
+        self.assertTrue(pool.lease.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
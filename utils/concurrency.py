@@ -0,0 +1,66 @@
+# 自适应并发控制（AIMD：加性增、乘性减）
+import asyncio
+import time
+from typing import Optional
+
+# 这些错误说明上游在限流或拦截，需要降低并发
+BACKOFF_ERROR_CLASSES = {"timeout", "forbidden", "blocked"}
+
+
+class AIMDLimiter:
+    """
+    控制同时进行中的请求数：
+    - 成功且延迟未明显劣化时，每个成功请求增加 1/limit（约每轮增加 1）
+    - 遇到超时、403、验证码页时乘以 decrease_factor，冷却期内只降一次
+    - limit 始终在 [min_limit, max_limit] 之间，max_limit 即 IO_WORKERS_NUM
+    """
+
+    def __init__(self, max_limit: int, initial: int = 10, min_limit: int = 1, decrease_factor: float = 0.5, latency_tolerance: float = 2.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(max(self.min_limit, min(initial, self.max_limit)))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.inflight = 0
+        self._baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    @property
+    def current(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.inflight < self.current)
+            self.inflight += 1
+
+    async def release(self, latency: Optional[float] = None, error_class: Optional[str] = None) -> None:
+        """归还槽位并根据本次结果调整并发上限；error_class 为空表示成功"""
+        async with self._cond:
+            self.inflight = max(0, self.inflight - 1)
+            if error_class is None:
+                self._on_success(latency)
+            elif error_class in BACKOFF_ERROR_CLASSES:
+                self._on_overload()
+            self._cond.notify_all()
+
+    def _on_success(self, latency: Optional[float]) -> None:
+        if latency is not None:
+            # 基线取较慢收敛的最小延迟估计：延迟明显高于基线说明上游开始排队，不再加并发
+            if self._baseline is None or latency < self._baseline:
+                self._baseline = latency
+            else:
+                self._baseline = 0.95 * self._baseline + 0.05 * latency
+            if latency > self._baseline * self.latency_tolerance:
+                return
+        self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+
+    def _on_overload(self) -> None:
+        now = time.monotonic()
+        # 同一波失败往往同时返回，冷却时间内只减一次
+        cooldown = self._baseline or 1.0
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
@@ -1,14 +1,27 @@
 # 展开短链接
 import requests
-import re
 import datetime
-import json
-from urllib.parse import unquote
 import asyncio
+import random
+import threading
+import time
+import zlib
+import multiprocessing
+from contextlib import aclosing
 import aiohttp
 import logging
-from typing import List, Dict, Any, Optional
-from utils.owlproxy import owlproxy
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from utils.owlproxy import proxy_pool, proxy_key, proxy_id
+from utils.proxy_scorer import proxy_scorer, FetchError, classify_error
+from utils.concurrency import AIMDLimiter
+from utils.hedging import HedgeBudget, attempt_latency
+from utils.douyin_parser import parse_video_html
+from utils.parse_pool import parse_pool
+from utils.short_url_cache import short_url_cache
+from utils.like_cache import like_count_cache
+from utils.douyin_link import extract_aweme_id, canonical_share_url, is_short_link, share_base_url
+from utils.metrics import STAGE_SECONDS, FETCH_ATTEMPTS, PROXY_REQUESTS, INFLIGHT, LINKS_FINISHED, HEDGED_REQUESTS
+from utils.rate_limit import host_rate_limiter
 from config import CONFIG
 
 
@@ -34,22 +47,26 @@ def expand_short_url(short_url, proxy=None):
             return ""
 
 
-async def expand_short_url_async(session: aiohttp.ClientSession, short_url: str, proxy_url: Optional[str]) -> str:
+async def expand_short_url_async(session: aiohttp.ClientSession, short_url: str, proxy_url: Optional[str], rate_limit: bool = True) -> str:
+    """rate_limit 为 False 表示调用方已按域名限速取过令牌"""
     if "v.douyin.com" in short_url:
         try:
-            async with session.get(
-                short_url,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Mobile/15E148 Safari/604.1",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                    "Cache-Control": "no-cache",
-                },
-                allow_redirects=True,
-                timeout=aiohttp.ClientTimeout(total=10),
-                proxy=proxy_url,
-            ) as resp:
-                return str(resp.url)
+            if rate_limit:
+                await host_rate_limiter.wait(short_url)
+            with STAGE_SECONDS.time(stage="expand"):
+                async with session.get(
+                    short_url,
+                    headers={
+                        "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Mobile/15E148 Safari/604.1",
+                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+                        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+                        "Cache-Control": "no-cache",
+                    },
+                    allow_redirects=True,
+                    timeout=aiohttp.ClientTimeout(total=10),
+                    proxy=proxy_url,
+                ) as resp:
+                    return str(resp.url)
         except Exception as e:
             logging.error(f"短链展开失败: {e}")
             return ""
@@ -58,21 +75,9 @@ async def expand_short_url_async(session: aiohttp.ClientSession, short_url: str,
 
 def extract_video_id(url):
     """从抖音视频链接中提取视频ID。"""
-    patterns = [
-        r"/video/(\d+)",
-        r"/share/video/(\d+)",
-        r"aweme_id=(\d+)",
-        r"modal_id=(\d+)",
-        r"/(\d{19})/",  # 19位数字ID
-        r"/(\d{18})/",  # 18位数字ID
-        r"item_ids=(\d+)",
-        r"/note/(\d+)",
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+    aweme_id = extract_aweme_id(url)
+    if aweme_id:
+        return aweme_id
     current_millis = int(datetime.datetime.now().timestamp() * 1000)
     print(f"无法从链接中提取视频ID，使用当前时间戳作为备用ID: {current_millis}")
     return str(current_millis)
@@ -101,13 +106,14 @@ async def _decode_response_async(resp: aiohttp.ClientResponse) -> str:
     try:
         enc = (resp.headers.get("Content-Encoding") or "").lower()
         raw = await resp.read()
-        if "br" in enc:
-            import brotli
-            return brotli.decompress(raw or b"").decode("utf-8", errors="ignore")
-        try:
-            return raw.decode("utf-8", errors="ignore")
-        except Exception:
-            return await resp.text()
+        with STAGE_SECONDS.time(stage="decode"):
+            if "br" in enc:
+                import brotli
+                return brotli.decompress(raw or b"").decode("utf-8", errors="ignore")
+            try:
+                return raw.decode("utf-8", errors="ignore")
+            except Exception:
+                return await resp.text()
     except Exception:
         try:
             return await resp.text()
@@ -115,6 +121,71 @@ async def _decode_response_async(resp: aiohttp.ClientResponse) -> str:
             return ""
 
 
+_STREAM_CHUNK_SIZE = 16 * 1024
+_ROUTER_DATA_MARK = b"window._ROUTER_DATA"
+_SCRIPT_END = b"</script>"
+
+
+class _IdentityDecoder:
+    def process(self, data: bytes) -> bytes:
+        return data
+
+
+class _ZlibDecoder:
+    def __init__(self, wbits: int):
+        self._obj = zlib.decompressobj(wbits)
+
+    def process(self, data: bytes) -> bytes:
+        return self._obj.decompress(data)
+
+
+def _make_stream_decoder(encoding: str):
+    """按 Content-Encoding 创建增量解压器，均提供 process(bytes) -> bytes"""
+    if "br" in encoding:
+        import brotli
+
+        return brotli.Decompressor()
+    if "gzip" in encoding:
+        return _ZlibDecoder(16 + zlib.MAX_WBITS)
+    if "deflate" in encoding:
+        return _ZlibDecoder(zlib.MAX_WBITS)
+    return _IdentityDecoder()
+
+
+async def _read_html_until_router_data(resp: aiohttp.ClientResponse, decompressed: bool) -> bytes:
+    """
+    分块读取页面并增量解压，window._ROUTER_DATA 所在的 <script> 一结束就关闭连接，
+    后面的页面内容不再下载。decompressed 为 True 表示 aiohttp 已自动解压。
+    解压耗时累计后记入 decode 阶段。
+    """
+    encoding = "" if decompressed else (resp.headers.get("Content-Encoding") or "").lower()
+    decoder = _make_stream_decoder(encoding)
+    buf = bytearray()
+    scan_from = 0
+    router_pos = -1
+    decode_seconds = 0.0
+    try:
+        async for chunk in resp.content.iter_chunked(_STREAM_CHUNK_SIZE):
+            t0 = time.perf_counter()
+            buf += decoder.process(chunk)
+            decode_seconds += time.perf_counter() - t0
+            if router_pos < 0:
+                router_pos = buf.find(_ROUTER_DATA_MARK, scan_from)
+                if router_pos < 0:
+                    scan_from = max(0, len(buf) - len(_ROUTER_DATA_MARK))
+                    continue
+                scan_from = router_pos
+            end_pos = buf.find(_SCRIPT_END, scan_from)
+            if end_pos >= 0:
+                resp.close()
+                return bytes(buf[: end_pos + len(_SCRIPT_END)])
+            scan_from = max(router_pos, len(buf) - len(_SCRIPT_END))
+    finally:
+        if encoding:
+            STAGE_SECONDS.observe(decode_seconds, stage="decode")
+    return bytes(buf)
+
+
 def parse_video_id_from_url(url, video_id, proxy=None):
     """Python版的 parseVideoFromHtml，解析页面统计数据与视频信息"""
     try:
@@ -132,152 +203,13 @@ def parse_video_id_from_url(url, video_id, proxy=None):
         print("成功获取视频页面")
         # 使用通用解码，避免直接打印 resp.text 导致乱码
         html = _decode_response(resp)
-        # 基础字段尝试（可能用于兜底显示）
-        title_match = re.search(r"<title[^>]*>([^<]+)</title>", html, re.I)
-        desc_match = re.search(r'data-desc="([^"]+)"', html) or re.search(
-            r'description[^>]*content="([^"]+)"', html
-        )
-        author_match = re.search(r'data-author="([^"]+)"', html) or re.search(
-            r'"nickname":"([^"]+)"', html
-        )
-
-        # 解析 window._ROUTER_DATA
-        router_data = None
-        try:
-            m = re.search(
-                r"window\._ROUTER_DATA\s*=\s*({.+?});", html, re.S
-            ) or re.search(r"window\._ROUTER_DATA\s*=\s*({.+?})</script>", html, re.S)
-            if m:
-                print("成功解析 window._ROUTER_DATA")
-                router_data = json.loads(m.group(1))
-        except Exception:
-            router_data = None
-
-        # 统计字段
-        like_count = 0
-        comment_count = 0
-        share_count = 0
-        play_count = 0
-        collect_count = 0
-        forward_count = 0
-
-        # 优先从 _ROUTER_DATA 提取统计
-        try:
-            if router_data:
-                loader = router_data.get("loaderData", {})
-                page = (
-                    loader.get("video_(id)/page", {})
-                    if isinstance(loader, dict)
-                    else {}
-                )
-                info = page.get("videoInfoRes", {}) if isinstance(page, dict) else {}
-                item_list = info.get("item_list") or []
-                if isinstance(item_list, list) and item_list:
-                    stats = item_list[0].get("statistics") or {}
-                    like_count = int(stats.get("digg_count") or 0)
-                    comment_count = int(stats.get("comment_count") or 0)
-                    share_count = int(stats.get("share_count") or 0)
-                    play_count = int(stats.get("play_count") or 0)
-                    collect_count = int(stats.get("collect_count") or 0)
-                    forward_count = int(stats.get("forward_count") or 0)
-        except Exception:
-            pass
-
-        # 备用：从HTML中直接匹配
-        if like_count == 0 and re.search(r'"digg_count":\s*\d+', html):
-
-            def pick_int(pattern):
-                m = re.search(pattern, html)
-                return int(m.group(1)) if m else 0
-
-            like_count = pick_int(r'"digg_count":\s*(\d+)')
-            comment_count = pick_int(r'"comment_count":\s*(\d+)')
-            share_count = pick_int(r'"share_count":\s*(\d+)')
-            play_count = pick_int(r'"play_count":\s*(\d+)')
-            collect_count = pick_int(r'"collect_count":\s*(\d+)')
-            forward_count = pick_int(r'"forward_count":\s*(\d+)')
-
-        # 提取视频URL（优先 _ROUTER_DATA）
-        video_url = None
-        extracted_video_id = None
-        try:
-            if router_data:
-                loader = router_data.get("loaderData", {})
-                page = (
-                    loader.get("video_(id)/page", {})
-                    if isinstance(loader, dict)
-                    else {}
-                )
-                info = page.get("videoInfoRes", {}) if isinstance(page, dict) else {}
-                item_list = info.get("item_list") or []
-                if isinstance(item_list, list) and item_list:
-                    video_obj = item_list[0].get("video") or {}
-                    extracted_video_id = video_obj.get("play_addr", {}).get("uri")
-                    if extracted_video_id:
-                        video_url = f"https://aweme.snssdk.com/aweme/v1/play/?video_id={extracted_video_id}&ratio=720p&line=0"
-        except Exception:
-            pass
-
-        # 备用：从HTML拼接/提取
-        if not video_url:
-            m = re.search(r'"video":\{"play_addr":\{[^}]+"url_list":\["([^"]+)"', html)
-            original_url = m.group(1) if m else None
-            if not original_url:
-                m = re.search(r'"play_addr":\{"url_list":\["([^"]+)"', html)
-                original_url = m.group(1) if m else None
-            if original_url:
-                original_url = original_url.replace(r"\u002F", "/")
-                original_url = unquote(original_url)
-                vid_m = re.search(r"video_id=([^&]+)", original_url)
-                if vid_m:
-                    extracted_video_id = vid_m.group(1)
-                    video_url = f"https://aweme.snssdk.com/aweme/v1/play/?video_id={extracted_video_id}&ratio=720p&line=0"
-                else:
-                    video_url = original_url
-
-        # 封面与音乐信息
-        cover_m = re.search(r'"cover":\{"url_list":\["([^"]+)"', html)
-        cover_url = cover_m.group(1) if cover_m else None
-
-        music_title_m = re.search(r'"music":\{"title":"([^"]+)"', html)
-        music_author_m = re.search(r'"music":\{"author":"([^"]+)"', html)
-        music_url_m = re.search(r'"music":\{"play_url":\{"url_list":\["([^"]+)"', html)
-
-        # 标签
-        hashtags = []
-        for m in re.findall(r'"hashtag_name":"([^"]+)"', html):
-            hashtags.append(m)
-
-        result = {
-            "success": True,
-            "author": author_match.group(1) if author_match else "未知作者",
-            "authorId": "",
-            "publishTime": datetime.datetime.now().strftime("%Y-%m-%d"),
-            "likeCount": like_count,
-            "commentCount": comment_count,
-            "shareCount": share_count,
-            "playCount": play_count,
-            "collectCount": collect_count,
-            "forwardCount": forward_count,
-            "description": (desc_match.group(1) if desc_match else "无描述"),
-            "videoUrl": video_url,
-            "coverUrl": cover_url,
-            "videoId": extracted_video_id or video_id,
-            "duration": 0,
-            "width": 0,
-            "height": 0,
-            "musicTitle": music_title_m.group(1) if music_title_m else "",
-            "musicAuthor": music_author_m.group(1) if music_author_m else "",
-            "musicUrl": music_url_m.group(1) if music_url_m else "",
-            "hashtags": hashtags,
-        }
-        return result
+        return parse_video_html(html, video_id).to_dict()
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-async def parse_video_id_from_url_async(session: aiohttp.ClientSession, url: str, video_id: str, proxy_url: Optional[str]) -> Dict[str, Any]:
-    """异步解析页面统计数据与视频信息"""
+async def parse_video_id_from_url_async(session: aiohttp.ClientSession, url: str, video_id: str, proxy_url: Optional[str], rate_limit: bool = True) -> Dict[str, Any]:
+    """异步解析页面统计数据与视频信息；rate_limit 为 False 表示调用方已按域名限速取过令牌"""
     try:
         headers = {
             "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Mobile/15E148 Safari/604.1",
@@ -287,154 +219,25 @@ async def parse_video_id_from_url_async(session: aiohttp.ClientSession, url: str
             "Connection": "keep-alive",
             "Upgrade-Insecure-Requests": "1",
         }
-        async with session.get(
-            url, headers=headers, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=15), proxy=proxy_url
-        ) as resp:
-            logging.info("成功获取视频页面")
-            html = await _decode_response_async(resp)
-
-        # 基础字段尝试（可能用于兜底显示）
-        title_match = re.search(r"<title[^>]*>([^<]+)</title>", html, re.I)
-        desc_match = re.search(r'data-desc="([^"]+)"', html) or re.search(
-            r'description[^>]*content="([^"]+)"', html
-        )
-        author_match = re.search(r'data-author="([^"]+)"', html) or re.search(
-            r'"nickname":"([^"]+)"', html
-        )
-
-        # 解析 window._ROUTER_DATA
-        router_data = None
-        try:
-            m = re.search(
-                r"window\._ROUTER_DATA\s*=\s*({.+?});", html, re.S
-            ) or re.search(r"window\._ROUTER_DATA\s*=\s*({.+?})</script>", html, re.S)
-            if m:
-                logging.info("成功解析 window._ROUTER_DATA")
-                router_data = json.loads(m.group(1))
-        except Exception:
-            router_data = None
-
-        # 统计字段
-        like_count = 0
-        comment_count = 0
-        share_count = 0
-        play_count = 0
-        collect_count = 0
-        forward_count = 0
-
-        # 优先从 _ROUTER_DATA 提取统计
-        try:
-            if router_data:
-                loader = router_data.get("loaderData", {})
-                page = (
-                    loader.get("video_(id)/page", {})
-                    if isinstance(loader, dict)
-                    else {}
-                )
-                info = page.get("videoInfoRes", {}) if isinstance(page, dict) else {}
-                item_list = info.get("item_list") or []
-                if isinstance(item_list, list) and item_list:
-                    stats = item_list[0].get("statistics") or {}
-                    like_count = int(stats.get("digg_count") or 0)
-                    comment_count = int(stats.get("comment_count") or 0)
-                    share_count = int(stats.get("share_count") or 0)
-                    play_count = int(stats.get("play_count") or 0)
-                    collect_count = int(stats.get("collect_count") or 0)
-                    forward_count = int(stats.get("forward_count") or 0)
-        except Exception:
-            pass
-
-        # 备用：从HTML中直接匹配
-        if like_count == 0 and re.search(r'"digg_count":\s*\d+', html):
-
-            def pick_int(pattern):
-                m = re.search(pattern, html)
-                return int(m.group(1)) if m else 0
-
-            like_count = pick_int(r'"digg_count":\s*(\d+)')
-            comment_count = pick_int(r'"comment_count":\s*(\d+)')
-            share_count = pick_int(r'"share_count":\s*(\d+)')
-            play_count = pick_int(r'"play_count":\s*(\d+)')
-            collect_count = pick_int(r'"collect_count":\s*(\d+)')
-            forward_count = pick_int(r'"forward_count":\s*(\d+)')
-
-        # 提取视频URL（优先 _ROUTER_DATA）
-        video_url = None
-        extracted_video_id = None
-        try:
-            if router_data:
-                loader = router_data.get("loaderData", {})
-                page = (
-                    loader.get("video_(id)/page", {})
-                    if isinstance(loader, dict)
-                    else {}
-                )
-                info = page.get("videoInfoRes", {}) if isinstance(page, dict) else {}
-                item_list = info.get("item_list") or []
-                if isinstance(item_list, list) and item_list:
-                    video_obj = item_list[0].get("video") or {}
-                    extracted_video_id = video_obj.get("play_addr", {}).get("uri")
-                    if extracted_video_id:
-                        video_url = f"https://aweme.snssdk.com/aweme/v1/play/?video_id={extracted_video_id}&ratio=720p&line=0"
-        except Exception:
-            pass
-
-        # 备用：从HTML拼接/提取
-        if not video_url:
-            m = re.search(r'"video":\{"play_addr":\{[^}]+"url_list":\["([^"]+)"', html)
-            original_url = m.group(1) if m else None
-            if not original_url:
-                m = re.search(r'"play_addr":\{"url_list":\["([^"]+)"', html)
-                original_url = m.group(1) if m else None
-            if original_url:
-                original_url = original_url.replace(r"\u002F", "/")
-                original_url = unquote(original_url)
-                vid_m = re.search(r"video_id=([^&]+)", original_url)
-                if vid_m:
-                    extracted_video_id = vid_m.group(1)
-                    video_url = f"https://aweme.snssdk.com/aweme/v1/play/?video_id={extracted_video_id}&ratio=720p&line=0"
+        if rate_limit:
+            await host_rate_limiter.wait(url)
+        with STAGE_SECONDS.time(stage="page_fetch"):
+            async with session.get(
+                url, headers=headers, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=15), proxy=proxy_url
+            ) as resp:
+                if resp.status >= 400:
+                    resp.raise_for_status()
+                logging.info("成功获取视频页面")
+                if str(CONFIG.get("STREAM_FETCH", "1")) == "1":
+                    html = await _read_html_until_router_data(resp, getattr(session, "auto_decompress", True))
                 else:
-                    video_url = original_url
-
-        # 封面与音乐信息
-        cover_m = re.search(r'"cover":\{"url_list":\["([^"]+)"', html)
-        cover_url = cover_m.group(1) if cover_m else None
-
-        music_title_m = re.search(r'"music":\{"title":"([^"]+)"', html)
-        music_author_m = re.search(r'"music":\{"author":"([^"]+)"', html)
-        music_url_m = re.search(r'"music":\{"play_url":\{"url_list":\["([^"]+)"', html)
-
-        # 标签
-        hashtags = []
-        for m in re.findall(r'"hashtag_name":"([^"]+)"', html):
-            hashtags.append(m)
-
-        result = {
-            "success": True,
-            "author": author_match.group(1) if author_match else "未知作者",
-            "authorId": "",
-            "publishTime": datetime.datetime.now().strftime("%Y-%m-%d"),
-            "likeCount": like_count,
-            "commentCount": comment_count,
-            "shareCount": share_count,
-            "playCount": play_count,
-            "collectCount": collect_count,
-            "forwardCount": forward_count,
-            "description": (desc_match.group(1) if desc_match else "无描述"),
-            "videoUrl": video_url,
-            "coverUrl": cover_url,
-            "videoId": extracted_video_id or video_id,
-            "duration": 0,
-            "width": 0,
-            "height": 0,
-            "musicTitle": music_title_m.group(1) if music_title_m else "",
-            "musicAuthor": music_author_m.group(1) if music_author_m else "",
-            "musicUrl": music_url_m.group(1) if music_url_m else "",
-            "hashtags": hashtags,
-        }
-        return result
+                    html = await _decode_response_async(resp)
+
+        # 解析放到线程池/进程池中，事件循环只做网络 I/O
+        with STAGE_SECONDS.time(stage="parse"):
+            return await parse_pool.parse(html, video_id)
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return {"success": False, "error": str(e), "errorClass": classify_error(e)}
 
 
 def _build_proxy_url(model) -> str:
@@ -462,74 +265,475 @@ def _proxy_label(model) -> str:
         host_port = host
     else:
         host_port = f"{host}:{port}"
-    return f"{scheme}://{host_port}"
+    return f"{scheme}://{host_port}#{proxy_id(model)}"
+
+
+def _rate_limited_urls(link: str, aweme_id: Optional[str] = None) -> List[str]:
+    """一次抓取会请求的地址（与 _fetch_like_once 的分支一致），用于按域名取令牌"""
+    if aweme_id:
+        return [canonical_share_url(aweme_id, link)]
+    cached = short_url_cache.get(link) if is_short_link(link) else None
+    if cached:
+        return [cached["url"]]
+    if is_short_link(link):
+        return [link, share_base_url()]
+    return [link]
+
+
+async def _wait_rate_limits(link: str, aweme_id: Optional[str] = None) -> None:
+    """
+    抓取前按域名限速取令牌。放在计时之外，等待自己的限速不计入请求耗时
+    （代理评分、对冲阈值、自适应并发与 attempt 阶段指标都只看实际请求）
+    """
+    for url in _rate_limited_urls(link, aweme_id):
+        await host_rate_limiter.wait(url)
+
+
+async def _fetch_like_once(session: aiohttp.ClientSession, link: str, proxy_model, aweme_id: Optional[str] = None) -> int:
+    """使用指定代理抓取一次点赞数，失败抛出 FetchError。已知作品ID时跳过短链展开；限速令牌由调用方提前获取"""
+    proxy_url = _build_proxy_url(proxy_model)
+    cached = short_url_cache.get(link) if not aweme_id and is_short_link(link) else None
+    if aweme_id:
+        expanded_url = canonical_share_url(aweme_id, link)
+        video_id = aweme_id
+    elif cached:
+        expanded_url = cached["url"]
+        video_id = cached["aweme_id"]
+    else:
+        expanded_url = await expand_short_url_async(session, link, proxy_url, rate_limit=False)
+        video_id = extract_video_id(expanded_url or link)
+        if expanded_url and expanded_url != link and extract_aweme_id(expanded_url):
+            short_url_cache.put(link, expanded_url, video_id)
+    info = await parse_video_id_from_url_async(session, expanded_url or link, video_id, proxy_url, rate_limit=False)
+    if not info.get("success"):
+        raise FetchError(info.get("errorClass") or "parse", info.get("error") or "")
+    if info.get("source") == "none":
+        # 页面里既没有 _ROUTER_DATA 也没有统计字段，通常是验证码/风控中间页
+        raise FetchError("blocked", "页面无作品数据，可能是验证码页")
+    like_cnt = int(info.get("likeCount", 0))
+    like_count_cache.put(aweme_id or extract_aweme_id(expanded_url or link), like_cnt)
+    return like_cnt
+
+
+async def _fetch_like_attempt(session: aiohttp.ClientSession, link: str, proxies: List, tried: set, aweme_id: Optional[str] = None, rate_limited: bool = False) -> int:
+    """
+    按评分挑选一个未试过的代理抓取一次，并把耗时与结果记入代理评分。
+    rate_limited 为 True 表示调用方已取过限速令牌，否则先取令牌再开始计时
+    """
+    if not rate_limited:
+        await _wait_rate_limits(link, aweme_id)
+    proxy_model = proxy_scorer.choose(proxies, exclude=tried)
+    key = proxy_key(proxy_model)
+    tried.add(key)
+    label = _proxy_label(proxy_model)
+    metric_id = proxy_id(proxy_model)
+    start = time.monotonic()
+    try:
+        logging.info(f"使用代理 {label} 抓取: {link}")
+        with INFLIGHT.track(), STAGE_SECONDS.time(stage="attempt"):
+            like_cnt = await _fetch_like_once(session, link, proxy_model, aweme_id)
+    except asyncio.CancelledError:
+        proxy_scorer.cancel(proxy_model)
+        PROXY_REQUESTS.inc(proxy=metric_id, outcome="cancelled")
+        raise
+    except Exception as e:
+        error_class = classify_error(e)
+        proxy_scorer.done(proxy_model, time.monotonic() - start, error_class)
+        FETCH_ATTEMPTS.inc(outcome=error_class)
+        PROXY_REQUESTS.inc(proxy=metric_id, outcome=error_class)
+        raise FetchError(error_class, f"代理 {label}: {e}") from e
+    latency = time.monotonic() - start
+    proxy_scorer.done(proxy_model, latency)
+    attempt_latency.observe(latency)
+    FETCH_ATTEMPTS.inc(outcome="success")
+    PROXY_REQUESTS.inc(proxy=metric_id, outcome="success")
+    logging.info(f"[成功] 代理 {label} 获取点赞数: {like_cnt}")
+    return like_cnt
+
+
+async def _fetch_like_hedged(
+    session: aiohttp.ClientSession,
+    link: str,
+    proxies: List,
+    tried: set,
+    aweme_id: Optional[str] = None,
+    hedge: Optional[HedgeBudget] = None,
+    rate_limited: bool = False,
+) -> int:
+    """
+    一次抓取尝试；hedge 不为空且超过对冲等待时间仍未完成时，再用另一个代理发一份，
+    先成功的生效并取消另一份。两份都失败时抛出后失败的那个错误。
+    对冲等待从取到限速令牌之后开始计时；对冲请求自己另取令牌
+    """
+    if hedge is None or len(proxies) < 2:
+        return await _fetch_like_attempt(session, link, proxies, tried, aweme_id, rate_limited)
+    if not rate_limited:
+        await _wait_rate_limits(link, aweme_id)
+    delay = hedge.delay()
+    primary = asyncio.create_task(_fetch_like_attempt(session, link, proxies, tried, aweme_id, rate_limited=True))
+    tasks = {primary}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and hedge.try_acquire():
+                logging.info(f"[对冲] 超过 {delay:.1f}s 未完成，换代理再发一次: {link}")
+                HEDGED_REQUESTS.inc(outcome="sent")
+                tasks.add(asyncio.create_task(_fetch_like_attempt(session, link, proxies, tried, aweme_id)))
+        error: Optional[BaseException] = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if t is not primary:
+                        HEDGED_REQUESTS.inc(outcome="won")
+                    return t.result()
+                error = t.exception()
+        raise error
+    finally:
+        for t in tasks:
+            t.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _retry_delay(attempt: int) -> float:
+    """第 attempt 次失败后的退避时间：指数增长并加入随机抖动，上限 30 秒"""
+    base = float(CONFIG.get("FETCH_RETRY_BACKOFF", 1.0))
+    return min(30.0, base * (2 ** (attempt - 1))) * random.uniform(0.5, 1.5)
+
+
+def _max_attempts(max_attempts: Optional[int] = None) -> int:
+    return max(1, int(max_attempts or CONFIG.get("FETCH_MAX_ATTEMPTS", 3)))
+
+
+async def batch_aweme_likes(orders: List[Dict[str, Any]], max_attempts: Optional[int] = None) -> List[int]:
+    """
+    批量并发获取点赞数（aiohttp），每次请求使用不同代理，失败返回正无穷。并发度受限于 CONFIG['IO_WORKERS_NUM']。
+    点赞数缓存中未过期的作品直接使用缓存，只抓取缺失或过期的。
+    max_attempts 为本次每个链接的最多尝试次数，默认取 CONFIG['FETCH_MAX_ATTEMPTS']。
+    结果顺序与 orders 一致；需要边抓边处理时使用 iter_aweme_likes。
+    """
+    orders = orders or []
+    results: List[Any] = [None] * len(orders)
+    async for i, like_cnt in _iter_indexed_likes(orders, max_attempts):
+        results[i] = like_cnt
+    return results
 
 
-async def _fetch_like_with_retry(session: aiohttp.ClientSession, link: str, proxies: List, attempt_proxies_per_task: List) -> int:
-    """对单个链接尝试最多3次，分别使用不同代理。成功返回点赞数，失败返回正无穷"""
-    for i in range(3):
-        proxy_model = attempt_proxies_per_task[i % len(attempt_proxies_per_task)]
-        proxy_url = _build_proxy_url(proxy_model)
-        label = _proxy_label(proxy_model)
-        try:
-            logging.info(f"[尝试 {i+1}/3] 使用代理 {label} 抓取: {link}")
-            expanded_url = await expand_short_url_async(session, link, proxy_url)
-            video_id = extract_video_id(expanded_url or link)
-            info = await parse_video_id_from_url_async(session, expanded_url or link, video_id, proxy_url)
-            if info.get("success"):
-                like_cnt = int(info.get("likeCount", 0))
-                logging.info(f"[成功] 代理 {label} 获取点赞数: {like_cnt}")
-                return like_cnt
-            else:
-                logging.warning(f"[失败] 代理 {label} 解析失败: {info.get('error')}")
-        except Exception as e:
-            logging.error(f"[异常] 代理 {label} 第 {i+1} 次失败: {e}")
-            continue
-    logging.error(f"[放弃] 链接重试3次失败: {link}")
-    return float("inf")
+async def iter_aweme_likes(orders: List[Dict[str, Any]], max_attempts: Optional[int] = None) -> AsyncIterator[Tuple[Dict[str, Any], Any]]:
+    """与 batch_aweme_likes 相同的抓取流程，但每个链接完成就产出 (order, 点赞数)，顺序为完成顺序"""
+    orders = orders or []
+    async for i, like_cnt in _iter_indexed_likes(orders, max_attempts):
+        yield orders[i], like_cnt
 
 
-async def batch_aweme_likes(orders: List[Dict[str, Any]]) -> List[int]:
-    """批量并发获取点赞数（aiohttp），每次请求使用不同代理，失败返回正无穷。并发度受限于 CONFIG['IO_WORKERS_NUM']"""
-    orders = orders or []
+async def _iter_indexed_likes(orders: List[Dict[str, Any]], max_attempts: Optional[int] = None) -> AsyncIterator[Tuple[int, Any]]:
+    """按完成顺序产出 (订单下标, 点赞数)：先产出缓存命中的，再产出实时抓取的"""
     if not orders:
-        return []
+        return
+
+    like_count_cache.configure(
+        ttl=int(CONFIG.get("LIKE_CACHE_TTL", 600)),
+        max_size=int(CONFIG.get("LIKE_CACHE_MAX_SIZE", 50000)),
+    )
+    pending: List[int] = []
+    cached: List[Tuple[int, int]] = []
+    for i, o in enumerate(orders):
+        cached_like = like_count_cache.get(o.get("aweme_id"))
+        if cached_like is None:
+            pending.append(i)
+        else:
+            cached.append((i, cached_like))
+    logging.info(f"点赞数缓存命中 {len(cached)} 条，需抓取 {len(pending)} 条，缓存状态 {like_count_cache.stats()}")
+    if cached:
+        LINKS_FINISHED.inc(len(cached), result="cached")
+    for item in cached:
+        yield item
+    if not pending:
+        return
 
     max_workers_cfg = int(CONFIG.get("IO_WORKERS_NUM", 10))
-    max_workers = max(1, min(max_workers_cfg, len(orders)))
-    logging.info(f"开始批量获取点赞数：共 {len(orders)} 个订单，并发度 {max_workers}")
-
-    # 创建足够数量的动态代理
-    need = max(len(orders), 1)
-    result = owlproxy.create_dynamic_proxies(good_num=need)
-    proxies = result.data or []
-    logging.info(f"已创建动态代理数量: {len(proxies)} (需求 {need})")
+    max_workers = max(1, min(max_workers_cfg, len(pending)))
+    adaptive = str(CONFIG.get("ADAPTIVE_CONCURRENCY", "1")) == "1"
+    logging.info(f"开始批量获取点赞数：共 {len(pending)} 个订单，并发度{'上限' if adaptive else ''} {max_workers}")
+
+    # 从代理池租用足够数量的动态代理（复用仍有效的，不足时在后台分批补建），
+    # 拿到第一批代理就开始抓取，后续批次到达后自动加入 proxies
+    need = max(len(pending), 1)
+    lease = await proxy_pool.lease_async(need)
+    try:
+        shards = min(int(CONFIG.get("SCRAPE_SHARDS", 1) or 1), len(pending))
+        if shards > 1:
+            # 分片需要一次性把代理分给各子进程，等补建全部完成
+            await lease.wait_complete()
+            shards = min(shards, len(lease.proxies))
+        else:
+            await lease.wait_ready()
+        proxies = lease.proxies
+        logging.info(f"已租用动态代理数量: {len(proxies)} (需求 {need}{'，其余后台补建中' if lease.filling else ''})，代理池状态 {proxy_pool.stats()}")
+        if shards > 1:
+            items = _iter_sharded_likes(orders, pending, proxies, max_workers, _max_attempts(max_attempts), adaptive, shards)
+        else:
+            items = _iter_pending_likes(orders, pending, proxies, max_workers, _max_attempts(max_attempts), adaptive)
+        # 提前停止时先关闭 items（终止分片子进程/取消抓取协程），再归还代理
+        async with aclosing(items) as results:
+            async for item in results:
+                yield item
+    finally:
+        await lease.close()
+        proxy_pool.release(lease.proxies)
+
+
+def _shard_rate_limits(shards: int) -> Dict[str, Any]:
+    """
+    分片子进程使用的 HOST_RATE_LIMITS：每个域名的 rate 与 burst 按分片数平分，
+    各子进程各有一份令牌桶，合计仍不超过配置的进程级限速
+    """
+    scaled: Dict[str, Any] = {}
+    for host, conf in (CONFIG.get("HOST_RATE_LIMITS", {}) or {}).items():
+        if not isinstance(conf, dict):
+            continue
+        scaled[host] = {
+            "rate": float(conf.get("rate", 0) or 0) / shards,
+            "burst": max(1, int(conf.get("burst", 1) or 1) // shards),
+        }
+    return scaled
+
+
+def _scrape_shard(
+    orders: List[Dict[str, Any]],
+    proxies: List,
+    max_workers: int,
+    max_attempts: int,
+    adaptive: bool,
+    initial_limit: Optional[float] = None,
+    rate_limits: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Tuple[int, Any]], List[Tuple[str, str, str]], Optional[float]]:
+    """
+    分片子进程入口：用自己的事件循环与 aiohttp 会话抓取 orders，
+    返回 ([(分片内下标, 点赞数)], [(短链, 展开地址, 作品ID)], 自适应并发收敛值)，短链缓存由父进程合并落盘。
+    rate_limits 为父进程按分片数平分后的限速；initial_limit 为该分片上一块收敛到的并发数，
+    使自适应并发跨块延续而不是每块都从 ADAPTIVE_INITIAL_WORKERS 重新开始
+    """
+    short_url_cache.persist = False
+    if rate_limits is not None:
+        # spawn 的子进程重新读取 config.json，这里只在内存中替换为分到的限速
+        CONFIG.override("HOST_RATE_LIMITS", rate_limits)
+
+    async def run() -> Tuple[List[Tuple[int, Any]], Optional[float]]:
+        limiter = None
+        if adaptive:
+            initial = _adaptive_initial_limit() if initial_limit is None else initial_limit
+            limiter = AIMDLimiter(max_limit=max_workers, initial=initial)
+        found: List[Tuple[int, Any]] = []
+        async for item in _iter_pending_likes(orders, list(range(len(orders))), proxies, max_workers, max_attempts, adaptive, limiter=limiter):
+            found.append(item)
+        return found, (limiter.limit if limiter is not None else None)
+
+    results, final_limit = asyncio.run(run())
+    expanded = []
+    for o in orders:
+        link = o.get("link") or ""
+        entry = short_url_cache.get(link) if is_short_link(link) else None
+        if entry:
+            expanded.append((link, entry["url"], entry["aweme_id"]))
+    return results, expanded, final_limit
+
+
+async def _iter_sharded_likes(orders: List[Dict[str, Any]], pending: List[int], proxies: List, max_workers: int, max_attempts: int, adaptive: bool, shards: int) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    多进程分片抓取：pending 与代理按轮转方式分成 shards 份，每份再切成 SCRAPE_SHARD_CHUNK 个订单的小块，
+    依次交给进程池运行 _iter_pending_likes（同一份同时只有一块在跑，代理不会被两个进程同时使用），
+    并发上限 max_workers 与按域名限速在各分片间平分；自适应模式下每个分片记住上一块收敛到的并发数，
+    下一块从这里继续。每块完成就产出其结果（订单下标还原为全局下标）。
+    调用方提前停止时终止子进程，调用方随后才归还代理。
+    """
+    per_shard_workers = max(1, max_workers // shards)
+    chunk_size = max(1, int(CONFIG.get("SCRAPE_SHARD_CHUNK", 50) or 50))
+    rate_limits = _shard_rate_limits(shards)
+    shard_limits: List[Optional[float]] = [None] * shards
+    if adaptive:
+        shard_limits = [float(max(1, min(per_shard_workers, _adaptive_initial_limit() // shards)))] * shards
+    logging.info(f"分片抓取：{shards} 个子进程，每个并发上限 {per_shard_workers}，每块 {chunk_size} 个订单")
+    loop = asyncio.get_running_loop()
+    # 界面与自动导出都运行在多线程进程中，使用 spawn 避免 fork 带来的锁状态问题
+    pool = multiprocessing.get_context("spawn").Pool(processes=shards)
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    def submit(shard_orders: List[Dict[str, Any]], shard_proxies: List, initial_limit: Optional[float]) -> asyncio.Future:
+        """在进程池中运行一块，结果通过事件循环的 Future 返回"""
+        fut = loop.create_future()
+
+        def settle(setter, value) -> None:
+            if not fut.done():
+                setter(value)
+
+        pool.apply_async(
+            _scrape_shard,
+            (shard_orders, shard_proxies, per_shard_workers, max_attempts, adaptive, initial_limit, rate_limits),
+            callback=lambda r: loop.call_soon_threadsafe(settle, fut.set_result, r),
+            error_callback=lambda e: loop.call_soon_threadsafe(settle, fut.set_exception, e),
+        )
+        return fut
+
+    async def run_shard(k: int) -> None:
+        shard_indices, shard_proxies = pending[k::shards], proxies[k::shards]
+        for start in range(0, len(shard_indices), chunk_size):
+            indices = shard_indices[start: start + chunk_size]
+            shard_orders = [{"link": orders[i].get("link") or "", "aweme_id": orders[i].get("aweme_id")} for i in indices]
+            try:
+                results, expanded, final_limit = await submit(shard_orders, shard_proxies, shard_limits[k])
+            except Exception as e:  # noqa: BLE001
+                logging.error(f"分片子进程异常，{len(indices)} 个订单按失败处理: {e}")
+                results, expanded, final_limit = [(n, float("inf")) for n in range(len(indices))], [], None
+            if final_limit is not None:
+                shard_limits[k] = final_limit
+            chunks.put_nowait((indices, results, expanded))
+
+    tasks = [asyncio.create_task(run_shard(k)) for k in range(shards)]
+    remaining = len(pending)
+    try:
+        while remaining > 0:
+            indices, results, expanded = await chunks.get()
+            remaining -= len(indices)
+            expanded_ids = {}
+            for link, url, aweme_id in expanded:
+                short_url_cache.put(link, url, aweme_id)
+                expanded_ids[link] = aweme_id
+            for local_i, like_cnt in results:
+                i = indices[local_i]
+                # 子进程中的指标不会回到父进程，完成数在这里统计
+                if like_cnt != float("inf"):
+                    like_count_cache.put(orders[i].get("aweme_id") or expanded_ids.get(orders[i].get("link") or ""), like_cnt)
+                    LINKS_FINISHED.inc(result="success")
+                else:
+                    LINKS_FINISHED.inc(result="failed")
+                yield i, like_cnt
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if remaining > 0:
+            # 提前停止：终止仍在抓取的子进程，保证归还的代理不再被使用
+            logging.info(f"分片抓取提前结束，终止子进程（剩余 {remaining} 个订单）")
+            pool.terminate()
+        else:
+            pool.close()
+            if adaptive and len(pending) >= int(CONFIG.get("IO_WORKERS_NUM", 10)):
+                _remember_adaptive_limit(sum(shard_limits))
+        await asyncio.to_thread(pool.join)
+        await asyncio.to_thread(short_url_cache.flush)
+
+
+# 自适应模式上一次收敛到的并发数，下一次运行从这里起步；界面与自动导出线程共用，读写加锁
+_adaptive_last_limit: Optional[float] = None
+_adaptive_lock = threading.Lock()
+
+
+def _adaptive_initial_limit() -> int:
+    with _adaptive_lock:
+        if _adaptive_last_limit is not None:
+            return int(_adaptive_last_limit)
+    return int(CONFIG.get("ADAPTIVE_INITIAL_WORKERS", 10))
+
+
+def _remember_adaptive_limit(limit: float) -> None:
+    global _adaptive_last_limit
+    with _adaptive_lock:
+        _adaptive_last_limit = limit
+
+
+async def _iter_pending_likes(
+    orders: List[Dict[str, Any]],
+    pending: List[int],
+    proxies: List,
+    max_workers: int,
+    max_attempts: int,
+    adaptive: bool = False,
+    limiter: Optional[AIMDLimiter] = None,
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    使用租到的代理抓取 pending 中的订单，每完成一个产出 (订单下标, 点赞数)。
+    max_workers 个工作协程从队列取任务，每次只做一次尝试；失败的任务退避后重新入队，
+    等待期间不占用并发槽位。adaptive 为 True 时由 AIMDLimiter 在 max_workers 以内动态调整同时进行的请求数。
+    limiter 由调用方传入时直接使用（分片子进程跨块延续收敛值），收敛值由调用方自行保存。
+    调用方提前停止迭代时，未完成的任务会被取消。
+    """
     if not proxies:
         logging.error("未能创建任何代理，返回正无穷")
-        return [float("inf")] * len(orders)
-
-    # 为每个任务分配至少一个不同代理；若不足则循环复用（每个任务最多分配3个候选代理用于重试）
-    per_task_proxies = []
-    for idx in range(len(orders)):
-        candidates = [proxies[(idx + k) % len(proxies)] for k in range(min(3, len(proxies)))]
-        per_task_proxies.append(candidates)
-        labels = ", ".join(_proxy_label(p) for p in candidates)
-        logging.debug(f"任务 {idx} 分配代理: {labels}")
+        LINKS_FINISHED.inc(len(pending), result="failed")
+        for i in pending:
+            yield i, float("inf")
+        return
 
     timeout = aiohttp.ClientTimeout(total=20)
     connector = aiohttp.TCPConnector(limit=max_workers, ssl=False)
-    sem = asyncio.Semaphore(max_workers)
-
-    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-        async def limited_fetch(i: int, o: Dict[str, Any]):
-            async with sem:
-                return await _fetch_like_with_retry(session, (o.get("link") or ""), proxies, per_task_proxies[i])
-
-        tasks = [limited_fetch(i, o) for i, o in enumerate(orders)]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
+    # 流式模式下由 _read_html_until_router_data 自行增量解压
+    auto_decompress = str(CONFIG.get("STREAM_FETCH", "1")) != "1"
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector, auto_decompress=auto_decompress) as session:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        for i in pending:
+            queue.put_nowait((i, 1, set()))
+        completed: asyncio.Queue = asyncio.Queue()
+        retry_timers: List[asyncio.TimerHandle] = []
+
+        hedge = HedgeBudget.from_config()
+        own_limiter = limiter is None
+        if adaptive and limiter is None:
+            limiter = AIMDLimiter(max_limit=max_workers, initial=_adaptive_initial_limit())
+
+        async def worker() -> None:
+            while True:
+                i, attempt, tried = await queue.get()
+                link = orders[i].get("link") or ""
+                if limiter is not None:
+                    await limiter.acquire()
+                # 限速等待不计入自适应并发的延迟信号
+                await _wait_rate_limits(link, orders[i].get("aweme_id"))
+                start = time.monotonic()
+                try:
+                    like_cnt = await _fetch_like_hedged(session, link, proxies, tried, orders[i].get("aweme_id"), hedge, rate_limited=True)
+                except Exception as e:  # noqa: BLE001
+                    error_class = classify_error(e)
+                    if limiter is not None:
+                        await limiter.release(time.monotonic() - start, error_class)
+                    if attempt < max_attempts:
+                        delay = _retry_delay(attempt)
+                        logging.warning(f"[重试] 第 {attempt}/{max_attempts} 次失败 ({error_class})，{delay:.1f}s 后重新入队: {link}")
+                        retry_timers.append(loop.call_later(delay, queue.put_nowait, (i, attempt + 1, tried)))
+                    else:
+                        logging.error(f"[放弃] 链接重试{max_attempts}次失败 ({error_class}): {link}")
+                        LINKS_FINISHED.inc(result="failed")
+                        completed.put_nowait((i, float("inf")))
+                else:
+                    if limiter is not None:
+                        await limiter.release(time.monotonic() - start)
+                    LINKS_FINISHED.inc(result="success")
+                    completed.put_nowait((i, like_cnt))
 
-    logging.info("批量获取完成")
-    return results
+        workers = [asyncio.create_task(worker()) for _ in range(max_workers)]
+        try:
+            for _ in range(len(pending)):
+                yield await completed.get()
+        finally:
+            for timer in retry_timers:
+                timer.cancel()
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if limiter is not None:
+                # 订单数少于 IO_WORKERS_NUM 时上限被订单数压低，收敛值不代表上游能承受的并发，不记住
+                if own_limiter and len(pending) >= int(CONFIG.get("IO_WORKERS_NUM", 10)):
+                    _remember_adaptive_limit(limiter.limit)
+                logging.info(f"自适应并发收敛到 {limiter.current}（上限 {max_workers}）")
+            if hedge is not None:
+                logging.info(f"对冲请求 {hedge.hedges} 次（共 {hedge.attempts} 次尝试）")
+            # 短链缓存最多有 SHORT_URL_CACHE_MAX_SIZE 条，序列化写盘放到线程中，不阻塞事件循环（界面导出时是 NiceGUI 的循环）
+            await asyncio.to_thread(short_url_cache.flush)
+
+    logging.info(f"批量获取完成，代理评分 {proxy_scorer.summary()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+# 抖音链接规范化：尽量在本地得到作品ID，只有真正的短链才需要走网络展开
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from config import CONFIG
+from utils.short_url_cache import short_url_cache
+
+SHORT_LINK_HOST = "v.douyin.com"
+# 分享页地址前缀，可通过 CONFIG['DOUYIN_SHARE_BASE'] 覆盖（本地模拟时使用 http）
+DEFAULT_SHARE_BASE = "https://www.iesdouyin.com"
+
+_VIDEO_ID_PATTERNS = [
+    re.compile(r"/video/(\d+)"),
+    re.compile(r"/share/video/(\d+)"),
+    re.compile(r"aweme_id=(\d+)"),
+    re.compile(r"modal_id=(\d+)"),
+    re.compile(r"/(\d{19})/"),  # 19位数字ID
+    re.compile(r"/(\d{18})/"),  # 18位数字ID
+    re.compile(r"item_ids=(\d+)"),
+    re.compile(r"/note/(\d+)"),
+]
+
+
+def is_short_link(link: str) -> bool:
+    return SHORT_LINK_HOST in (link or "")
+
+
+def extract_aweme_id(url: str) -> Optional[str]:
+    """从抖音视频链接中提取作品ID，提取不到返回 None。"""
+    for pattern in _VIDEO_ID_PATTERNS:
+        match = pattern.search(url or "")
+        if match:
+            return match.group(1)
+    return None
+
+
+def share_base_url() -> str:
+    """分享页地址前缀，如 https://www.iesdouyin.com"""
+    return str(CONFIG.get("DOUYIN_SHARE_BASE", DEFAULT_SHARE_BASE) or DEFAULT_SHARE_BASE).rstrip("/")
+
+
+def canonical_share_url(aweme_id: str, link: str = "") -> str:
+    """作品ID对应的分享页地址，与短链展开后的落地页一致；图文笔记使用 note 路径"""
+    kind = "note" if "/note/" in (link or "") else "video"
+    return f"{share_base_url()}/share/{kind}/{aweme_id}/"
+
+
+class LinkNormalizer:
+    """
+    将订单链接解析为 (页面地址, 作品ID)：
+    - 完整链接（/video/<id>、modal_id= 等）直接本地提取
+    - 短链先查磁盘缓存
+    - 以上都不行才返回 None，交给抓取阶段走网络展开
+    统计本地解析与需要网络的数量。
+    """
+
+    def __init__(self):
+        self.offline = 0
+        self.cached = 0
+        self.network = 0
+
+    def resolve(self, link: str) -> Tuple[str, Optional[str]]:
+        link = (link or "").strip()
+        if not link:
+            self.network += 1
+            return link, None
+        if is_short_link(link):
+            entry = short_url_cache.get(link)
+            if entry and entry.get("aweme_id"):
+                self.cached += 1
+                return entry["url"], entry["aweme_id"]
+            self.network += 1
+            return link, None
+        aweme_id = extract_aweme_id(link)
+        if aweme_id:
+            self.offline += 1
+            return canonical_share_url(aweme_id, link), aweme_id
+        self.network += 1
+        return link, None
+
+    def resolve_orders(self, orders: List[Dict[str, Any]]) -> None:
+        """为每个订单写入 aweme_id（无法本地解析时为 None）"""
+        for o in orders:
+            _, o["aweme_id"] = self.resolve(o.get("link") or "")
+        logging.info(f"链接本地解析：共 {len(orders)} 条，{self.report()}")
+
+    def report(self) -> str:
+        return f"免网络 {self.offline + self.cached} 条（直接提取 {self.offline}，短链缓存 {self.cached}），需网络展开 {self.network} 条"
@@ -0,0 +1,249 @@
+# 抖音作品页解析（纯函数，不做任何网络 I/O）
+import re
+import json
+import datetime
+import logging
+from urllib.parse import unquote
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from models.douyin import DouyinVideoInfo
+
+_ROUTER_DATA_MARK = "window._ROUTER_DATA"
+_JSON_DECODER = json.JSONDecoder()
+# loaderData 中作品页的路由键：视频与图文笔记
+_PAGE_KEYS = ("video_(id)/page", "note_(id)/page")
+
+# 页面兜底字段的正则，仅在 _ROUTER_DATA 无法提供对应字段时使用
+_DESC_ATTR_RE = re.compile(r'data-desc="([^"]+)"')
+_DESC_META_RE = re.compile(r'description[^>]*content="([^"]+)"')
+_AUTHOR_ATTR_RE = re.compile(r'data-author="([^"]+)"')
+_AUTHOR_JSON_RE = re.compile(r'"nickname":"([^"]+)"')
+_STAT_RES = {
+    "digg_count": re.compile(r'"digg_count":\s*(\d+)'),
+    "comment_count": re.compile(r'"comment_count":\s*(\d+)'),
+    "share_count": re.compile(r'"share_count":\s*(\d+)'),
+    "play_count": re.compile(r'"play_count":\s*(\d+)'),
+    "collect_count": re.compile(r'"collect_count":\s*(\d+)'),
+    "forward_count": re.compile(r'"forward_count":\s*(\d+)'),
+}
+_STAT_FIELDS = {
+    "digg_count": "likeCount",
+    "comment_count": "commentCount",
+    "share_count": "shareCount",
+    "play_count": "playCount",
+    "collect_count": "collectCount",
+    "forward_count": "forwardCount",
+}
+_PLAY_ADDR_RES = (
+    re.compile(r'"video":\{"play_addr":\{[^}]+"url_list":\["([^"]+)"'),
+    re.compile(r'"play_addr":\{"url_list":\["([^"]+)"'),
+)
+_VIDEO_ID_PARAM_RE = re.compile(r"video_id=([^&]+)")
+_COVER_RE = re.compile(r'"cover":\{"url_list":\["([^"]+)"')
+_MUSIC_TITLE_RE = re.compile(r'"music":\{"title":"([^"]+)"')
+_MUSIC_AUTHOR_RE = re.compile(r'"music":\{"author":"([^"]+)"')
+_MUSIC_URL_RE = re.compile(r'"music":\{"play_url":\{"url_list":\["([^"]+)"')
+_HASHTAG_RE = re.compile(r'"hashtag_name":"([^"]+)"')
+
+
+class PageDoc:
+    """一次解析得到的页面上下文：原始 HTML 与 _ROUTER_DATA 中的作品节点"""
+
+    __slots__ = ("html", "router_data", "item", "video", "music", "author")
+
+    def __init__(self, html: str):
+        self.html = html
+        self.router_data = load_router_data(html)
+        self.item = _router_item(self.router_data)
+        self.video = _sub_dict(self.item, "video")
+        self.music = _sub_dict(self.item, "music")
+        self.author = _sub_dict(self.item, "author")
+
+
+def build_play_url(video_id: str) -> str:
+    return f"https://aweme.snssdk.com/aweme/v1/play/?video_id={video_id}&ratio=720p&line=0"
+
+
+def load_router_data(html: str) -> Optional[dict]:
+    """定位 window._ROUTER_DATA 并只解析一次 JSON，失败返回 None"""
+    pos = html.find(_ROUTER_DATA_MARK)
+    if pos < 0:
+        return None
+    start = html.find("{", pos + len(_ROUTER_DATA_MARK))
+    if start < 0:
+        return None
+    try:
+        data, _ = _JSON_DECODER.raw_decode(html, start)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _router_item(router_data: Optional[dict]) -> dict:
+    """从 loaderData -> video_(id)/page | note_(id)/page -> videoInfoRes -> item_list 取第一个作品"""
+    if not router_data:
+        return {}
+    loader = router_data.get("loaderData")
+    if not isinstance(loader, dict):
+        return {}
+    for key in _PAGE_KEYS:
+        page = loader.get(key)
+        if not isinstance(page, dict):
+            continue
+        info = page.get("videoInfoRes")
+        if not isinstance(info, dict):
+            continue
+        item_list = info.get("item_list")
+        if isinstance(item_list, list) and item_list and isinstance(item_list[0], dict):
+            return item_list[0]
+    return {}
+
+
+def _sub_dict(obj: dict, key: str) -> dict:
+    value = obj.get(key)
+    return value if isinstance(value, dict) else {}
+
+
+def _first_url(obj: Any) -> Optional[str]:
+    """取 {"url_list": [...]} 中的第一个地址"""
+    if isinstance(obj, dict):
+        url_list = obj.get("url_list")
+        if isinstance(url_list, list) and url_list:
+            return url_list[0] or None
+    return None
+
+
+def _search(pattern: re.Pattern, html: str) -> Optional[str]:
+    m = pattern.search(html)
+    return m.group(1) if m else None
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+# ---------------- 字段提取器：每个返回结果字段的字典 ----------------
+
+
+def extract_stats(doc: PageDoc) -> Dict[str, Any]:
+    stats = doc.item.get("statistics")
+    if isinstance(stats, dict):
+        fields = {name: _to_int(stats.get(key)) for key, name in _STAT_FIELDS.items()}
+        fields["source"] = "router_data"
+        return fields
+    # 备用：从HTML中直接匹配
+    if _STAT_RES["digg_count"].search(doc.html):
+        fields = {name: _to_int(_search(_STAT_RES[key], doc.html)) for key, name in _STAT_FIELDS.items()}
+        fields["source"] = "regex"
+        return fields
+    return {"source": "none"}
+
+
+def extract_video(doc: PageDoc) -> Dict[str, Any]:
+    play_addr = doc.video.get("play_addr")
+    video_id = play_addr.get("uri") if isinstance(play_addr, dict) else None
+    if video_id:
+        return {"videoId": video_id, "videoUrl": build_play_url(video_id)}
+    # 备用：从HTML拼接/提取
+    original_url = None
+    for pattern in _PLAY_ADDR_RES:
+        original_url = _search(pattern, doc.html)
+        if original_url:
+            break
+    if not original_url:
+        return {}
+    original_url = unquote(original_url.replace(r"\u002F", "/"))
+    video_id = _search(_VIDEO_ID_PARAM_RE, original_url)
+    if video_id:
+        return {"videoId": video_id, "videoUrl": build_play_url(video_id)}
+    return {"videoUrl": original_url}
+
+
+def extract_author(doc: PageDoc) -> Dict[str, Any]:
+    name = doc.author.get("nickname") or _search(_AUTHOR_ATTR_RE, doc.html) or _search(_AUTHOR_JSON_RE, doc.html)
+    fields: Dict[str, Any] = {"authorId": str(doc.author.get("uid") or "")}
+    if name:
+        fields["author"] = name
+    return fields
+
+
+def extract_description(doc: PageDoc) -> Dict[str, Any]:
+    desc = doc.item.get("desc") or _search(_DESC_ATTR_RE, doc.html) or _search(_DESC_META_RE, doc.html)
+    return {"description": desc} if desc else {}
+
+
+def extract_media(doc: PageDoc) -> Dict[str, Any]:
+    cover_url = _first_url(doc.video.get("cover")) or _search(_COVER_RE, doc.html)
+    return {
+        "coverUrl": cover_url,
+        "duration": _to_int(doc.video.get("duration")),
+        "width": _to_int(doc.video.get("width")),
+        "height": _to_int(doc.video.get("height")),
+    }
+
+
+def extract_music(doc: PageDoc) -> Dict[str, Any]:
+    if doc.music:
+        return {
+            "musicTitle": doc.music.get("title") or "",
+            "musicAuthor": doc.music.get("author") or "",
+            "musicUrl": _first_url(doc.music.get("play_url")) or "",
+        }
+    return {
+        "musicTitle": _search(_MUSIC_TITLE_RE, doc.html) or "",
+        "musicAuthor": _search(_MUSIC_AUTHOR_RE, doc.html) or "",
+        "musicUrl": _search(_MUSIC_URL_RE, doc.html) or "",
+    }
+
+
+def extract_hashtags(doc: PageDoc) -> Dict[str, Any]:
+    text_extra = doc.item.get("text_extra")
+    if isinstance(text_extra, list):
+        return {"hashtags": [t["hashtag_name"] for t in text_extra if isinstance(t, dict) and t.get("hashtag_name")]}
+    return {"hashtags": _HASHTAG_RE.findall(doc.html)}
+
+
+def extract_publish_time(doc: PageDoc) -> Dict[str, Any]:
+    create_time = doc.item.get("create_time")
+    if isinstance(create_time, int) and create_time > 0:
+        return {"publishTime": datetime.datetime.fromtimestamp(create_time).strftime("%Y-%m-%d")}
+    return {"publishTime": datetime.datetime.now().strftime("%Y-%m-%d")}
+
+
+# 字段名 -> 提取器，顺序即结果填充顺序；基准测试按此表统计单字段耗时
+FIELD_EXTRACTORS: List[Tuple[str, Callable[[PageDoc], Dict[str, Any]]]] = [
+    ("stats", extract_stats),
+    ("video", extract_video),
+    ("author", extract_author),
+    ("description", extract_description),
+    ("media", extract_media),
+    ("music", extract_music),
+    ("hashtags", extract_hashtags),
+    ("publish_time", extract_publish_time),
+]
+
+
+def decode_html(html: bytes | str) -> str:
+    if isinstance(html, (bytes, bytearray)):
+        return bytes(html).decode("utf-8", errors="ignore")
+    return html
+
+
+def parse_video_html(html: bytes | str, video_id: str = "") -> DouyinVideoInfo:
+    """
+    解析作品页 HTML（不做网络 I/O）：
+    只定位并解析一次 _ROUTER_DATA，由同一棵树填充全部字段；
+    树中缺失的字段才回退到对整页 HTML 的正则匹配。
+    """
+    try:
+        doc = PageDoc(decode_html(html))
+        if doc.router_data is not None:
+            logging.debug("成功解析 window._ROUTER_DATA")
+        fields: Dict[str, Any] = {"videoId": video_id}
+        for _, extractor in FIELD_EXTRACTORS:
+            fields.update(extractor(doc))
+        return DouyinVideoInfo(success=True, **fields)
+    except Exception as e:
+        return DouyinVideoInfo(success=False, error=str(e))
@@ -0,0 +1,121 @@
+# 增量导出的水位线与断点：记录已导出到的 (tb_time, 订单ID)，以及本轮已处理完的订单
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+from config import EXPORT_CHECKPOINT_PATH
+
+# 水位线：(tb_time, 订单ID)，按此顺序比较
+Watermark = Tuple[int, int]
+
+
+class ExportCheckpoint:
+    """
+    - watermark：上一轮完整导出的最大 (tb_time, 订单ID)，存于 path（整体替换写入）
+    - done_ids：已处理完但还在水位线之后的订单ID，每处理完一个追加一行到 path.done，
+      中途崩溃或中断后重跑时跳过这些订单；commit() 推进水位线后只保留仍在水位线之后的部分
+    - failures：未处理完的订单已连续抓取失败的导出次数，存于 path.failed，调用方据此放弃一直失败的订单
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done_path = f"{path}.done"
+        self._lock = threading.RLock()
+        self.watermark: Optional[Watermark] = None
+        self.done_ids: Set[int] = set()
+        self.failed_path = f"{path}.failed"
+        self.failures: Dict[int, int] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                self.watermark = (int(raw["tb_time"]), int(raw["id"]))
+        except Exception as e:  # noqa: BLE001
+            logging.warning(f"读取导出水位线失败，将按时间窗口重新开始: {e}")
+        try:
+            if os.path.exists(self.done_path):
+                with open(self.done_path, "r", encoding="utf-8") as f:
+                    self.done_ids = {int(line) for line in f if line.strip().isdigit()}
+        except Exception as e:  # noqa: BLE001
+            logging.warning(f"读取导出断点失败: {e}")
+        try:
+            if os.path.exists(self.failed_path):
+                with open(self.failed_path, "r", encoding="utf-8") as f:
+                    self.failures = {int(k): int(v) for k, v in json.load(f).items()}
+        except Exception as e:  # noqa: BLE001
+            logging.warning(f"读取导出失败次数失败: {e}")
+
+    def mark_done(self, order_id: int) -> None:
+        """记录一个已处理完（已写出、无缺失或已放弃）的订单"""
+        with self._lock:
+            if order_id in self.done_ids:
+                return
+            self.done_ids.add(order_id)
+            try:
+                os.makedirs(os.path.dirname(self.done_path), exist_ok=True)
+                with open(self.done_path, "a", encoding="utf-8") as f:
+                    f.write(f"{order_id}\n")
+            except Exception as e:  # noqa: BLE001
+                logging.error(f"写入导出断点失败: {e}")
+
+    def mark_failed(self, order_id: int) -> int:
+        """记录订单本次导出抓取失败，返回它累计失败的导出次数"""
+        with self._lock:
+            self.failures[order_id] = self.failures.get(order_id, 0) + 1
+            self._write_failures()
+            return self.failures[order_id]
+
+    def _write_failures(self) -> None:
+        try:
+            if self.failures:
+                os.makedirs(os.path.dirname(self.failed_path), exist_ok=True)
+                tmp_path = f"{self.failed_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({str(k): v for k, v in sorted(self.failures.items())}, f)
+                os.replace(tmp_path, self.failed_path)
+            elif os.path.exists(self.failed_path):
+                os.remove(self.failed_path)
+        except Exception as e:  # noqa: BLE001
+            logging.error(f"写入导出失败次数失败: {e}")
+
+    def commit(self, watermark: Optional[Watermark], remaining: Iterable[int] = ()) -> None:
+        """
+        推进水位线（先写临时文件再替换）；remaining 为仍在新水位线之后的订单ID，
+        断点和失败次数只保留其中的订单（失败次数只保留仍未处理完的）
+        """
+        with self._lock:
+            if watermark is not None and (self.watermark is None or watermark > self.watermark):
+                tmp_path = f"{self.path}.tmp"
+                try:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump({"tb_time": watermark[0], "id": watermark[1]}, f)
+                    os.replace(tmp_path, self.path)
+                except Exception as e:  # noqa: BLE001
+                    # 水位线没写成功时保留断点，下次重跑仍会跳过已处理的订单
+                    logging.error(f"写入导出水位线失败: {e}")
+                    return
+                self.watermark = watermark
+            remaining = set(remaining)
+            self.done_ids = remaining & self.done_ids
+            failures = {k: v for k, v in self.failures.items() if k in remaining and k not in self.done_ids}
+            if failures != self.failures:
+                self.failures = failures
+                self._write_failures()
+            try:
+                if self.done_ids:
+                    tmp_path = f"{self.done_path}.tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.writelines(f"{order_id}\n" for order_id in sorted(self.done_ids))
+                    os.replace(tmp_path, self.done_path)
+                elif os.path.exists(self.done_path):
+                    os.remove(self.done_path)
+            except Exception as e:  # noqa: BLE001
+                logging.error(f"清理导出断点失败: {e}")
+
+
+export_checkpoint = ExportCheckpoint(EXPORT_CHECKPOINT_PATH)
@@ -0,0 +1,67 @@
+# 对冲请求：单次抓取明显慢于常态时，换一个代理再发一份，先成功的生效
+import threading
+from collections import deque
+from typing import Optional
+from config import CONFIG
+
+
+class LatencyTracker:
+    """最近若干次成功抓取的耗时（线程安全），用于估计 p90 等分位数"""
+
+    def __init__(self, window: int = 500, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=window)
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """样本不足 min_samples 时返回 None"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+# 进程内共享：自动导出与界面导出的成功耗时都计入
+attempt_latency = LatencyTracker()
+
+
+class HedgeBudget:
+    """
+    一次批量抓取的对冲额度：
+    - 尝试耗时超过最近成功耗时的 p90（不低于 min_delay 秒）才发对冲请求，样本不足时不对冲
+    - 对冲请求数不超过已发出尝试数的 max_ratio，控制代理用量
+    """
+
+    def __init__(self, max_ratio: float, min_delay: float = 1.0, quantile: float = 0.9):
+        self.max_ratio = max_ratio
+        self.min_delay = min_delay
+        self.quantile = quantile
+        self.attempts = 0
+        self.hedges = 0
+
+    @classmethod
+    def from_config(cls) -> Optional["HedgeBudget"]:
+        """未开启 HEDGE_ENABLED 时返回 None"""
+        if str(CONFIG.get("HEDGE_ENABLED", "0")) != "1":
+            return None
+        return cls(
+            max_ratio=float(CONFIG.get("HEDGE_MAX_RATIO", 0.1)),
+            min_delay=float(CONFIG.get("HEDGE_MIN_DELAY", 1.0)),
+        )
+
+    def delay(self) -> Optional[float]:
+        """本次尝试多久没完成就对冲，None 表示不对冲"""
+        self.attempts += 1
+        p = attempt_latency.percentile(self.quantile)
+        return None if p is None else max(self.min_delay, p)
+
+    def try_acquire(self) -> bool:
+        if self.hedges >= self.attempts * self.max_ratio:
+            return False
+        self.hedges += 1
+        return True
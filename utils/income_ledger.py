@@ -0,0 +1,103 @@
+# 导出文件收入台账：记录每个导出 CSV 已计算出的收入，避免每次查询都重新解析全部文件
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, Tuple
+from config import INCOME_LEDGER_PATH
+
+# 文件指纹：(大小, 修改时间 ns)
+Fingerprint = Tuple[int, int]
+
+
+class IncomeLedger:
+    """
+    导出文件路径 -> {size, mtime_ns, income} 的磁盘台账：
+    - sync() 传入当前目录下的文件指纹，删除已不存在的条目，返回新增或内容有变化的文件
+    - record() 记录某个文件按指纹计算出的收入；forget() 在删除文件后移除条目
+    - total() 直接返回缓存的合计值，与保留的历史文件数量无关
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict] = {}
+        self._total = 0.0
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            for path, entry in raw.items():
+                if isinstance(entry, dict) and {"size", "mtime_ns", "income"} <= entry.keys():
+                    self._entries[path] = entry
+            self._recount()
+        except Exception as e:  # noqa: BLE001
+            # 台账格式不对（如不是对象、收入不是数字）时整体丢弃，所有文件重新计算
+            logging.warning(f"读取收入台账失败，将重新计算: {e}")
+            self._entries.clear()
+            self._total = 0.0
+
+    def _recount(self) -> None:
+        self._total = math.fsum(float(e["income"]) for e in self._entries.values())
+
+    def sync(self, files: Dict[str, Fingerprint]) -> List[str]:
+        """files 为 {路径: (大小, 修改时间 ns)}；返回需要重新计算收入的文件路径"""
+        with self._lock:
+            removed = [p for p in self._entries if p not in files]
+            for path in removed:
+                del self._entries[path]
+            if removed:
+                self._recount()
+                self._dirty = True
+            stale = []
+            for path, (size, mtime_ns) in files.items():
+                entry = self._entries.get(path)
+                if entry is None or entry["size"] != size or entry["mtime_ns"] != mtime_ns:
+                    stale.append(path)
+            return stale
+
+    def record(self, path: str, fingerprint: Fingerprint, income: float) -> None:
+        size, mtime_ns = fingerprint
+        with self._lock:
+            self._entries[path] = {"size": size, "mtime_ns": mtime_ns, "income": income}
+            self._recount()
+            self._dirty = True
+
+    def forget(self, paths: Iterable[str]) -> None:
+        with self._lock:
+            changed = False
+            for path in paths:
+                if self._entries.pop(os.path.abspath(path), None) is not None:
+                    changed = True
+            if changed:
+                self._recount()
+                self._dirty = True
+                self.flush()
+
+    def total(self) -> float:
+        with self._lock:
+            return self._total
+
+    def flush(self) -> None:
+        """写回磁盘（先写临时文件再替换）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:  # noqa: BLE001
+                logging.error(f"写入收入台账失败: {e}")
+
+
+income_ledger = IncomeLedger(INCOME_LEDGER_PATH)
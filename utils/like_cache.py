@@ -0,0 +1,65 @@
+# 作品点赞数的进程内缓存，自动导出与界面手动导出共用
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from config import CONFIG
+
+
+class LikeCountCache:
+    """
+    aweme_id -> 点赞数 的 TTL + LRU 缓存（线程安全）：
+    - 写入超过 ttl 秒的条目视为过期，需要重新抓取
+    - 超过 max_size 条时淘汰最久未使用的条目
+    - 记录命中/未命中次数
+    """
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    def get(self, aweme_id: Optional[str]) -> Optional[int]:
+        """返回未过期的点赞数，没有作品ID、未命中或已过期返回 None"""
+        with self._lock:
+            entry = self._data.get(aweme_id) if aweme_id else None
+            if entry is None or time.time() - entry[1] >= self.ttl:
+                if entry is not None:
+                    del self._data[aweme_id]
+                self.misses += 1
+                return None
+            self._data.move_to_end(aweme_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, aweme_id: Optional[str], like_count: int) -> None:
+        if not aweme_id:
+            return
+        with self._lock:
+            self._data[aweme_id] = (like_count, time.time())
+            self._data.move_to_end(aweme_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def configure(self, ttl: Optional[int] = None, max_size: Optional[int] = None) -> None:
+        """配置修改后调用，调整有效期与容量"""
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if max_size is not None:
+                self.max_size = max_size
+                while len(self._data) > self.max_size:
+                    self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+like_count_cache = LikeCountCache(
+    ttl=int(CONFIG.get("LIKE_CACHE_TTL", 600)),
+    max_size=int(CONFIG.get("LIKE_CACHE_MAX_SIZE", 50000)),
+)
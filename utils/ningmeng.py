@@ -9,8 +9,13 @@ from config import CONFIG
 from utils.crypt import encrypt
 from utils.yunma import verify_base64
 
+DEFAULT_BASE_URL = "https://www.ningmeng88.com"
+
+
 class NingMengAPI:
     def __init__(self, username: str, encrypted_password: str, iv: str) -> None:
+        # 可通过 CONFIG['NINGMENG_BASE_URL'] 指向其他地址（如本地模拟服务）
+        self.base_url = str(CONFIG.get("NINGMENG_BASE_URL", DEFAULT_BASE_URL) or DEFAULT_BASE_URL).rstrip("/")
         self.headers = {
             "accept": "application/json, text/plain, */*",
             "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
@@ -45,7 +50,7 @@ class NingMengAPI:
                     raise e  # 达到最大重试次数，抛出异常
         
     def captcha(self):
-        url = "https://www.ningmeng88.com/web/captcha/info"
+        url = f"{self.base_url}/web/captcha/info"
         response = self.retry_post(url, {})
         ret_json = response.json()
         return {
@@ -54,7 +59,7 @@ class NingMengAPI:
         }
         
     def login(self):
-        url = "https://www.ningmeng88.com/web/user/login"
+        url = f"{self.base_url}/web/user/login"
         # pwd_enc = encrypt(CONFIG["NINGMENG_PASSWORD"])
         for _ in range(10): 
             captcha_info = self.captcha()
@@ -77,7 +82,7 @@ class NingMengAPI:
 
     def query_order(self, receive_order: str = "", order_link: str = "", page: int = 1, page_size: int = 10):
         self.login()
-        url = "https://www.ningmeng88.com/web/refund/list/partner"
+        url = f"{self.base_url}/web/refund/list/partner"
         data = {
             "page": page,
             "page_size": page_size,
@@ -92,7 +97,7 @@ class NingMengAPI:
 
     def refund_orders(self, order_links: list):
         self.login()
-        url = "https://www.ningmeng88.com/web/refund/save/partner"
+        url = f"{self.base_url}/web/refund/save/partner"
         data = {
             "order_link": order_links
         }
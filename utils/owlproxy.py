@@ -1,22 +1,29 @@
+import asyncio
 import datetime
 import hashlib
 import hmac
 import json
 import logging
+import threading
 import time
-from typing import Any, Dict, Optional, List, Tuple
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, List, Tuple
 import binascii
-from urllib.parse import urlencode
+import aiohttp
+from urllib.parse import urlencode, urlsplit
 from config import CONFIG
 import requests
 import os
 from models.owlproxy import OwlProxyDynamicProxyResult, OwlProxyResult, OwlProxyModel
+from utils.metrics import STAGE_SECONDS, PROXIES_CREATED, PROXY_REQUESTS
 
 # VMOS API配置
 SERVICE = "armcloud-paas"
 CONTENT_TYPE = "application/json;charset=UTF-8"
 SIGNED_HEADERS = "content-type;host;x-content-sha256;x-date"
 
+# 默认 API 地址，可通过 CONFIG['OWLPROXY_API_BASE'] 指向其他地址（如本地模拟服务）
+DEFAULT_API_BASE = "https://api.owlproxy.com"
+
 # API密钥配置
 ACCESS_KEY_ID = CONFIG["OWLPROXY_KEY_ID"]
 SECRET_ACCESS_KEY = CONFIG["OWLPROXY_KEY_SECRET"]
@@ -135,10 +142,10 @@ class OWLService:
 
         return signature_body_string, request_data, request_params
 
-    def owl_request(
-        self, url: str, data: Dict[str, Any], method: str = "POST", timeout: int = 30
-    ) -> OwlProxyResult:
-        """通用VMOS请求方法"""
+    def _build_request(
+        self, url: str, data: Dict[str, Any], method: str
+    ) -> Tuple[str, Dict[str, str], Optional[bytes], Optional[Dict[str, Any]]]:
+        """签名并返回 (完整URL, 请求头, 请求 body, 查询参数)，同步与异步请求共用"""
 
         x_date = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
 
@@ -147,7 +154,8 @@ class OWLService:
             self._prepare_request_data(method, data)
         )
 
-        host = "api.owlproxy.com"
+        base = str(CONFIG.get("OWLPROXY_API_BASE", DEFAULT_API_BASE) or DEFAULT_API_BASE).rstrip("/")
+        host = urlsplit(base).netloc
 
         # 2. 计算签名和 x-content-sha256
         signature, x_content_sha256 = PaasSigner.calculate_signature(
@@ -161,7 +169,7 @@ class OWLService:
 
         # 3. 构建 Header 和 URL
         short_date = x_date[:8]
-        full_url = f"https://{host}{url}"
+        full_url = f"{base}{url}"
 
         headers = {
             "content-type": CONTENT_TYPE,
@@ -175,7 +183,13 @@ class OWLService:
             ),
         }
 
-        # 4. 发送请求
+        return full_url, headers, request_data, request_params
+
+    def owl_request(
+        self, url: str, data: Dict[str, Any], method: str = "POST", timeout: int = 30
+    ) -> OwlProxyResult:
+        """通用VMOS请求方法"""
+        full_url, headers, request_data, request_params = self._build_request(url, data, method)
         response = requests.request(
             method,
             full_url,
@@ -187,6 +201,22 @@ class OWLService:
         response.raise_for_status()
         return OwlProxyResult(**response.json())
 
+    async def owl_request_async(
+        self, session: aiohttp.ClientSession, url: str, data: Dict[str, Any], method: str = "POST", timeout: int = 30
+    ) -> OwlProxyResult:
+        """owl_request 的异步版本，由调用方提供复用连接的 session"""
+        full_url, headers, request_data, request_params = self._build_request(url, data, method)
+        async with session.request(
+            method,
+            full_url,
+            headers=headers,
+            data=request_data,
+            params=request_params,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as resp:
+            resp.raise_for_status()
+            return OwlProxyResult(**(await resp.json(content_type=None)))
+
     def create_dynamic_proxies(
         self,
         good_num: int = 100,
@@ -226,21 +256,246 @@ class OWLService:
                     "time": time_minutes,
                     "goodNum": num,
                 }
-                ret = self.owl_request(
-                    "/owlproxy/api/openApi/vcDynamicGood/createProxy", body, "POST"
-                )
+                with STAGE_SECONDS.time(stage="proxy_create"):
+                    ret = self.owl_request(
+                        "/owlproxy/api/openApi/vcDynamicGood/createProxy", body, "POST"
+                    )
                 result = OwlProxyDynamicProxyResult(**ret.model_dump())
+                PROXIES_CREATED.inc(len(result.data or []))
                 good_num -= 50
                 real_ret.data.extend(result.data)
                 time.sleep(1)  # 避免请求过快
             return real_ret
 
         else:
-            ret = self.owl_request(
-                "/owlproxy/api/openApi/vcDynamicGood/createProxy", body, "POST"
-            )
+            with STAGE_SECONDS.time(stage="proxy_create"):
+                ret = self.owl_request(
+                    "/owlproxy/api/openApi/vcDynamicGood/createProxy", body, "POST"
+                )
             result = OwlProxyDynamicProxyResult(**ret.model_dump())
+            PROXIES_CREATED.inc(len(result.data or []))
             return result
 
+    async def create_dynamic_proxies_async(
+        self,
+        good_num: int = 100,
+        country_code: str = CONFIG["OWLPROXY_COUNTRY"],
+        state: str = "",
+        city: str = "",
+        proxy_host: str = "change5.owlproxy.com:7778",
+        proxy_type: str = "http",
+        time_minutes: int = int(CONFIG["OWLPROXY_LIFETIME"]) // 60,
+    ) -> AsyncIterator[List[OwlProxyModel]]:
+        """
+        异步批量创建动态代理：每批最多 50 个，最多 OWLPROXY_CREATE_CONCURRENCY 批同时请求，
+        共用一个连接池。每批创建完成就产出该批代理（按完成顺序），失败的批次记录日志后跳过。
+        """
+        batches = [min(50, good_num - start) for start in range(0, max(good_num, 0), 50)]
+        if not batches:
+            return
+        concurrency = max(1, int(CONFIG.get("OWLPROXY_CREATE_CONCURRENCY", 4)))
+        sem = asyncio.Semaphore(concurrency)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+
+            async def create_batch(num: int) -> List[OwlProxyModel]:
+                body = {
+                    "countryCode": country_code,
+                    "state": state,
+                    "city": city,
+                    "proxyHost": proxy_host,
+                    "proxyType": proxy_type,
+                    "time": time_minutes,
+                    "goodNum": num,
+                }
+                async with sem:
+                    try:
+                        with STAGE_SECONDS.time(stage="proxy_create"):
+                            ret = await self.owl_request_async(
+                                session, "/owlproxy/api/openApi/vcDynamicGood/createProxy", body, "POST"
+                            )
+                    except Exception as e:  # noqa: BLE001
+                        logging.error(f"创建 {num} 个动态代理失败: {e}")
+                        return []
+                result = OwlProxyDynamicProxyResult(**ret.model_dump())
+                PROXIES_CREATED.inc(len(result.data or []))
+                return list(result.data or [])
+
+            tasks = [asyncio.ensure_future(create_batch(num)) for num in batches]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    created = await next_done
+                    if created:
+                        yield created
+            finally:
+                for t in tasks:
+                    t.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def proxy_key(model: OwlProxyModel) -> str:
+    """代理唯一标识（动态代理通常共享 host:port，以用户名区分）"""
+    return f"{model.userName}@{model.proxyHost}:{model.proxyPort}"
+
+
+def proxy_id(model: OwlProxyModel) -> str:
+    """代理的短标识：proxy_key 的哈希前缀，不含账号，用于日志与指标标签"""
+    return hashlib.sha1(proxy_key(model).encode("utf-8")).hexdigest()[:10]
+
+
+class _PooledProxy:
+    __slots__ = ("model", "expires_at", "leased")
+
+    def __init__(self, model: OwlProxyModel, expires_at: float):
+        self.model = model
+        self.expires_at = expires_at
+        self.leased = False
+
+
+class ProxyLease:
+    """
+    ProxyPool.lease_async() 的结果：proxies 先包含复用的空闲代理，
+    新建的代理每到一批就追加进来，抓取可以边补建边开始
+    """
+
+    def __init__(self, proxies: List[OwlProxyModel]):
+        self.proxies = proxies
+        self._changed = asyncio.Event()
+        self._fill_task: Optional[asyncio.Task] = None
+
+    def _append(self, models: List[OwlProxyModel]) -> None:
+        self.proxies.extend(models)
+        self._changed.set()
+
+    @property
+    def filling(self) -> bool:
+        return self._fill_task is not None and not self._fill_task.done()
+
+    async def wait_ready(self) -> None:
+        """等到至少有一个代理，或补建结束（可能一个也没有）"""
+        while not self.proxies and self.filling:
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def wait_complete(self) -> None:
+        """等待所有批次补建完成"""
+        if self._fill_task is not None:
+            await asyncio.gather(self._fill_task, return_exceptions=True)
+
+    async def close(self) -> None:
+        """停止仍在进行的补建（调用方随后 release(proxies)）"""
+        if self.filling:
+            self._fill_task.cancel()
+        await self.wait_complete()
+
+
+class ProxyPool:
+    """
+    长期存在的动态代理池：
+    - 记录每个代理的过期时间（创建时间 + OWLPROXY_LIFETIME 分钟），过期自动丢弃
+    - lease_async(n) 优先复用仍然有效的空闲代理，不足部分才在后台调用 createProxy 补齐
+    - 任务结束后 release() 归还，供下一次导出复用
+    """
+
+    def __init__(self, service: OWLService, min_remaining: int = 60):
+        self.service = service
+        # 剩余有效期不足 min_remaining 秒的代理不再出租
+        self.min_remaining = min_remaining
+        self._lock = threading.Lock()
+        self._proxies: Dict[str, _PooledProxy] = {}
+
+    @staticmethod
+    def _lifetime_seconds() -> int:
+        return int(CONFIG.get("OWLPROXY_LIFETIME", 5)) * 60
+
+    def _evict_expired(self, now: float) -> None:
+        for key in [k for k, p in self._proxies.items() if p.expires_at - now < self.min_remaining and not p.leased]:
+            # 过期的代理不会再被使用，同时删除它的按代理指标序列
+            PROXY_REQUESTS.remove(proxy=proxy_id(self._proxies.pop(key).model))
+
+    def _free(self, now: float) -> List[_PooledProxy]:
+        return [p for p in self._proxies.values() if not p.leased and p.expires_at - now >= self.min_remaining]
+
+    def add(self, models: Iterable[OwlProxyModel], created_at: Optional[float] = None) -> None:
+        """加入新创建的代理（空闲状态）"""
+        expires_at = (created_at or time.time()) + self._lifetime_seconds()
+        with self._lock:
+            for m in models:
+                self._proxies[proxy_key(m)] = _PooledProxy(m, expires_at)
+
+    async def lease_async(self, count: int) -> ProxyLease:
+        """
+        异步租用：立即返回复用的空闲代理，缺口部分在后台分批并发创建，
+        每批到达后加入代理池（已租用状态）并追加到 ProxyLease.proxies
+        """
+        with self._lock:
+            now = time.time()
+            self._evict_expired(now)
+            leased = self._free(now)[: max(count, 0)]
+            for p in leased:
+                p.leased = True
+        lease = ProxyLease([p.model for p in leased])
+        shortage = count - len(leased)
+        if shortage > 0:
+            logging.info(f"代理池复用 {len(leased)} 个，后台新建 {shortage} 个")
+            lease._fill_task = asyncio.create_task(self._top_up(lease, shortage))
+        else:
+            logging.info(f"代理池复用 {len(leased)} 个，无需新建")
+        return lease
+
+    async def _top_up(self, lease: ProxyLease, shortage: int) -> None:
+        created = 0
+        try:
+            async for models in self.service.create_dynamic_proxies_async(good_num=shortage):
+                expires_at = time.time() + self._lifetime_seconds()
+                with self._lock:
+                    for m in models:
+                        pooled = _PooledProxy(m, expires_at)
+                        pooled.leased = True
+                        self._proxies[proxy_key(m)] = pooled
+                lease._append(models)
+                created += len(models)
+            logging.info(f"代理池补建完成：新建 {created} 个（缺口 {shortage}）")
+        finally:
+            # 唤醒仍在 wait_ready 的调用方（补建结束或被取消）
+            lease._changed.set()
+
+    async def prewarm(self, count: int, lead: float = 0) -> int:
+        """
+        提前补建代理，使 lead 秒后仍有至少 count 个可租用的空闲代理；
+        新建的代理以空闲状态加入代理池，返回新建数量
+        """
+        with self._lock:
+            at = time.time() + lead
+            self._evict_expired(time.time())
+            shortage = count - len(self._free(at))
+        if shortage <= 0:
+            return 0
+        created = 0
+        async for models in self.service.create_dynamic_proxies_async(good_num=shortage):
+            self.add(models)
+            created += len(models)
+        logging.info(f"代理池预热：需要 {count} 个，新建 {created} 个，代理池状态 {self.stats()}")
+        return created
+
+    def release(self, models: Iterable[OwlProxyModel]) -> None:
+        """归还代理，过期的直接移出代理池"""
+        with self._lock:
+            now = time.time()
+            for m in models:
+                pooled = self._proxies.get(proxy_key(m))
+                if pooled is None:
+                    continue
+                pooled.leased = False
+            self._evict_expired(now)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            now = time.time()
+            leased = sum(1 for p in self._proxies.values() if p.leased)
+            return {"total": len(self._proxies), "leased": leased, "free": len(self._free(now))}
+
 
 owlproxy = OWLService()
+proxy_pool = ProxyPool(owlproxy)
@@ -0,0 +1,75 @@
+# 页面解析线程池 / 进程池：正则与 json 解析不在事件循环里执行，避免导出时界面卡顿
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple, Union
+from config import CONFIG
+from utils.douyin_parser import parse_video_html
+
+PARSE_EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+def _parse_to_dict(html: Union[bytes, str], video_id: str) -> Dict[str, Any]:
+    """在工作线程/子进程中执行，返回可序列化的 dict"""
+    return parse_video_html(html, video_id).to_dict()
+
+
+class ParsePool:
+    """
+    按配置创建解析用的执行器，进程内共享（自动导出线程与界面导出共用）：
+    - PARSE_EXECUTOR: thread（默认）/ process（多核并行）/ inline（在事件循环中直接解析）
+      thread 模式下解析仍受 GIL 限制，页面很多时界面仍可能短暂卡顿；要完全避开需用 process
+    - PARSE_WORKERS_NUM: 工作线程/进程数，0 表示按 CPU 核数
+    配置修改后下一次解析时重建执行器。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+        self._settings: Optional[Tuple[str, int]] = None
+
+    @staticmethod
+    def _current_settings() -> Tuple[str, int]:
+        kind = str(CONFIG.get("PARSE_EXECUTOR", "thread")).lower()
+        if kind not in PARSE_EXECUTOR_KINDS:
+            kind = "thread"
+        workers = int(CONFIG.get("PARSE_WORKERS_NUM", 0) or 0) or (os.cpu_count() or 1)
+        return kind, max(1, workers)
+
+    def executor(self) -> Optional[Executor]:
+        """返回当前配置对应的执行器，inline 模式返回 None"""
+        settings = self._current_settings()
+        with self._lock:
+            if settings != self._settings:
+                old, self._executor = self._executor, None
+                if old is not None:
+                    old.shutdown(wait=False)
+                kind, workers = settings
+                if kind == "process":
+                    # 界面与自动导出都运行在多线程进程中，使用 spawn 避免 fork 带来的锁状态问题
+                    self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                elif kind == "thread":
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+                self._settings = settings
+                logging.info(f"页面解析执行器: {kind}，工作数 {workers}")
+            return self._executor
+
+    async def parse(self, html: Union[bytes, str], video_id: str) -> Dict[str, Any]:
+        executor = self.executor()
+        if executor is None:
+            return _parse_to_dict(html, video_id)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, _parse_to_dict, html, video_id)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._settings = None
+
+
+parse_pool = ParsePool()
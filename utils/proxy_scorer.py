@@ -0,0 +1,196 @@
+# 代理健康度评分：成功率、错误类型与延迟（EWMA / p95），用于挑选代理与隔离故障代理
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+import aiohttp
+from config import CONFIG
+from utils.owlproxy import proxy_key
+
+
+class FetchError(Exception):
+    """单次抓取失败，error_class 用于代理评分与重试策略"""
+
+    def __init__(self, error_class: str, message: str = ""):
+        super().__init__(message or error_class)
+        self.error_class = error_class
+
+
+def classify_error(exc: BaseException) -> str:
+    """将异常归类：timeout / proxy / forbidden / http / network / 其他异常类名"""
+    if isinstance(exc, FetchError):
+        return exc.error_class
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(exc, (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError)):
+        return "proxy"
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return "forbidden" if exc.status == 403 else "http"
+    if isinstance(exc, aiohttp.ClientError):
+        return "network"
+    return type(exc).__name__
+
+
+class ProxyStats:
+    __slots__ = ("success", "failure", "errors", "ewma", "latencies", "consecutive_failures", "quarantined_until", "inflight", "last_seen")
+
+    def __init__(self):
+        self.success = 0
+        self.failure = 0
+        self.errors: Dict[str, int] = {}
+        self.ewma: Optional[float] = None
+        self.latencies: deque = deque(maxlen=50)
+        self.consecutive_failures = 0
+        self.quarantined_until = 0.0
+        self.inflight = 0
+        self.last_seen = time.time()
+
+    @property
+    def success_rate(self) -> float:
+        # 拉普拉斯平滑，未使用过的代理视为 50%
+        return (self.success + 1) / (self.success + self.failure + 2)
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class ProxyScorer:
+    """
+    记录每个代理的成功率、错误类型、延迟 EWMA 与 p95：
+    - choose() 从候选中随机抽样若干个，选评分最好的（延迟 EWMA/p95 低、成功率高、正在使用的少）
+    - 连续失败达到 quarantine_after 次的代理隔离 quarantine_seconds 秒，期间不会被选中
+    """
+
+    def __init__(
+        self,
+        key_func: Callable[[Any], str],
+        alpha: float = 0.3,
+        sample_size: int = 8,
+        prior_latency: float = 2.0,
+        tail_weight: float = 0.3,
+        min_tail_samples: int = 5,
+    ):
+        self.key_func = key_func
+        self.alpha = alpha
+        self.tail_weight = tail_weight
+        self.min_tail_samples = min_tail_samples
+        self.sample_size = sample_size
+        self.prior_latency = prior_latency
+        self._lock = threading.Lock()
+        self._stats: Dict[str, ProxyStats] = {}
+        self._records = 0
+
+    @staticmethod
+    def _quarantine_after() -> int:
+        return int(CONFIG.get("PROXY_QUARANTINE_AFTER", 2))
+
+    @staticmethod
+    def _quarantine_seconds() -> int:
+        return int(CONFIG.get("PROXY_QUARANTINE_SECONDS", 120))
+
+    def _get(self, key: str) -> ProxyStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = ProxyStats()
+        return stats
+
+    def _score(self, stats: Optional[ProxyStats]) -> float:
+        """
+        越小越好：延迟取 EWMA 与 p95 的加权，样本足够时偶发长尾慢的代理排在稳定的后面；
+        再按正在使用的请求数与成功率折算
+        """
+        if stats is None:
+            return self.prior_latency / 0.5
+        latency = stats.ewma if stats.ewma is not None else self.prior_latency
+        if len(stats.latencies) >= self.min_tail_samples:
+            latency = (1 - self.tail_weight) * latency + self.tail_weight * stats.p95()
+        return latency * (1 + stats.inflight) / stats.success_rate
+
+    def _usable(self, key: str, excluded: set, now: float) -> bool:
+        stats = self._stats.get(key)
+        return key not in excluded and (stats is None or stats.quarantined_until <= now)
+
+    def choose(self, candidates: Sequence[Any], exclude: Iterable[str] = ()) -> Optional[Any]:
+        """
+        从候选代理中随机抽样后选出评分最好的一个；抽样中没有可用代理时再全量筛选，
+        全部被排除或隔离时退而求其次，只排除本任务已试过的
+        """
+        if not candidates:
+            return None
+        excluded = set(exclude)
+        now = time.time()
+        with self._lock:
+            sample = random.sample(candidates, min(self.sample_size * 2, len(candidates)))
+            choices = [c for c in sample if self._usable(self.key_func(c), excluded, now)][: self.sample_size]
+            if not choices:
+                pool = [c for c in candidates if self.key_func(c) not in excluded]
+                choices = [c for c in pool if self._usable(self.key_func(c), excluded, now)] or pool or list(candidates)
+                choices = random.sample(choices, min(self.sample_size, len(choices)))
+            best = min(choices, key=lambda c: self._score(self._stats.get(self.key_func(c))))
+            self._get(self.key_func(best)).inflight += 1
+            return best
+
+    def cancel(self, proxy: Any) -> None:
+        """请求被取消（不计入成功或失败），只归还占用"""
+        with self._lock:
+            stats = self._stats.get(self.key_func(proxy))
+            if stats is not None:
+                stats.inflight = max(0, stats.inflight - 1)
+
+    def done(self, proxy: Any, latency: float, error_class: Optional[str] = None) -> None:
+        """一次请求结束：error_class 为空表示成功"""
+        key = self.key_func(proxy)
+        now = time.time()
+        with self._lock:
+            stats = self._get(key)
+            stats.inflight = max(0, stats.inflight - 1)
+            stats.last_seen = now
+            stats.latencies.append(latency)
+            stats.ewma = latency if stats.ewma is None else self.alpha * latency + (1 - self.alpha) * stats.ewma
+            if error_class is None:
+                stats.success += 1
+                stats.consecutive_failures = 0
+            else:
+                stats.failure += 1
+                stats.errors[error_class] = stats.errors.get(error_class, 0) + 1
+                stats.consecutive_failures += 1
+                if stats.consecutive_failures >= self._quarantine_after():
+                    stats.quarantined_until = now + self._quarantine_seconds()
+            self._records += 1
+            if self._records % 1000 == 0:
+                self._prune(now)
+
+    def _prune(self, now: float, max_idle: int = 3600) -> None:
+        """清理一小时未使用的代理统计（动态代理过期后不会再出现）"""
+        for key in [k for k, s in self._stats.items() if s.inflight == 0 and now - s.last_seen > max_idle]:
+            del self._stats[key]
+
+    def snapshot(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                return {}
+            return {
+                "success": stats.success,
+                "failure": stats.failure,
+                "errors": dict(stats.errors),
+                "ewma": stats.ewma,
+                "p95": stats.p95(),
+                "quarantined": stats.quarantined_until > time.time(),
+            }
+
+    def summary(self) -> Dict[str, int]:
+        now = time.time()
+        with self._lock:
+            return {
+                "tracked": len(self._stats),
+                "quarantined": sum(1 for s in self._stats.values() if s.quarantined_until > now),
+            }
+
+
+proxy_scorer = ProxyScorer(proxy_key)
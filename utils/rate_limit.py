@@ -0,0 +1,91 @@
+# 按上游域名的令牌桶限速，进程内共享（自动导出线程与界面导出共用）
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from config import CONFIG
+from utils.metrics import STAGE_SECONDS
+
+
+class TokenBucket:
+    """
+    令牌桶（线程安全）：每秒补充 rate 个令牌，最多积攒 burst 个。
+    reserve() 预约一个令牌并返回需要等待的秒数：令牌不足时允许透支，
+    后来的请求依次排在更靠后的时间点，请求间隔均匀而不是一批批涌出。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1.0
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def configure(self, rate: float, burst: int) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            self.burst = max(1, int(burst))
+            self._tokens = min(self._tokens, float(self.burst))
+
+
+class HostRateLimiter:
+    """
+    按域名分配令牌桶，限速来自 CONFIG['HOST_RATE_LIMITS']：
+    {"v.douyin.com": {"rate": 5, "burst": 10}, ...}，"*" 作为其他域名的默认值；
+    没有配置或 rate <= 0 的域名不限速。配置修改后下一次请求即生效。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    @staticmethod
+    def _limit_for(host: str) -> Optional[Tuple[float, int]]:
+        limits: Dict[str, Any] = CONFIG.get("HOST_RATE_LIMITS", {}) or {}
+        conf = limits.get(host) or limits.get("*")
+        if not isinstance(conf, dict):
+            return None
+        rate = float(conf.get("rate", 0) or 0)
+        if rate <= 0:
+            return None
+        return rate, int(conf.get("burst", 1) or 1)
+
+    def bucket_for(self, host: str) -> Optional[TokenBucket]:
+        limit = self._limit_for(host)
+        with self._lock:
+            if limit is None:
+                self._buckets.pop(host, None)
+                return None
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(*limit)
+            elif (bucket.rate, bucket.burst) != limit:
+                bucket.configure(*limit)
+            return bucket
+
+    async def wait(self, url: str) -> float:
+        """请求 url 之前调用，按其域名的限速等待，返回实际等待秒数"""
+        host = (urlsplit(url).hostname or "").lower()
+        bucket = self.bucket_for(host) if host else None
+        if bucket is None:
+            return 0.0
+        delay = bucket.reserve()
+        if delay > 0:
+            STAGE_SECONDS.observe(delay, stage="rate_limit")
+            await asyncio.sleep(delay)
+        return delay
+
+
+host_rate_limiter = HostRateLimiter()
@@ -0,0 +1,122 @@
+# 短链展开结果的持久化缓存
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from config import CONFIG, SHORT_URL_CACHE_PATH
+
+
+def normalize_short_url(short_url: str) -> str:
+    """短链缓存键：去掉协议、查询参数与结尾斜杠，如 v.douyin.com/abc"""
+    parts = urlsplit((short_url or "").strip())
+    host = (parts.netloc or "").lower()
+    path = parts.path.rstrip("/")
+    return f"{host}{path}"
+
+
+class ShortUrlCache:
+    """
+    v.douyin.com 短链 -> {url, aweme_id, ts} 的磁盘缓存：
+    - 超过 ttl 秒的条目视为过期
+    - 超过 max_size 条时按最近使用顺序淘汰
+    - 写入先记在内存，累计 flush_every 条时在后台线程落盘，或调用 flush() 时落盘
+    - persist 为 False 时只保存在内存（分片抓取的子进程由父进程统一落盘）
+    """
+
+    def __init__(self, path: str, ttl: int, max_size: int, flush_every: int = 50):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.flush_every = flush_every
+        self._lock = threading.RLock()
+        self._data: "OrderedDict[str, Dict]" = OrderedDict()
+        self._dirty = 0
+        self._write_lock = threading.Lock()
+        self._flushing = False
+        self.persist = True
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        now = time.time()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            # 文件中按最近使用顺序保存，过期条目直接丢弃
+            for key, entry in raw.items():
+                if isinstance(entry, dict) and now - float(entry.get("ts", 0)) < self.ttl:
+                    self._data[key] = entry
+        except Exception as e:  # noqa: BLE001
+            logging.warning(f"读取短链缓存失败，将重新建立: {e}")
+            self._data.clear()
+
+    def get(self, short_url: str) -> Optional[Dict]:
+        """命中返回 {"url": ..., "aweme_id": ..., "ts": ...}，未命中或过期返回 None"""
+        key = normalize_short_url(short_url)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if time.time() - float(entry.get("ts", 0)) >= self.ttl:
+                del self._data[key]
+                self._dirty += 1
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def put(self, short_url: str, url: str, aweme_id: str) -> None:
+        key = normalize_short_url(short_url)
+        with self._lock:
+            self._data[key] = {"url": url, "aweme_id": aweme_id, "ts": int(time.time())}
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            self._dirty += 1
+            if self._dirty >= self.flush_every and self.persist and not self._flushing:
+                # put 通常在事件循环中调用，写文件放到后台线程
+                self._flushing = True
+                threading.Thread(target=self._background_flush, daemon=True).start()
+
+    def _background_flush(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._flushing = False
+
+    def flush(self) -> None:
+        """将缓存写回磁盘（先写临时文件再替换，避免写一半的文件）；序列化与写入不占用读写锁"""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty or not self.persist:
+                    return
+                snapshot = dict(self._data)
+                dirty = self._dirty
+            tmp_path = f"{self.path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:  # noqa: BLE001
+                logging.error(f"写入短链缓存失败: {e}")
+                return
+            with self._lock:
+                # 写入期间新增的修改留到下一次
+                self._dirty = max(0, self._dirty - dirty)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+short_url_cache = ShortUrlCache(
+    SHORT_URL_CACHE_PATH,
+    ttl=int(CONFIG.get("SHORT_URL_CACHE_TTL", 2592000)),
+    max_size=int(CONFIG.get("SHORT_URL_CACHE_MAX_SIZE", 100000)),
+)
@@ -2,6 +2,7 @@ import base64
 import requests
 from config import CONFIG
 YUNMA_TOKEN = CONFIG["YUNMA_TOKEN"]
+DEFAULT_API_URL = "http://api.jfbym.com/api/YmServer/customApi"
 
 
 def verify(image_path, type = "10103"):
@@ -26,7 +27,7 @@ def verify_base64(image_base64, type = "10103"):
     :param image_base64: 图片的base64字符串
     :param type: 10110 4位纯数字, 10111 4
     """
-    url = "http://api.jfbym.com/api/YmServer/customApi"
+    url = CONFIG.get("YUNMA_API_URL", DEFAULT_API_URL) or DEFAULT_API_URL
     data = {
         ## 关于参数,一般来说有3个;不同类型id可能有不同的参数个数和参数名,找客服获取
         "token": YUNMA_TOKEN,
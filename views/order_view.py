@@ -47,12 +47,19 @@ def show_order_page():
                 with ui.dialog() as dlg, ui.card():
                     ui.label("正在导出缺失订单为 CSV，请稍候...")
                     ui.spinner(size="lg")
+                    progress_label = ui.label("").classes("text-sm text-grey-7")
                 dlg.open()
 
+                def on_progress(done: int, total: int):
+                    progress_label.set_text(f"已检查 {done} / {total}")
+
                 async def do_export():
                     try:
-                        await export_deficiency_orders_links()
-                        ui.notify("导出完成", type="positive")
+                        result = await export_deficiency_orders_links(on_progress)
+                        if result is None:
+                            ui.notify("已有导出在进行，请稍后再试", type="warning")
+                        else:
+                            ui.notify("导出完成", type="positive")
                     except Exception as e:  # noqa: BLE001
                         ui.notify(f"导出失败: {e}", type="negative")
                     finally:
@@ -0,0 +1,76 @@
+# 无界面的分布式抓取 worker：从数据库任务队列租用链接，抓取点赞数后回写结果
+# 用法：python worker.py [--id 名称]，多台机器连接同一个任务队列库（JOB_DB_URL，为空时为 DB_* 配置的 MySQL）即可横向扩展
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from contextlib import aclosing
+from typing import Any, Dict, List
+from config import CONFIG
+from controllers.job_controller import claim_jobs, complete_job
+from utils.douyin import _iter_pending_likes, _max_attempts
+from utils.owlproxy import proxy_pool
+from utils.short_url_cache import short_url_cache
+
+
+async def _complete(job: Dict[str, Any], like_cnt) -> None:
+    # 短链展开后的作品ID随结果回写，导出端据此补全 order_link
+    aweme_id = job["aweme_id"] or (short_url_cache.get(job["link"]) or {}).get("aweme_id")
+    if like_cnt == float("inf"):
+        ok = await asyncio.to_thread(complete_job, job["id"], job["lease"], None, "重试后仍失败", aweme_id)
+    else:
+        ok = await asyncio.to_thread(complete_job, job["id"], job["lease"], int(like_cnt), "", aweme_id)
+    if not ok:
+        logging.warning(f"[worker] 任务 {job['id']} 租约已过期，结果未写入")
+
+
+async def _process_jobs(jobs: List[Dict[str, Any]]) -> None:
+    """
+    抓取一批租到的任务，与本地批量抓取共用 _iter_pending_likes：自适应并发、整批共用的对冲额度、
+    失败退避后重新入队（等待期间不占并发槽位）；每完成一个任务就回写结果
+    """
+    lease = await proxy_pool.lease_async(len(jobs))
+    try:
+        await lease.wait_ready()
+        if not lease.proxies:
+            logging.error("[worker] 未能租用任何代理，本批任务等待租约过期后重新分配")
+            return
+        orders = [{"link": job["link"], "aweme_id": job["aweme_id"]} for job in jobs]
+        max_workers = max(1, min(int(CONFIG.get("IO_WORKERS_NUM", 10)), len(jobs)))
+        adaptive = str(CONFIG.get("ADAPTIVE_CONCURRENCY", "1")) == "1"
+        items = _iter_pending_likes(orders, list(range(len(jobs))), lease.proxies, max_workers, _max_attempts(), adaptive)
+        async with aclosing(items) as results:
+            async for i, like_cnt in results:
+                await _complete(jobs[i], like_cnt)
+    finally:
+        await lease.close()
+        proxy_pool.release(lease.proxies)
+
+
+async def run_worker(worker_id: str) -> None:
+    logging.info(f"[worker] {worker_id} 启动")
+    while True:
+        jobs = await asyncio.to_thread(
+            claim_jobs,
+            worker_id,
+            int(CONFIG.get("JOB_CLAIM_BATCH", 50)),
+            int(CONFIG.get("JOB_LEASE_SECONDS", 300)),
+            int(CONFIG.get("JOB_MAX_CLAIMS", 3)),
+        )
+        if not jobs:
+            await asyncio.sleep(float(CONFIG.get("JOB_POLL_INTERVAL", 2)))
+            continue
+        logging.info(f"[worker] 租用 {len(jobs)} 个任务")
+        await _process_jobs(jobs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="分布式点赞数抓取 worker")
+    parser.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}", help="worker 名称，默认 主机名-进程号")
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.id))
+
+
+if __name__ == "__main__":
+    main()